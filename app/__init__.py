@@ -12,7 +12,14 @@ migrate = Migrate()
 login_manager = LoginManager()
 bcrypt = Bcrypt()
 
-def create_app():
+def create_app(market_data_daemon=None):
+    """
+    Create the Flask app
+    
+    With market_data_daemon (default: the MARKET_DATA_DAEMON environment variable) the
+    market data feed and strategy runners are left to a separate daemon process, see
+    market_data.py, and this process does not start the background tasks.
+    """
     app = Flask(__name__)
     
     # Ensure instance directory exists
@@ -26,6 +33,10 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    if market_data_daemon is None:
+        market_data_daemon = os.environ.get('MARKET_DATA_DAEMON', '').lower() in ('1', 'true', 'yes')
+    app.config['MARKET_DATA_DAEMON'] = market_data_daemon
+    
     # Initialize extensions with app
     db.init_app(app)
     migrate.init_app(app, db)
@@ -66,7 +77,8 @@ def create_app():
         # Log application startup
         logger.log_app_event("STARTUP", "Application initialized")
         
-        # Start background tasks with app reference
-        task_manager.start_all_tasks(app=app)
+        # Start background tasks with app reference, unless the market data daemon runs them
+        if not market_data_daemon:
+            task_manager.start_all_tasks(app=app)
     
     return app
@@ -8,7 +8,8 @@ from functools import wraps
 import json
 from SmartApi import SmartConnect
 import pyotp
-from app.helpers.websocket_helper import websocket_manager
+from app.helpers.market_data_client import get_market_data
+from app.helpers.timeframe import normalize_timeframe
 import threading
 import time
 from datetime import datetime, timedelta
@@ -29,8 +30,8 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def refresh_angelone_tokens():
-    """Background thread to refresh AngelOne tokens periodically"""
+def refresh_angelone_tokens(market_data):
+    """Background thread to refresh AngelOne tokens periodically, reconnecting market_data with them"""
     global token_refresh_running
     
     while token_refresh_running:
@@ -69,15 +70,15 @@ def refresh_angelone_tokens():
                         db.session.commit()
                         
                         # Reconfigure WebSocket with new tokens
-                        if websocket_manager.connected:
+                        if market_data.connected:
                             print("Reconnecting WebSocket with new tokens...")
-                            websocket_manager.configure(
+                            market_data.configure(
                                 admin.angelone_jwt_token,
                                 admin.angelone_api_key,
                                 admin.angelone_client_code,
                                 admin.angelone_feed_token
                             )
-                            websocket_manager.reconnect()
+                            market_data.reconnect()
                         
                         print("AngelOne tokens refreshed successfully")
                     else:
@@ -97,6 +98,7 @@ def start_token_refresh_thread():
         token_refresh_running = True
         token_refresh_thread = threading.Thread(
             target=refresh_angelone_tokens, 
+            args=(get_market_data(),),  # Resolved here, the thread has no app context
             name="TokenRefresh",
             daemon=True
         )
@@ -127,7 +129,7 @@ def index():
         users_count=users_count,
         strategies_count=strategies_count,
         active_instances_count=active_instances_count,
-        websocket_status=websocket_manager.connected
+        websocket_status=get_market_data().connected
     )
 
 @admin_bp.route('/admin/users')
@@ -205,26 +207,18 @@ def websocket_settings():
         angelone_ws_enabled=True
     ).first()
     
-    # Get connection status
-    ws_status = websocket_manager.get_connection_status() if websocket_manager.connected else None
+    # Get connection status, from the market data daemon when there is one
+    market_data = get_market_data()
+    connected = market_data.connected
+    ws_status = market_data.get_connection_status() if connected else None
     
     # Get subscribed symbols
-    subscribed_symbols = []
-    if websocket_manager.connected:
-        with websocket_manager.data_lock:
-            for symbol, info in websocket_manager.subscribed_symbols.items():
-                subscribed_symbols.append({
-                    'symbol': symbol,
-                    'exchange_type': info['exchange_type'],
-                    'token': info['token'],
-                    'data_points': len(info['data']),
-                    'callbacks': len(info['callbacks'])
-                })
+    subscribed_symbols = market_data.get_subscriptions() if connected else []
     
     return render_template(
         'admin/websocket.html',
         title='WebSocket Management',
-        websocket_connected=websocket_manager.connected,
+        websocket_connected=connected,
         admins_with_angel=admins_with_angel,
         subscribed_symbols=subscribed_symbols,
         current_admin=current_admin,
@@ -280,7 +274,8 @@ def websocket_connect():
             db.session.commit()
             
             # Configure and connect WebSocket
-            websocket_manager.configure(
+            market_data = get_market_data()
+            market_data.configure(
                 admin.angelone_jwt_token,
                 admin.angelone_api_key,
                 admin.angelone_client_code,
@@ -290,10 +285,10 @@ def websocket_connect():
             # Start token refresh thread
             start_token_refresh_thread()
             
-            if websocket_manager.connect():
+            if market_data.connect():
                 flash("Successfully connected to AngelOne WebSocket", "success")
             else:
-                flash(f"Failed to connect to AngelOne WebSocket: {websocket_manager.last_error}", "danger")
+                flash(f"Failed to connect to AngelOne WebSocket: {market_data.last_error}", "danger")
         else:
             flash(f"Failed to login to AngelOne: {login_response.get('message', 'Unknown error')}", "danger")
     
@@ -313,10 +308,11 @@ def websocket_disconnect():
         stop_token_refresh_thread()
         
         # Close WebSocket connection
-        if websocket_manager.close_connection():
+        market_data = get_market_data()
+        if market_data.close_connection():
             flash("Successfully disconnected from AngelOne WebSocket", "success")
         else:
-            flash(f"Error disconnecting WebSocket: {websocket_manager.last_error}", "warning")
+            flash(f"Error disconnecting WebSocket: {market_data.last_error}", "warning")
             
         # Update admin user status
         admin = User.query.filter_by(angelone_ws_enabled=True).first()
@@ -335,7 +331,7 @@ def websocket_disconnect():
 def websocket_status():
     """Get WebSocket status for AJAX updates"""
     
-    status = websocket_manager.get_connection_status()
+    status = get_market_data().get_connection_status()
     
     if status['last_data_time']:
         status['last_data_time'] = status['last_data_time'].strftime('%Y-%m-%d %H:%M:%S')
@@ -346,7 +342,44 @@ def websocket_status():
         'last_error': status['last_error'],
         'error_count': status['error_count'],
         'last_data_time': status['last_data_time'],
-        'subscribed_symbols_count': status['subscribed_symbols_count']
+        'subscribed_symbols_count': status['subscribed_symbols_count'],
+        'latency': status['latency']
+    })
+
+@admin_bp.route('/admin/websocket/bars', methods=['GET'])
+@login_required
+@admin_required
+def websocket_bars():
+    """Get the shared bars of a symbol for charts"""
+    
+    symbol = request.args.get('symbol')
+    timeframe = request.args.get('timeframe', '1m')
+    limit = request.args.get('limit', 100, type=int)
+    
+    if not symbol:
+        return jsonify({'success': False, 'message': 'Missing symbol parameter'})
+    
+    try:
+        timeframe = normalize_timeframe(timeframe)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    
+    bars = get_market_data().get_bars(symbol, timeframe, limit, include_forming=True)
+    data = [{
+        'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        'open': float(row['open']),
+        'high': float(row['high']),
+        'low': float(row['low']),
+        'close': float(row['close']),
+        'volume': int(row['volume'])
+    } for timestamp, row in bars.iterrows()]
+    
+    return jsonify({
+        'success': True,
+        'symbol': symbol,
+        'timeframe': timeframe,
+        'bars': data,
+        'count': len(data)
     })
 
 @admin_bp.route('/admin/angelone/<int:user_id>', methods=['GET', 'POST'])
@@ -4,11 +4,12 @@ from app import db
 from app.models.strategy import Strategy
 from app.models.instance import StrategyInstance
 from app.forms.strategy_forms import StrategyForm, StrategyInstanceForm
-from app.helpers.strategy_helper import extract_params_from_code, execute_strategy_code, get_historical_data
+from app.helpers.strategy_helper import extract_params_from_code, execute_strategy_code, get_historical_data, resample_to_timeframe
 from app.helpers.strategy_helper import activate_strategy_instance, deactivate_strategy_instance
 from app.helpers.openalgo_helper import register_webhook
 from app.helpers.openalgo_helper import get_openalgo_client
-from app.helpers.websocket_helper import websocket_manager
+from app.helpers.market_data_client import get_market_data
+from app.helpers.code_cache import code_cache
 import json
 from datetime import datetime, timedelta
 
@@ -77,6 +78,9 @@ def edit_strategy(strategy_id):
     if form.validate_on_submit():
         strategy.name = form.name.data
         strategy.description = form.description.data
+        if form.code.data != strategy.code:
+            # Drop the compiled old code, the new code is compiled on its first run
+            code_cache.invalidate(strategy.code)
         strategy.code = form.code.data
         strategy.updated_at = datetime.utcnow()
         
@@ -109,6 +113,7 @@ def delete_strategy(strategy_id):
         return redirect(url_for('strategy.view_strategy', strategy_id=strategy.id))
     
     # Delete the strategy
+    code_cache.invalidate(strategy.code)
     db.session.delete(strategy)
     db.session.commit()
     
@@ -137,8 +142,10 @@ def test_strategy(strategy_id):
     
     # Fetch historical data - first try WebSocket if available
     historical_data = None
-    if websocket_manager.connected and websocket_manager.is_symbol_subscribed(symbol):
-        historical_data = websocket_manager.get_data_as_dataframe(symbol, 500)
+    market_data = get_market_data()
+    if market_data.connected and market_data.is_symbol_subscribed(symbol):
+        # Buffered ticks become bars of the requested timeframe
+        historical_data = resample_to_timeframe(market_data.get_data_as_dataframe(symbol, 500), timeframe, exchange)
     
     # If WebSocket data not available, fall back to OpenAlgo API
     if historical_data is None or historical_data.empty:
@@ -174,7 +181,8 @@ def test_strategy(strategy_id):
         return jsonify({
             'success': True,
             'signals': result['signals'],
-            'output': result.get('output', "")
+            'output': result.get('output', ""),
+            'compile': result.get('compile')
         })
             
     except Exception as e:
@@ -203,6 +211,7 @@ def create_instance(strategy_id):
             symbol=form.symbol.data,
             exchange=form.exchange.data,
             timeframe=form.timeframe.data,
+            intrabar_interval=form.intrabar_interval.data,
             parameters=json.dumps(form.parameters.data),
             long_entry_action=form.long_entry_action.data,
             long_exit_action=form.long_exit_action.data,
@@ -278,6 +287,7 @@ def edit_instance(instance_id):
         instance.symbol = form.symbol.data
         instance.exchange = form.exchange.data
         instance.timeframe = form.timeframe.data
+        instance.intrabar_interval = form.intrabar_interval.data
         instance.parameters = json.dumps(form.parameters.data)
         instance.long_entry_action = form.long_entry_action.data
         instance.long_exit_action = form.long_exit_action.data
@@ -299,6 +309,7 @@ def edit_instance(instance_id):
         form.symbol.data = instance.symbol
         form.exchange.data = instance.exchange
         form.timeframe.data = instance.timeframe
+        form.intrabar_interval.data = instance.intrabar_interval
         form.parameters.data = instance.parameters if instance.parameters else {}
         form.long_entry_action.data = instance.long_entry_action
         form.long_exit_action.data = instance.long_exit_action
@@ -361,7 +372,7 @@ def toggle_instance(instance_id):
             return redirect(url_for('auth.profile'))
             
         # Check if WebSocket is connected - warn but allow to continue
-        if not websocket_manager.connected:
+        if not get_market_data().connected:
             flash("Warning: AngelOne WebSocket is not connected. Will use OpenAlgo for data.", "warning")
         
         # Register webhook with OpenAlgo for order execution
@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.helpers.websocket_helper import websocket_manager, initialize_angelone_websocket
+from app.helpers.websocket_helper import initialize_angelone_websocket
+from app.helpers.market_data_client import get_market_data, market_data_client, use_market_data_daemon
 from app.helpers.openalgo_helper import get_angelone_client
 import logging
 import pyotp
@@ -12,6 +13,12 @@ from datetime import datetime
 websocket_blueprint = Blueprint('websocket', __name__)
 logger = logging.getLogger('app')
 
+def _initialize_websocket(user):
+    """Connect the WebSocket in this process, or in the market data daemon when it owns the feed"""
+    if use_market_data_daemon():
+        return market_data_client.initialize(user)
+    return initialize_angelone_websocket(user)
+
 @websocket_blueprint.route('/websocket/dashboard')
 @login_required
 def websocket_dashboard():
@@ -22,14 +29,15 @@ def websocket_dashboard():
         return redirect(url_for('dashboard.index'))
         
     # Get WebSocket status
-    status = websocket_manager.get_connection_status()
+    market_data = get_market_data()
+    status = market_data.get_connection_status()
     
     return render_template('websocket/dashboard.html', 
                            user=current_user, 
-                           ws_status=websocket_manager.get_connection_status(),
+                           ws_status=status,
                            active_page='websocket_dashboard',
                            status=status,
-                           continue_iteration=websocket_manager.continue_iteration)
+                           continue_iteration=market_data.continue_iteration)
 
 @websocket_blueprint.route('/websocket/initialize', methods=['POST'])
 @login_required
@@ -41,7 +49,7 @@ def initialize_websocket():
         
     try:
         # Initialize websocket using current user credentials
-        result = initialize_angelone_websocket(current_user)
+        result = _initialize_websocket(current_user)
         
         # Update database if needed
         if result['success'] and not current_user.angelone_ws_configured:
@@ -63,7 +71,7 @@ def websocket_status():
         return jsonify({'success': False, 'message': 'Permission denied'})
         
     try:
-        status = websocket_manager.get_connection_status()
+        status = get_market_data().get_connection_status()
         
         # Add connection details
         status['configured'] = current_user.angelone_ws_configured
@@ -133,7 +141,7 @@ def refresh_token():
             # Reinitialize websocket if it was connected
             result = {'token_update': 'success'}
             if current_user.angelone_ws_enabled:
-                ws_result = initialize_angelone_websocket(current_user)
+                ws_result = _initialize_websocket(current_user)
                 result['websocket'] = ws_result
             
             return jsonify({
@@ -159,7 +167,7 @@ def close_websocket():
         
     try:
         # Close connection
-        result = websocket_manager.close_connection()
+        result = get_market_data().close_connection()
         
         # Update database
         current_user.angelone_ws_enabled = False
@@ -194,10 +202,11 @@ def subscribe():
         mode = data.get('mode', 2)  # Default to Quote mode
         
         # Register symbol
-        websocket_manager.register_symbol(symbol, exchange_type, token)
+        market_data = get_market_data()
+        market_data.register_symbol(symbol, exchange_type, token)
         
         # Subscribe with specified mode
-        result = websocket_manager.subscribe_mode(symbol, mode)
+        result = market_data.subscribe_mode(symbol, mode)
         
         if result:
             return jsonify({
@@ -208,7 +217,7 @@ def subscribe():
         else:
             return jsonify({
                 'success': False, 
-                'message': f'Failed to subscribe to {symbol}: {websocket_manager.last_error}'
+                'message': f'Failed to subscribe to {symbol}: {market_data.last_error}'
             })
             
     except Exception as e:
@@ -232,7 +241,8 @@ def unsubscribe():
         symbol = data['symbol']
         
         # Unsubscribe
-        result = websocket_manager.unsubscribe(symbol)
+        market_data = get_market_data()
+        result = market_data.unsubscribe(symbol)
         
         if result:
             return jsonify({
@@ -242,7 +252,7 @@ def unsubscribe():
         else:
             return jsonify({
                 'success': False, 
-                'message': f'Failed to unsubscribe from {symbol}: {websocket_manager.last_error}'
+                'message': f'Failed to unsubscribe from {symbol}: {market_data.last_error}'
             })
             
     except Exception as e:
@@ -261,13 +271,13 @@ def active_symbols():
         active = []
         
         # Get all subscribed symbols
-        for symbol, info in websocket_manager.subscribed_symbols.items():
+        for info in get_market_data().get_subscriptions():
             active.append({
-                'symbol': symbol,
+                'symbol': info['symbol'],
                 'exchange_type': info['exchange_type'],
                 'token': info['token'],
-                'mode': info.get('mode', 2),
-                'data_points': len(info['data'])
+                'mode': info['mode'],
+                'data_points': info['data_points']
             })
             
         return jsonify({
@@ -295,11 +305,12 @@ def symbol_data():
         if not symbol:
             return jsonify({'success': False, 'message': 'Missing symbol parameter'})
             
-        if not websocket_manager.is_symbol_subscribed(symbol):
+        market_data = get_market_data()
+        if not market_data.is_symbol_subscribed(symbol):
             return jsonify({'success': False, 'message': f'Symbol {symbol} is not subscribed'})
             
         # Get data as dataframe
-        df = websocket_manager.get_data_as_dataframe(symbol, limit)
+        df = market_data.get_data_as_dataframe(symbol, limit)
         
         if df.empty:
             return jsonify({
@@ -331,25 +342,59 @@ def symbol_data():
         logger.error(f"Error getting symbol data: {str(e)}")
         return jsonify({'success': False, 'message': f"Error: {str(e)}"})
 
+@websocket_blueprint.route('/websocket/quotes')
+@login_required
+def quotes():
+    """Get the latest quote of every registered symbol"""
+    # Only allow admin users
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': 'Permission denied'})
+
+    try:
+        snapshot = get_market_data().get_quote_snapshot()
+
+        # NaN prices (no tick yet) become null in the response
+        data = []
+        for symbol, row in snapshot.iterrows():
+            data.append({
+                'symbol': symbol,
+                'last_price': None if row['last_price'] != row['last_price'] else float(row['last_price']),
+                'bid': None if row['bid'] != row['bid'] else float(row['bid']),
+                'ask': None if row['ask'] != row['ask'] else float(row['ask']),
+                'volume': int(row['volume']),
+                'updated': datetime.fromtimestamp(row['update_ns'] / 1e9).strftime('%Y-%m-%d %H:%M:%S') if row['update_ns'] else None
+            })
+
+        return jsonify({
+            'success': True,
+            'quotes': data,
+            'count': len(data)
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting quotes: {str(e)}")
+        return jsonify({'success': False, 'message': f"Error: {str(e)}"})
+
 @websocket_blueprint.route('/websocket/toggle-iteration', methods=['POST'])
 @login_required
 def toggle_iteration():
     """Toggle the WebSocket iteration state"""
     try:
         # Get the current state
-        current_state = websocket_manager.continue_iteration
+        market_data = get_market_data()
+        current_state = market_data.continue_iteration
         
         # Toggle the state
-        websocket_manager.continue_iteration = not current_state
+        market_data.continue_iteration = not current_state
         
         # Log the state change
-        new_state = "enabled" if websocket_manager.continue_iteration else "disabled"
+        new_state = "enabled" if market_data.continue_iteration else "disabled"
         logger.log_websocket_event("ITERATION", f"WebSocket iteration {new_state} by {current_user.username}")
         
         return jsonify({
             "success": True,
             "message": f"WebSocket iteration {new_state}",
-            "continue_iteration": websocket_manager.continue_iteration
+            "continue_iteration": market_data.continue_iteration
         })
     except Exception as e:
         logger.log_websocket_event("ITERATION_ERROR", f"Error toggling WebSocket iteration: {str(e)}", level="error")
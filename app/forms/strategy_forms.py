@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, TextAreaField, SubmitField, SelectField, FloatField, BooleanField
+from wtforms import StringField, TextAreaField, SubmitField, SelectField, FloatField, BooleanField, IntegerField
 from wtforms.validators import DataRequired, Length, Optional, NumberRange
 
 class StrategyForm(FlaskForm):
@@ -32,6 +32,8 @@ class StrategyInstanceForm(FlaskForm):
                               ('D', 'Daily')
                           ],
                           validators=[DataRequired()])
+    intrabar_interval = IntegerField('Intra-bar Interval (seconds)', 
+                                     validators=[Optional(), NumberRange(min=1, max=3600)])
     
     # Signal actions
     long_entry_action = TextAreaField('Long Entry Action', 
@@ -0,0 +1,501 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from app.helpers.logger_helper import logger
+from websockets.asyncio.client import connect as ws_connect
+from websockets.exceptions import ConnectionClosed
+from websockets.protocol import State
+from app.helpers.tick_queue import POLICY_BLOCK
+from app.helpers.websocket_helper import AngelOneWebSocketManager, WebSocketShard
+
+STREAM_URL = "wss://smartapisocket.angelone.in/smart-stream"
+SUBSCRIBE_ACTION = 1
+UNSUBSCRIBE_ACTION = 0
+REQUEST_TIMEOUT = 10  # Seconds a caller thread waits for a request to be written
+MAX_MESSAGE_BYTES = 65536  # Feed frames are at most a few KB, anything larger drops the connection
+
+
+class AsyncSmartStream:
+    """
+    SmartWebSocketV2 client surface over one asyncio WebSocket connection
+
+    subscribe(), unsubscribe() and send() may be called from any thread. On the
+    manager's event loop they queue the request as a task (tasks start in order, so
+    requests stay in order); from other threads they wait until it is written, so
+    errors reach the caller as with the threaded client.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.websocket = None
+        self.modes = {}  # (exchange_type, token) -> mode it was subscribed in, for unsubscribe requests
+
+    async def open(self):
+        manager = self.manager
+        headers = {
+            "Authorization": manager.auth_token,
+            "x-api-key": manager.api_key,
+            "x-client-code": manager.client_code,
+            "x-feed-token": manager.feed_token
+        }
+        options = {'ssl': manager.ssl_context} if manager.ssl_context is not None else {}
+        self.websocket = await ws_connect(
+            manager.stream_url,
+            additional_headers=headers,
+            open_timeout=manager.connect_timeout,
+            max_size=MAX_MESSAGE_BYTES,
+            ping_interval=None,  # The feed's own text "ping" heartbeats run on the manager's timer
+            **options
+        )
+
+    def _is_open(self):
+        return self.websocket is not None and self.websocket.state is State.OPEN
+
+    async def recv(self):
+        return await self.websocket.recv()
+
+    def _submit(self, coroutine):
+        manager = self.manager
+        if manager._in_loop():
+            manager.loop.create_task(coroutine).add_done_callback(manager._log_task_error)
+        else:
+            asyncio.run_coroutine_threadsafe(coroutine, manager.loop).result(REQUEST_TIMEOUT)
+
+    def _send_request(self, correlation_id, action, mode, token_list):
+        if not self._is_open():
+            raise ConnectionError("Stream connection is not open")
+        request = {
+            "correlationID": correlation_id,
+            "action": action,
+            "params": {
+                "mode": mode,
+                "tokenList": token_list
+            }
+        }
+        self._submit(self.websocket.send(json.dumps(request)))
+
+    def subscribe(self, correlation_id, mode, token_list):
+        self._send_request(correlation_id, SUBSCRIBE_ACTION, mode, token_list)
+        for entry in token_list:
+            for token in entry["tokens"]:
+                self.modes[(int(entry["exchangeType"]), str(token))] = mode
+
+    def unsubscribe(self, correlation_id, token_list):
+        # The feed wants the subscription mode, so tokens are grouped by the mode they were subscribed in
+        mode_tokens = {}
+        for entry in token_list:
+            exchange_type = int(entry["exchangeType"])
+            for token in entry["tokens"]:
+                mode = self.modes.pop((exchange_type, str(token)), 2)
+                mode_tokens.setdefault(mode, {}).setdefault(exchange_type, []).append(token)
+        for mode, grouped in mode_tokens.items():
+            self._send_request(correlation_id, UNSUBSCRIBE_ACTION, mode, [
+                {"exchangeType": exchange_type, "tokens": tokens}
+                for exchange_type, tokens in grouped.items()
+            ])
+
+    def send(self, message):
+        if not self._is_open():
+            raise ConnectionError("Stream connection is not open")
+        self._submit(self.websocket.send(message))
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+
+    def close_connection(self):
+        if self._is_open():
+            self._submit(self.close())
+
+
+class AsyncWebSocketShard(WebSocketShard):
+    """
+    One pooled connection driven by tasks on the manager's event loop
+
+    The connection task reads the socket and reconnects with backoff; the tick
+    processor task drains the shard's queue whenever the reader wakes it.
+    """
+
+    def __init__(self, manager, index):
+        super().__init__(manager, index)
+        self.connection_task = None
+        self.processor_task = None
+        self.reset_events()
+
+    def reset_events(self):
+        """Create the loop events afresh, they bind to the first loop that waits on them"""
+        self.opened = asyncio.Event()  # Set while the connection is open
+        self.wakeup = asyncio.Event()  # Set by the reader when messages are queued
+        self.space = asyncio.Event()  # Set by the processor after each batch, for the block policy
+
+    def start(self):
+        """Start the connection task and make sure the tick processor task is running"""
+        self.manager.loop.call_soon_threadsafe(self._start_tasks)
+
+    def _start_tasks(self):
+        manager = self.manager
+        if self.connection_task is None or self.connection_task.done():
+            self.connection_task = manager.loop.create_task(manager._run_connection(self))
+        # The processor outlives reconnects, only start it once
+        if self.processor_task is None or self.processor_task.done():
+            self.processor_task = manager.loop.create_task(manager._process_shard(self))
+
+    def close(self):
+        """Close the connection, returns True if it was open"""
+        was_connected = self.connected
+        self.connected = False
+        task = self.connection_task
+        if task is not None and not task.done():
+            self.manager._cancel(task)
+        return was_connected
+
+
+class AsyncAngelOneWebSocketManager(AngelOneWebSocketManager):
+    """
+    AngelOneWebSocketManager variant driven by one asyncio event loop
+
+    The public API is the same and still synchronous; calls from other threads are
+    handed to the loop. Instead of a connection thread and a processor thread per
+    connection plus sleeping health check and bar timer threads, every connection
+    is a reader task and a processor task on a single loop thread, heartbeats and
+    bar closing run on loop timers, reconnect backoff is an asyncio sleep, and
+    shutdown() cancels the tasks and joins the loop thread.
+
+    Decoding, archiving and dispatching a batch, and completing due bars, run on a
+    small executor, so the loop keeps reading sockets meanwhile; each connection
+    still processes one batch at a time, in order. Subscriber callbacks run on the
+    callback dispatcher's worker threads as in the threaded manager, and shutdown()
+    stops those too.
+    """
+    _instance = None
+    shard_class = AsyncWebSocketShard
+
+    def __init__(self):
+        if self.initialized:
+            return
+        super().__init__()
+        self.stream_url = STREAM_URL
+        self.ssl_context = None  # Default certificate verification for wss:// URLs
+        self.connect_timeout = 10
+        self.stale_data_seconds = 60  # Reconnect a connection that carries symbols but went quiet
+        self.loop = None
+        self.loop_thread = None
+        self.health_task = None
+        self.bar_timer_task = None
+        self.executor = None  # Runs batch processing off the loop, see _process_shard()
+
+    def configure_stream(self, url=None, ssl_context=None):
+        """Point the manager at another stream endpoint, e.g. a local stand-in server"""
+        if url is not None:
+            self.stream_url = url
+        if ssl_context is not None:
+            self.ssl_context = ssl_context
+        return True
+
+    def _ensure_loop(self):
+        """Start the event loop thread if it is not running"""
+        if self.loop_thread is not None and self.loop_thread.is_alive():
+            return
+        ready = threading.Event()
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, self.max_connections), thread_name_prefix="AsyncTickBatch")
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.call_soon(ready.set)
+            self.loop.run_forever()
+
+        self.loop_thread = threading.Thread(target=run, name="AsyncMarketData")
+        self.loop_thread.daemon = True
+        self.loop_thread.start()
+        ready.wait(5)
+        logger.log_websocket_event("ASYNC", "Market data event loop started")
+
+    def _in_loop(self):
+        return threading.current_thread() is self.loop_thread
+
+    def _run(self, coroutine, timeout=None):
+        """Run a coroutine on the loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def _cancel(self, task):
+        """Cancel a loop task; from other threads, wait until it has finished"""
+        if self._in_loop():
+            task.cancel()
+            return
+
+        async def cancel_and_wait():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        self._run(cancel_and_wait(), REQUEST_TIMEOUT)
+
+    def _log_task_error(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            self.error_count += 1
+            self.last_error = str(task.exception())
+            logger.log_websocket_event("ASYNC_ERROR", f"Background task failed: {task.exception()}", level="error")
+
+    def connect(self):
+        """Connect all pooled AngelOne WebSocket connections"""
+        self._ensure_loop()
+        if self.bar_builder.series:
+            # Bars tracked before a shutdown() need their timer on the new loop
+            self._start_bar_timer()
+        return super().connect()
+
+    def _start_bar_timer(self):
+        """Start the bar closing timer task unless it is already running"""
+        self._ensure_loop()
+        self.loop.call_soon_threadsafe(self._start_bar_timer_task)
+
+    def _start_bar_timer_task(self):
+        if self.bar_timer_task is None or self.bar_timer_task.done():
+            self.bar_timer_task = self.loop.create_task(self._bar_timer_loop())
+            self.bar_timer_task.add_done_callback(self._log_task_error)
+
+    async def _bar_timer_loop(self):
+        """Complete bars whose interval ended without a tick from the next one"""
+        loop = asyncio.get_running_loop()
+        while self.bar_builder.series:
+            await loop.run_in_executor(self.executor, self._close_due_bars)
+            await asyncio.sleep(self.bar_timer_interval)
+
+    def _uses_broker(self):
+        return self.stream_url == STREAM_URL
+
+    def _start_health_check(self):
+        """Start the heartbeat timer task unless it is already running"""
+        if self.health_task is None or self.health_task.done():
+            self.health_check_running = True
+            self.health_task = self._run(self._spawn(self._health_loop()), REQUEST_TIMEOUT)
+
+    async def _spawn(self, coroutine):
+        task = asyncio.get_running_loop().create_task(coroutine)
+        task.add_done_callback(self._log_task_error)
+        return task
+
+    def _connect_shards(self, shards, timeout=None):
+        """Start the given connections and wait for all of them to open"""
+        timeout = self.connect_timeout if timeout is None else timeout
+        for shard in shards:
+            logger.log_websocket_event("CONNECT", f"Starting WebSocket connection {shard.index} and its tick processor...")
+            shard.start()
+
+        if not self._run(self._wait_open(shards, timeout)):
+            pending = [shard.index for shard in shards if not shard.connected]
+            self.last_error = f"WebSocket connection timed out (connections {pending})"
+            logger.log_websocket_event("CONNECT_TIMEOUT", f"Connection timed out for connections {pending}", level="error")
+            return False
+        return True
+
+    async def _wait_open(self, shards, timeout):
+        try:
+            await asyncio.wait_for(asyncio.gather(*(shard.opened.wait() for shard in shards)), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run_connection(self, shard):
+        """Own one pooled connection: open it, read until it drops, then back off and reopen"""
+        while shard.active:
+            stream = AsyncSmartStream(self)
+            shard.ws = stream
+            try:
+                await stream.open()
+                self._on_open(stream, shard)
+                shard.opened.set()
+                await self._read_stream(shard, stream)
+            except asyncio.CancelledError:
+                # close() or shutdown(), not a failure
+                shard.connected = False
+                shard.opened.clear()
+                await stream.close()
+                raise
+            except ConnectionClosed as e:
+                logger.log_websocket_event("CLOSE", f"WebSocket connection {shard.index} closed: {str(e)}")
+            except Exception as e:
+                self._on_error(stream, e, shard)
+
+            shard.connected = False
+            shard.opened.clear()
+            if shard.disconnected_at is None:
+                shard.disconnected_at = time.monotonic()
+            if not shard.active:
+                break
+            if shard.reconnect_attempts >= self.max_reconnect_attempts:
+                logger.log_websocket_event("RECONNECT_FAILED", f"Maximum reconnect attempts ({self.max_reconnect_attempts}) reached for connection {shard.index}", level="error")
+                break
+
+            # Back off before reconnecting, briefly on the first attempt
+            shard.reconnect_attempts += 1
+            logger.log_websocket_event("RECONNECT", f"Attempting to reconnect connection {shard.index} (Attempt {shard.reconnect_attempts}/{self.max_reconnect_attempts})")
+            await asyncio.sleep(self.reconnect_delay * 2 ** (shard.reconnect_attempts - 1))
+
+    async def _read_stream(self, shard, stream):
+        """Read messages into the shard's queue until the connection drops"""
+        update_queue = shard.update_queue
+        while True:
+            message = await stream.recv()
+
+            if update_queue.policy == POLICY_BLOCK and update_queue.qsize() >= update_queue.maxsize:
+                # Stop reading until the processor makes room, TCP then pushes back on the feed
+                update_queue.blocked += 1
+                while update_queue.qsize() >= update_queue.maxsize and shard.active:
+                    shard.space.clear()
+                    await shard.space.wait()
+
+            self._on_data(stream, message, shard)
+            shard.wakeup.set()
+
+    async def _process_shard(self, shard):
+        """Process one connection's queued updates in batches whenever the reader wakes it"""
+        update_queue = shard.update_queue
+        loop = asyncio.get_running_loop()
+        logger.log_websocket_event("PROCESS", f"Tick processor task started for connection {shard.index} (batch size {self.process_batch_size})")
+
+        window_start = time.monotonic()
+        window_count = 0
+
+        while self.continue_iteration and shard.active:
+            try:
+                stamped = update_queue.get_batch_stamped(self.process_batch_size, timeout=0)
+            except queue.Empty:
+                shard.wakeup.clear()
+                try:
+                    await asyncio.wait_for(shard.wakeup.wait(), 1)
+                except asyncio.TimeoutError:
+                    shard.drain_rate = 0.0
+                    window_start = time.monotonic()
+                    window_count = 0
+                continue
+
+            batch = [message for message, _ in stamped]
+            try:
+                await loop.run_in_executor(self.executor, self._process_batch, batch,
+                                           [receive_ns for _, receive_ns in stamped], shard.latency)
+            except Exception as e:
+                self.error_count += 1
+                logger.log_websocket_event("PROCESS_ERROR", f"Error processing tick batch: {str(e)}", level="error")
+                logger.log_websocket_event("PROCESS_ERROR", traceback.format_exc(), level="error")
+
+            # Measure the drain rate over windows of about one second
+            shard.processed_count += len(batch)
+            shard.last_batch_size = len(batch)
+            window_count += len(batch)
+            elapsed = time.monotonic() - window_start
+            if elapsed >= 1.0:
+                shard.drain_rate = window_count / elapsed
+                window_start = time.monotonic()
+                window_count = 0
+
+            # Let the readers run between batches
+            shard.space.set()
+            await asyncio.sleep(0)
+
+    async def _health_loop(self):
+        """Send heartbeats and reconnect quiet connections on a timer"""
+        logger.log_websocket_event("HEALTH_CHECK", "Heartbeat timer started")
+        while self.health_check_running:
+            await asyncio.sleep(self.health_check_interval)
+            for shard in list(self.shards):
+                try:
+                    if not shard.connected:
+                        continue
+                    logger.log_websocket_event("HEARTBEAT", f"Sending ping on connection {shard.index}")
+                    shard.ws.send("ping")
+
+                    # Check for data freshness (if this connection carries symbols)
+                    if shard.symbols and shard.last_data_ns:
+                        time_since_data = (time.time_ns() - shard.last_data_ns) / 1e9
+                        if time_since_data > self.stale_data_seconds:
+                            logger.log_websocket_event("HEALTH_CHECK", f"No data received on connection {shard.index} for {time_since_data:.1f} seconds, reconnecting...", level="warning")
+                            await self._drop(shard)
+                except Exception as e:
+                    logger.log_websocket_event("HEALTH_CHECK_ERROR", f"Error in health check: {str(e)}", level="error")
+
+            # Check error count
+            if self.error_count > 10:
+                logger.log_websocket_event("HEALTH_CHECK", "Too many errors, reconnecting...", level="warning")
+                self.error_count = 0
+                for shard in list(self.shards):
+                    await self._drop(shard)
+
+    async def _drop(self, shard):
+        """Close a connection's socket so its connection task reconnects"""
+        shard.connected = False
+        shard.opened.clear()
+        if shard.ws is not None:
+            await shard.ws.close()
+
+    def reconnect(self, shard=None):
+        """Reconnect one pooled connection, or all of them, and wait for them to open"""
+        if shard is None:
+            if not self.shards:
+                return self.connect()
+            return all([self.reconnect(pooled) for pooled in list(self.shards)])
+
+        self._ensure_loop()
+        if shard.connection_task is None or shard.connection_task.done():
+            if shard.reconnect_attempts >= self.max_reconnect_attempts:
+                logger.log_websocket_event("RECONNECT_FAILED", f"Maximum reconnect attempts ({self.max_reconnect_attempts}) reached for connection {shard.index}", level="error")
+                return False
+            return self._connect_shards([shard])
+
+        self._run(self._drop(shard))
+        timeout = self.connect_timeout + self.reconnect_delay * 2 ** self.max_reconnect_attempts
+        return self._run(self._wait_open([shard], timeout))
+
+    def _on_close(self, wsapp, close_status_code=None, close_msg=None, shard=None):
+        """Connection tasks reconnect by themselves, only record the state"""
+        shard = shard or self._primary_shard()
+        shard.connected = False
+        if shard.disconnected_at is None:
+            shard.disconnected_at = time.monotonic()
+
+    def close_connection(self):
+        """Close all pooled WebSocket connections"""
+        task, self.health_task = self.health_task, None
+        if task is not None and not task.done():
+            self._cancel(task)
+        return super().close_connection()
+
+    def shutdown(self, timeout=5):
+        """Close every connection, cancel the processor tasks and stop the event loop thread"""
+        if self.loop is None:
+            return True
+        self.close_connection()
+        task, self.bar_timer_task = self.bar_timer_task, None
+        if task is not None and not task.done():
+            self._cancel(task)
+
+        async def cancel_all():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            self._run(cancel_all(), timeout)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop_thread.join(timeout)
+            stopped = not self.loop_thread.is_alive()
+            if stopped:
+                self.loop.close()
+                self.loop = None
+                self.loop_thread = None
+                for shard in self.shards:
+                    shard.reset_events()
+                self.executor.shutdown(wait=True)
+                self.executor = None
+            self.callback_dispatcher.stop()
+        logger.log_websocket_event("ASYNC", "Market data event loop stopped")
+        return stopped
+
+# Singleton instance, its event loop starts on the first connect()
+async_websocket_manager = AsyncAngelOneWebSocketManager()
@@ -0,0 +1,223 @@
+import os
+import re
+import mmap
+import struct
+import threading
+import numpy as np
+from app.helpers.bar_builder import BAR_DTYPE, NS_PER_SECOND, bars_to_dataframe
+from app.helpers.timeframe import parse_timeframe, normalize_timeframe
+from app.helpers.logger_helper import logger
+
+# File header: magic, format version, timeframe in seconds, committed bar count, synced-until time
+ARCHIVE_MAGIC = b'BARARCHV'
+ARCHIVE_VERSION = 1
+FILE_HEADER_STRUCT = struct.Struct('<8sIIqq')
+FILE_HEADER_SIZE = 32
+
+ARCHIVE_SUFFIX = '.bars'
+DEFAULT_EXCHANGE = 'NSE'
+
+_UNSAFE_NAME = re.compile(r'[^A-Za-z0-9_.&-]')
+
+
+class _ArchiveFile:
+    """
+    One memory-mapped file of BAR_DTYPE records for a (symbol, exchange, timeframe)
+
+    Records are kept in start order after the header. The header's count is written
+    after the records, so a crash during an append never leaves a partial bar visible.
+    A merge rewrites the records in place from the first one before the count is
+    committed, so a crash during a merge can leave them out of order; such a file has
+    to be deleted and downloaded again. `synced_until` is the epoch ns up to which the
+    file is known to hold every completed bar.
+    """
+
+    def __init__(self, path, timeframe, grow_bars):
+        self.path = path
+        self.timeframe = timeframe
+        self.grow_bars = grow_bars
+        self.lock = threading.Lock()
+
+        exists = os.path.exists(path) and os.path.getsize(path) >= FILE_HEADER_SIZE
+        if not exists:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self.file.truncate(FILE_HEADER_SIZE + grow_bars * BAR_DTYPE.itemsize)
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+
+        if exists:
+            magic, version, stored_timeframe, self.count, self.synced_until = FILE_HEADER_STRUCT.unpack_from(self.mm, 0)
+            if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION or stored_timeframe != timeframe:
+                self.close()
+                raise ValueError(f"{path} is not a version {ARCHIVE_VERSION} archive of {timeframe}s bars")
+        else:
+            self.count = 0
+            self.synced_until = 0
+            self._commit()
+
+    def bars(self):
+        """Copy of every stored bar (caller holds lock); no view outlives the call, so the file can grow"""
+        return np.frombuffer(self.mm, dtype=BAR_DTYPE, count=self.count, offset=FILE_HEADER_SIZE).copy()
+
+    def last_start(self):
+        """Start of the newest stored bar (caller holds lock)"""
+        if not self.count:
+            return None
+        offset = FILE_HEADER_SIZE + (self.count - 1) * BAR_DTYPE.itemsize
+        return struct.unpack_from('<q', self.mm, offset)[0]
+
+    def write(self, bars, offset_bars):
+        """Copy records in at a bar position and commit the new count (caller holds lock)"""
+        end = offset_bars + len(bars)
+        self._ensure_capacity(end)
+        start_byte = FILE_HEADER_SIZE + offset_bars * BAR_DTYPE.itemsize
+        self.mm[start_byte:start_byte + bars.nbytes] = bars.tobytes()
+        self.count = end
+        self._commit()
+
+    def _commit(self):
+        FILE_HEADER_STRUCT.pack_into(self.mm, 0, ARCHIVE_MAGIC, ARCHIVE_VERSION, self.timeframe, self.count, self.synced_until)
+
+    def _ensure_capacity(self, bars):
+        """Grow the file and its mapping in chunks of `grow_bars`"""
+        size = FILE_HEADER_SIZE + bars * BAR_DTYPE.itemsize
+        if size <= len(self.mm):
+            return
+        new_size = len(self.mm)
+        while new_size < size:
+            new_size += self.grow_bars * BAR_DTYPE.itemsize
+        self.mm.flush()
+        self.mm.close()
+        self.file.truncate(new_size)
+        self.mm = mmap.mmap(self.file.fileno(), new_size)
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.flush()
+            self.mm.close()
+            self.mm = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class BarArchive:
+    """
+    On-disk archive of completed bars, one memory-mapped file per symbol, exchange and timeframe
+
+    Files use the BAR_DTYPE layout of the in-memory bar rings, so live bars are stored
+    with one copy and a warm-up read is a single slice of the mapping. Files are
+    opened on first use and stay open. Writing bars that start before the newest
+    stored one merges them in by start time, later writes winning.
+    """
+
+    def __init__(self, directory=None, grow_bars=4096):
+        self.directory = directory or os.environ.get('BAR_ARCHIVE_DIR') or os.path.join(os.getcwd(), 'bars')
+        self.grow_bars = grow_bars
+        self.files = {}  # (symbol, exchange, timeframe) -> _ArchiveFile
+        self.lock = threading.Lock()  # Guards self.files only
+        self.bars_written = 0
+        self.bars_read = 0
+        self.merges = 0
+
+    def path(self, symbol, exchange, timeframe):
+        """File holding a series, <directory>/<exchange>/<symbol>/<timeframe label>.bars"""
+        parts = (exchange or DEFAULT_EXCHANGE, symbol, normalize_timeframe(timeframe) + ARCHIVE_SUFFIX)
+        return os.path.join(self.directory, *(_UNSAFE_NAME.sub('_', str(part)) for part in parts))
+
+    def _file(self, symbol, exchange, timeframe):
+        timeframe = parse_timeframe(timeframe)
+        key = (symbol, exchange or DEFAULT_EXCHANGE, timeframe)
+        archive_file = self.files.get(key)
+        if archive_file is None:
+            with self.lock:
+                archive_file = self.files.get(key)
+                if archive_file is None:
+                    archive_file = _ArchiveFile(self.path(symbol, exchange, timeframe), timeframe, self.grow_bars)
+                    self.files[key] = archive_file
+                    logger.log_app_event("BAR_ARCHIVE", f"Opened {archive_file.path} with {archive_file.count} bars")
+        return archive_file
+
+    def write(self, symbol, exchange, timeframe, bars, synced_until_ns=None, contiguous=False):
+        """
+        Store completed bars, returning the number of records written
+
+        Args:
+            bars (ndarray): BAR_DTYPE records in start order
+            synced_until_ns (int): Every bar completing before this epoch ns has now been
+                stored, e.g. the time a download covered up to
+            contiguous (bool): The bars are consecutive live bars; if the first one starts
+                inside the synced range, synced-until moves to the end of the last one
+        """
+        if not len(bars):
+            return 0
+        bars = np.asarray(bars, dtype=BAR_DTYPE)
+        archive_file = self._file(symbol, exchange, timeframe)
+        span_ns = archive_file.timeframe * NS_PER_SECOND
+        with archive_file.lock:
+            last_start = archive_file.last_start()
+            if last_start is None or bars['start'][0] > last_start:
+                # Live bars: a plain append
+                archive_file.write(bars, archive_file.count)
+            else:
+                # Older bars, e.g. a downloaded gap: merge by start, the new bars replace stored ones
+                combined = np.concatenate([bars, archive_file.bars()])
+                _, first = np.unique(combined['start'], return_index=True)
+                archive_file.write(combined[first], 0)
+                self.merges += 1
+
+            if contiguous and bars['start'][0] <= archive_file.synced_until:
+                synced_until_ns = max(synced_until_ns or 0, int(bars['start'][-1]) + span_ns)
+            if synced_until_ns is not None and synced_until_ns > archive_file.synced_until:
+                archive_file.synced_until = synced_until_ns
+                archive_file._commit()
+        self.bars_written += len(bars)
+        return len(bars)
+
+    def read(self, symbol, exchange, timeframe, start_ns=None, limit=None):
+        """Stored bars starting at or after `start_ns`, the last `limit` of them, oldest first"""
+        if not os.path.exists(self.path(symbol, exchange, timeframe)):
+            return np.zeros(0, dtype=BAR_DTYPE)
+        archive_file = self._file(symbol, exchange, timeframe)
+        with archive_file.lock:
+            stored = np.frombuffer(archive_file.mm, dtype=BAR_DTYPE, count=archive_file.count, offset=FILE_HEADER_SIZE)
+            first = np.searchsorted(stored['start'], start_ns) if start_ns is not None else 0
+            if limit is not None:
+                first = max(first, len(stored) - limit)
+            bars = stored[first:].copy()
+            del stored  # Release the view so the mapping can grow
+        self.bars_read += len(bars)
+        return bars
+
+    def get_dataframe(self, symbol, exchange, timeframe, start_ns=None, limit=None):
+        """Stored bars as a DataFrame like BarBuilder.get_bars() returns"""
+        return bars_to_dataframe(self.read(symbol, exchange, timeframe, start_ns, limit))
+
+    def synced_until(self, symbol, exchange, timeframe):
+        """Epoch ns up to which the archive holds every completed bar, 0 if it has none"""
+        if not os.path.exists(self.path(symbol, exchange, timeframe)):
+            return 0
+        archive_file = self._file(symbol, exchange, timeframe)
+        with archive_file.lock:
+            return archive_file.synced_until
+
+    def close(self):
+        with self.lock:
+            files, self.files = self.files, {}
+        for archive_file in files.values():
+            with archive_file.lock:
+                archive_file.close()
+
+    def get_stats(self):
+        return {
+            'directory': self.directory,
+            'open_files': len(self.files),
+            'bars_written': self.bars_written,
+            'bars_read': self.bars_read,
+            'merges': self.merges
+        }
+
+
+# Create a singleton instance
+bar_archive = BarArchive()
@@ -0,0 +1,456 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from app.helpers.timeframe import parse_timeframe, session_offset_ns
+
+NS_PER_SECOND = 1_000_000_000
+
+# Every symbol's bars above one minute are rolled up from its 1-minute base series
+BASE_TIMEFRAME = 60
+CASCADE_TIMEFRAMES = (180, 300, 600, 900, 1800, 3600, 86400)
+
+# One OHLCV bar; start is the bar's open time in epoch ns
+BAR_DTYPE = np.dtype([
+    ('start', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<i8'),
+    ('ticks', '<i8')
+])
+
+
+def local_offset_ns():
+    """Local UTC offset in ns, so bars line up with wall-clock minutes"""
+    return time.localtime().tm_gmtoff * NS_PER_SECOND
+
+
+def bars_to_dataframe(bars):
+    """
+    DataFrame of BAR_DTYPE records indexed by bar start in local wall-clock time, like resample_to_timeframe()
+    The columns share memory with `bars`, so read-only bars give a read-only DataFrame.
+    """
+    if not len(bars):
+        return pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'])
+    index = pd.DatetimeIndex((bars['start'] + local_offset_ns()).astype('datetime64[ns]'), name='timestamp')
+    return pd.DataFrame({name: bars[name] for name in BAR_DTYPE.names if name != 'start'}, index=index, copy=False)
+
+
+def dataframe_to_bars(data_df):
+    """
+    BAR_DTYPE records from an OHLCV DataFrame, the inverse of bars_to_dataframe()
+    A naive index is local wall-clock time, an aware one is converted. Candles without
+    a ticks column count zero ticks.
+    """
+    bars = np.zeros(len(data_df), dtype=BAR_DTYPE)
+    if not len(data_df):
+        return bars
+    index = data_df.index
+    if index.tz is not None:
+        bars['start'] = index.tz_convert('UTC').tz_localize(None).as_unit('ns').asi8
+    else:
+        bars['start'] = index.as_unit('ns').asi8 - local_offset_ns()
+    for name in ('open', 'high', 'low', 'close', 'volume', 'ticks'):
+        if name in data_df:
+            bars[name] = data_df[name].to_numpy()
+    return bars
+
+
+def append_bars(data_df, bars, window):
+    """
+    Append the bars newer than the last row of data_df, keeping at most `window` rows
+    Both are bar DataFrames in time order; the cost is bounded by the window, not the history.
+    """
+    if data_df.empty:
+        return bars.iloc[-window:]
+    if bars.empty:
+        return data_df
+    newer = bars[bars.index > data_df.index[-1]]
+    if newer.empty:
+        return data_df
+    keep = max(len(data_df) + len(newer) - window, 0)
+    return pd.concat([data_df.iloc[keep:], newer.iloc[-window:]])
+
+
+class BarSeries:
+    """
+    Bars of one symbol and timeframe, built one tick or one sub-bar at a time
+
+    The forming bar lives in plain attributes so an update costs a few comparisons.
+    Completed bars go into a fixed ring of BAR_DTYPE records; the oldest are
+    overwritten once `capacity` bars have completed. Empty intervals produce no bar.
+    The first bar completed is begun by whichever tick arrives first, usually mid
+    interval, so its start is kept as `partial_start`.
+    A series with a `source` is rolled up from that series' completed bars instead
+    of from ticks.
+    """
+
+    def __init__(self, symbol, timeframe, capacity=1000, offset_ns=None, source=None, exchange=None):
+        if timeframe <= 0:
+            raise ValueError("timeframe must be a positive number of seconds")
+
+        self.symbol = symbol
+        self.exchange = exchange
+        self.timeframe = timeframe  # Seconds
+        self.span_ns = int(timeframe * NS_PER_SECOND)
+        self.offset_ns = local_offset_ns() if offset_ns is None else offset_ns
+        self.source = source  # BarSeries this one rolls up, None when built from ticks
+        self.lock = threading.Lock()
+        self.callbacks = []  # Notified with (bar, symbol) when a bar completes
+        self.bars = np.zeros(capacity, dtype=BAR_DTYPE)
+        self.capacity = capacity
+        self.count = 0  # Bars completed so far, the ring keeps the last `capacity`
+        self.completed = np.zeros(0, dtype=BAR_DTYPE)  # Read-only ordered copy of the ring, shared by readers
+        self.completed_count = 0  # self.count when `completed` was taken
+        self.late_ticks = 0
+        self.last_start = None  # Start of the newest completed bar
+        self.partial_start = None  # Start of the first completed bar, begun by whichever tick came first
+        self.start = None  # Forming bar, None until the first update
+        self.open = self.high = self.low = self.close = np.nan
+        self.volume = 0
+        self.ticks = 0
+
+    def bucket_start(self, timestamp):
+        """Start of the interval containing an epoch ns timestamp"""
+        return timestamp - (timestamp + self.offset_ns) % self.span_ns
+
+    def update(self, timestamp, price, volume):
+        """
+        Apply one tick, returning the bar it completed (a dict) or None
+
+        Args:
+            timestamp (int): Epoch ns
+            price (float): Traded price
+            volume (int): Volume traded since the previous tick, not the day's cumulative volume
+        """
+        start = self.bucket_start(timestamp)
+        with self.lock:
+            if start == self.start:
+                if price > self.high:
+                    self.high = price
+                if price < self.low:
+                    self.low = price
+                self.close = price
+                self.volume += volume
+                self.ticks += 1
+                return None
+
+            if (self.start is not None and start < self.start) or (self.last_start is not None and start <= self.last_start):
+                # A tick for a bar that already completed only carries its volume into the next one
+                self.late_ticks += 1
+                self.volume += volume
+                return None
+
+            closed = self._complete() if self.start is not None else None
+            self.start = start
+            self.open = self.high = self.low = self.close = price
+            self.volume += volume
+            self.ticks = 1
+            return closed
+
+    def merge(self, bar, next_start=None):
+        """
+        Fold a completed bar of the source series into this one
+
+        `next_start` is the start of the source's new forming bar; once it lies in a later
+        interval the forming bar here is complete and is returned without waiting for
+        the next source bar. Returns a list of completed bars.
+        """
+        start = self.bucket_start(bar['start'])
+        closed = []
+        with self.lock:
+            if start == self.start:
+                if bar['high'] > self.high:
+                    self.high = bar['high']
+                if bar['low'] < self.low:
+                    self.low = bar['low']
+                self.close = bar['close']
+                self.volume += bar['volume']
+                self.ticks += bar['ticks']
+            elif (self.start is not None and start < self.start) or (self.last_start is not None and start <= self.last_start):
+                self.late_ticks += bar['ticks']
+                self.volume += bar['volume']
+            else:
+                if self.start is not None:
+                    closed.append(self._complete())
+                self.start = start
+                self.open, self.high, self.low, self.close = bar['open'], bar['high'], bar['low'], bar['close']
+                self.volume += bar['volume']
+                self.ticks = bar['ticks']
+
+            if next_start is not None and self.start is not None and self.bucket_start(next_start) > self.start:
+                closed.append(self._complete())
+                self._reset()
+        return closed
+
+    def close_due(self, now_ns):
+        """Complete the forming bar if its interval ended before `now_ns`, returning it or None"""
+        with self.lock:
+            if self.start is None or now_ns < self.start + self.span_ns:
+                return None
+            closed = self._complete()
+            self._reset()
+            return closed
+
+    def _complete(self):
+        """Move the forming bar into the ring (caller holds lock)"""
+        record = (self.start, self.open, self.high, self.low, self.close, self.volume, self.ticks)
+        self.bars[self.count % self.capacity] = record
+        if not self.count:
+            self.partial_start = self.start
+        self.count += 1
+        self.last_start = self.start
+        self.volume = 0
+        self.ticks = 0
+        return dict(zip(BAR_DTYPE.names, record), timeframe=self.timeframe)
+
+    def _reset(self):
+        """Leave no forming bar until the next update (caller holds lock)"""
+        self.start = None
+        self.open = self.high = self.low = self.close = np.nan
+
+    def forming(self):
+        """
+        The bar still being built as a dict, or None
+        For a rolled-up series this includes the source's forming bar.
+        """
+        partial = self.source.forming() if self.source is not None else None
+        with self.lock:
+            if self.start is None:
+                bar = None
+            else:
+                bar = dict(zip(BAR_DTYPE.names, (self.start, self.open, self.high, self.low, self.close, self.volume, self.ticks)),
+                           timeframe=self.timeframe)
+        if partial is None:
+            return bar
+
+        start = self.bucket_start(partial['start'])
+        if bar is None:
+            return dict(partial, start=start, timeframe=self.timeframe)
+        if start == bar['start']:
+            bar['high'] = max(bar['high'], partial['high'])
+            bar['low'] = min(bar['low'], partial['low'])
+            bar['close'] = partial['close']
+            bar['volume'] += partial['volume']
+            bar['ticks'] += partial['ticks']
+        return bar
+
+    def get_completed(self):
+        """
+        Every stored completed bar, oldest first, as a read-only array
+        The copy is only taken again after a new bar completes, so every reader in
+        between shares it.
+        """
+        with self.lock:
+            if self.completed_count != self.count:
+                stored = min(self.count, self.capacity)
+                completed = self.bars[np.arange(self.count - stored, self.count) % self.capacity]
+                completed.flags.writeable = False
+                self.completed = completed
+                self.completed_count = self.count
+            return self.completed
+
+    def get_bars(self, limit=None, include_forming=False):
+        """The last `limit` bars, oldest first: completed ones, optionally followed by the forming bar"""
+        completed = self.get_completed()
+        forming = self.forming() if include_forming else None
+        if forming is not None:
+            if limit is not None and limit <= 0:
+                return completed[:0]
+            keep = len(completed) if limit is None else min(len(completed), limit - 1)
+            record = np.array([tuple(forming[name] for name in BAR_DTYPE.names)], dtype=BAR_DTYPE)
+            return np.concatenate([completed[len(completed) - keep:], record])
+        if limit is not None:
+            return completed[max(len(completed) - limit, 0):] if limit > 0 else completed[:0]
+        return completed
+
+
+class BarBuilder:
+    """
+    Incremental OHLCV bars for every tracked (symbol, timeframe)
+
+    Ticks carry the day's cumulative traded volume, so the builder keeps the last
+    cumulative value per symbol and gives each bar the difference. A drop in the
+    cumulative value means a new session, and the new value counts as traded.
+    The first tick seen for a symbol adds no volume, since it is not known how much
+    of its total fell into the current bar.
+
+    Timeframes that are whole minutes are rolled up from one 1-minute base series
+    per symbol, so each is computed once however many readers share it. Other
+    timeframes are built from ticks. Timeframes are anything parse_timeframe()
+    accepts; intraday bars start at the exchange session open, daily bars at midnight.
+    """
+
+    def __init__(self, capacity=1000, offset_ns=None):
+        self.capacity = capacity  # Completed bars kept per series
+        self.offset_ns = offset_ns  # Fixed bar alignment for every series, session-anchored when None
+        self.series = {}  # (symbol, timeframe) -> BarSeries
+        self.symbol_series = {}  # symbol -> tuple of its tick-driven BarSeries, read without the lock on every tick
+        self.rollups = {}  # symbol -> tuple of BarSeries rolled up from its base series
+        self.last_volume = {}  # symbol -> last cumulative volume seen
+        self.lock = threading.Lock()
+        self.closed_count = 0
+
+    def track(self, symbol, timeframe, callback=None, exchange=None):
+        """
+        Start building bars of a timeframe for a symbol; callback(bar, symbol) runs on each completed bar
+        `exchange` picks the session open new series are aligned to.
+        """
+        timeframe = parse_timeframe(timeframe)
+        with self.lock:
+            series = self._series(symbol, timeframe, exchange)
+            if callback is not None and callback not in series.callbacks:
+                series.callbacks = series.callbacks + [callback]
+            return series
+
+    def track_cascade(self, symbol, callback=None, timeframes=CASCADE_TIMEFRAMES, exchange=None):
+        """Track the 1-minute base series and every cascade timeframe, returning seconds -> BarSeries"""
+        tracked = {}
+        for timeframe in (BASE_TIMEFRAME,) + tuple(timeframes):
+            series = self.track(symbol, timeframe, callback, exchange)
+            tracked[series.timeframe] = series
+        return tracked
+
+    def _series(self, symbol, timeframe, exchange=None):
+        """Existing or new series (caller holds lock)"""
+        series = self.series.get((symbol, timeframe))
+        if series is not None:
+            return series
+
+        offset_ns = self.offset_ns if self.offset_ns is not None else session_offset_ns(timeframe, exchange)
+        if timeframe > BASE_TIMEFRAME and timeframe % BASE_TIMEFRAME == 0:
+            source = self._series(symbol, BASE_TIMEFRAME, exchange)
+            series = BarSeries(symbol, timeframe, self.capacity, offset_ns=offset_ns, source=source, exchange=exchange)
+        else:
+            series = BarSeries(symbol, timeframe, self.capacity, offset_ns=offset_ns, exchange=exchange)
+        self.series[(symbol, timeframe)] = series
+        self._index(symbol)
+        return series
+
+    def _index(self, symbol):
+        """Rebuild a symbol's lookup tuples (caller holds lock)"""
+        tracked = [series for key, series in self.series.items() if key[0] == symbol]
+        ticks = tuple(series for series in tracked if series.source is None)
+        rollups = tuple(sorted((series for series in tracked if series.source is not None), key=lambda series: series.timeframe))
+        if ticks:
+            self.symbol_series[symbol] = ticks
+        else:
+            self.symbol_series.pop(symbol, None)
+            self.last_volume.pop(symbol, None)
+        if rollups:
+            self.rollups[symbol] = rollups
+        else:
+            self.rollups.pop(symbol, None)
+
+    def untrack(self, symbol, timeframe=None, callback=None):
+        """
+        Remove a callback, or stop building a symbol's bars
+        Without a callback the series is dropped; without a timeframe every series of the symbol is.
+        The base series stays while rolled-up series depend on it.
+        """
+        timeframe = parse_timeframe(timeframe) if timeframe is not None else None
+        with self.lock:
+            keys = [key for key in self.series if key[0] == symbol and (timeframe is None or key[1] == timeframe)]
+            for key in keys:
+                series = self.series[key]
+                if callback is not None:
+                    series.callbacks = [cb for cb in series.callbacks if cb != callback]
+                    continue
+                del self.series[key]
+            rollups = [series for key, series in self.series.items() if key[0] == symbol and series.source is not None]
+            if callback is None and (symbol, BASE_TIMEFRAME) in keys and rollups:
+                base = rollups[0].source
+                base.callbacks = []
+                self.series[(symbol, BASE_TIMEFRAME)] = base
+            self._index(symbol)
+            return bool(keys)
+
+    def is_tracked(self, symbol):
+        return symbol in self.symbol_series
+
+    def on_tick(self, symbol, timestamp, price, cumulative_volume):
+        """
+        Apply a tick to every series of its symbol
+
+        Returns a list of (series, bar) for the bars the tick completed, rolled-up
+        series included.
+        """
+        series_list = self.symbol_series.get(symbol)
+        if not series_list:
+            return []
+
+        # Per-tick volume from the cumulative total, computed once for all timeframes
+        last = self.last_volume.get(symbol)
+        self.last_volume[symbol] = cumulative_volume
+        if last is None:
+            volume = 0
+        elif cumulative_volume >= last:
+            volume = cumulative_volume - last
+        else:
+            volume = cumulative_volume
+
+        closed = []
+        for series in series_list:
+            bar = series.update(timestamp, price, volume)
+            if bar is not None:
+                closed.append((series, bar))
+                if series.timeframe == BASE_TIMEFRAME:
+                    # A new minute started: roll the finished one up once per minute, not per tick
+                    closed.extend(self._roll_up(symbol, bar, series.start))
+        self.closed_count += len(closed)
+        return closed
+
+    def _roll_up(self, symbol, bar, next_start=None):
+        closed = []
+        for series in self.rollups.get(symbol, ()):
+            closed.extend((series, rolled) for rolled in series.merge(bar, next_start))
+        return closed
+
+    def close_due(self, now_ns=None):
+        """Complete every forming bar whose interval has ended, returning (series, bar) pairs"""
+        now_ns = time.time_ns() if now_ns is None else now_ns
+        closed = []
+        # Tick-driven series first, so the minutes they complete reach the roll-ups below
+        for symbol, series_list in list(self.symbol_series.items()):
+            for series in series_list:
+                bar = series.close_due(now_ns)
+                if bar is not None:
+                    closed.append((series, bar))
+                    if series.timeframe == BASE_TIMEFRAME:
+                        closed.extend(self._roll_up(symbol, bar))
+        for series_list in list(self.rollups.values()):
+            for series in series_list:
+                bar = series.close_due(now_ns)
+                if bar is not None:
+                    closed.append((series, bar))
+        self.closed_count += len(closed)
+        return closed
+
+    def get_series(self, symbol, timeframe):
+        return self.series.get((symbol, parse_timeframe(timeframe)))
+
+    def get_bars(self, symbol, timeframe, limit=None, include_forming=False):
+        """
+        Completed bars (plus the forming one if asked) as a DataFrame; empty if not tracked
+        Completed bars are shared between readers and cannot be modified in place.
+        """
+        series = self.get_series(symbol, timeframe)
+        if series is None:
+            return bars_to_dataframe(np.empty(0, dtype=BAR_DTYPE))
+        return bars_to_dataframe(series.get_bars(limit, include_forming))
+
+    def get_forming_bar(self, symbol, timeframe):
+        series = self.get_series(symbol, timeframe)
+        return series.forming() if series is not None else None
+
+    def get_stats(self):
+        series_list = list(self.series.values())
+        return {
+            'series': len(series_list),
+            'rolled_up': sum(1 for series in series_list if series.source is not None),
+            'symbols': len(self.symbol_series),
+            'closed_bars': self.closed_count,
+            'late_ticks': sum(series.late_ticks for series in series_list)
+        }
@@ -0,0 +1,98 @@
+import threading
+import time
+from app.helpers.timeframe import parse_timeframe, session_offset_ns
+from app.helpers.bar_builder import NS_PER_SECOND
+
+# Why a runner woke up
+WAKE_BAR = 'bar'  # A bar of its timeframe completed
+WAKE_INTRABAR = 'intrabar'  # The intra-bar cadence elapsed
+WAKE_CLOCK = 'clock'  # A bar should have completed by now but no event came, e.g. no WebSocket feed
+WAKE_STOPPED = 'stopped'
+
+
+class BarTrigger:
+    """
+    Wakes a strategy runner when a bar of its timeframe completes
+
+    on_bar() is registered as a bar callback and wakes the waiting runner as soon as
+    the bar builder completes a bar. When no event comes, the runner still wakes
+    `clock_delay` seconds after each bar should have ended, so it can fall back to
+    downloaded candles. With an intra-bar interval it also wakes that many seconds
+    into the forming bar. Between wakes the runner blocks, using no CPU.
+    """
+
+    def __init__(self, timeframe, exchange=None, intrabar_interval=None, clock_delay=5.0):
+        self.timeframe = parse_timeframe(timeframe)
+        self.span_ns = self.timeframe * NS_PER_SECOND
+        self.offset_ns = session_offset_ns(self.timeframe, exchange)
+        self.intrabar_interval = intrabar_interval or None  # Seconds, None to run on completed bars only
+        self.clock_delay = clock_delay
+        self.event = threading.Event()  # Set by a completed bar or stop()
+        self.stopped = threading.Event()
+        self.last_bar = None  # Newest completed bar delivered by the bar builder
+        self.bar_wakes = 0
+        self.intrabar_wakes = 0
+        self.clock_wakes = 0
+        self.last_wake_ns = None
+        self.last_latency_ns = None  # From the end of the last completed bar to the runner waking
+
+    def on_bar(self, bar, symbol):
+        """Bar callback: wake the runner"""
+        self.last_bar = bar
+        self.event.set()
+
+    def stop(self):
+        """Wake the runner for good, so it exits without waiting for the next bar"""
+        self.stopped.set()
+        self.event.set()
+
+    def is_stopped(self):
+        return self.stopped.is_set()
+
+    def next_close_ns(self, now_ns):
+        """End of the interval containing an epoch ns timestamp"""
+        return now_ns - (now_ns + self.offset_ns) % self.span_ns + self.span_ns
+
+    def wait(self, now_ns=None):
+        """Block until the next bar, intra-bar tick or stop; returns one of the WAKE_* reasons"""
+        now_ns = time.time_ns() if now_ns is None else now_ns
+        deadline_ns = self.next_close_ns(now_ns) + int(self.clock_delay * NS_PER_SECOND)
+        reason = WAKE_CLOCK
+        if self.intrabar_interval:
+            intrabar_ns = now_ns + int(self.intrabar_interval * NS_PER_SECOND)
+            if intrabar_ns < deadline_ns:
+                deadline_ns = intrabar_ns
+                reason = WAKE_INTRABAR
+
+        woken = self.event.wait(max(deadline_ns - now_ns, 0) / NS_PER_SECOND)
+        if woken:
+            # After a timeout the event is left alone: a bar completing just now wakes the next wait()
+            self.event.clear()
+        self.last_wake_ns = time.time_ns()
+        if self.stopped.is_set():
+            return WAKE_STOPPED
+        if woken:
+            self.bar_wakes += 1
+            bar = self.last_bar
+            if bar is not None:
+                self.last_latency_ns = self.last_wake_ns - (int(bar['start']) + self.span_ns)
+            return WAKE_BAR
+        if reason == WAKE_INTRABAR:
+            self.intrabar_wakes += 1
+        else:
+            self.clock_wakes += 1
+        return reason
+
+    def pause(self, seconds):
+        """Sleep unless stopped first, e.g. to back off after an error"""
+        self.stopped.wait(seconds)
+
+    def get_stats(self):
+        return {
+            'timeframe': self.timeframe,
+            'intrabar_interval': self.intrabar_interval,
+            'bar_wakes': self.bar_wakes,
+            'intrabar_wakes': self.intrabar_wakes,
+            'clock_wakes': self.clock_wakes,
+            'last_latency_ms': round(self.last_latency_ns / 1e6, 3) if self.last_latency_ns is not None else None
+        }
@@ -0,0 +1,241 @@
+import threading
+import time
+import queue
+import traceback
+from collections import deque
+from app.helpers.logger_helper import logger
+
+# Delivery policies
+POLICY_ALL = 'all'  # Deliver every tick in order, dropping the oldest once the queue is full
+POLICY_LATEST = 'latest'  # Deliver only the newest pending tick per symbol
+POLICIES = (POLICY_ALL, POLICY_LATEST)
+
+
+class Subscriber:
+    """
+    A callback with its own bounded pending queue and delivery metrics
+
+    At most one worker drains a subscriber at a time, so each callback sees its
+    ticks in arrival order and is never called concurrently with itself.
+    """
+
+    def __init__(self, callback, policy=POLICY_ALL, max_queue=1000):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown callback policy: {policy}")
+        if max_queue <= 0:
+            raise ValueError("max_queue must be positive")
+
+        self.callback = callback
+        self.name = getattr(callback, '__qualname__', None) or repr(callback)
+        self.policy = policy
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        self.scheduled = False  # True while queued for, or being drained by, a worker
+        self.pending = deque()  # (tick, symbol, enqueue time) for POLICY_ALL
+        self.latest = {}  # symbol -> (tick, enqueue time) for POLICY_LATEST
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def __len__(self):
+        return len(self.pending) + len(self.latest)
+
+    def offer(self, tick, symbol, now):
+        """Queue a tick (caller holds lock); the oldest tick is dropped when the queue is full"""
+        if self.policy == POLICY_LATEST:
+            if symbol in self.latest:
+                self.conflated += 1
+                # Move the symbol to the back so symbols are delivered in update order
+                del self.latest[symbol]
+            elif len(self.latest) >= self.max_queue:
+                del self.latest[next(iter(self.latest))]
+                self.dropped += 1
+            self.latest[symbol] = (tick, now)
+        else:
+            if len(self.pending) >= self.max_queue:
+                self.pending.popleft()
+                self.dropped += 1
+            self.pending.append((tick, symbol, now))
+
+    def take(self, limit):
+        """Remove up to `limit` queued ticks (caller holds lock)"""
+        items = []
+        if self.policy == POLICY_LATEST:
+            while self.latest and len(items) < limit:
+                symbol = next(iter(self.latest))
+                tick, enqueued = self.latest.pop(symbol)
+                items.append((tick, symbol, enqueued))
+        else:
+            while self.pending and len(items) < limit:
+                items.append(self.pending.popleft())
+        return items
+
+    def get_stats(self):
+        """Get delivery metrics for this subscriber"""
+        return {
+            'name': self.name,
+            'policy': self.policy,
+            'max_queue': self.max_queue,
+            'pending': len(self),
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'conflated': self.conflated,
+            'errors': self.errors,
+            'last_lag_ms': round(self.last_lag * 1000, 3),
+            'max_lag_ms': round(self.max_lag * 1000, 3)
+        }
+
+
+class CallbackDispatcher:
+    """
+    Deliver ticks to subscriber callbacks on a pool of worker threads
+
+    dispatch() only appends to the subscribers' queues, so the tick processor never
+    waits on callback code. Subscribers with pending ticks are handed to the workers
+    through a shared ready queue.
+    """
+
+    def __init__(self, workers=4, max_queue=1000, policy=POLICY_ALL, drain_limit=100):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown callback policy: {policy}")
+
+        self.workers = workers
+        self.max_queue = max_queue  # Default pending queue size per subscriber
+        self.policy = policy  # Default policy for new subscribers
+        self.drain_limit = drain_limit  # Max ticks a worker delivers before yielding a subscriber
+        self.subscribers = {}  # callback -> Subscriber
+        self.lock = threading.Lock()
+        self.ready = queue.Queue()  # Subscribers waiting for a worker
+        self.threads = []
+        self.running = False
+
+    def start(self):
+        """Start the worker threads if they are not running"""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"CallbackWorker-{i}")
+                thread.daemon = True
+                thread.start()
+                self.threads.append(thread)
+        logger.log_websocket_event("DISPATCH", f"Callback dispatcher started with {self.workers} workers")
+
+    def stop(self):
+        """Stop the worker threads once they finish their current subscriber"""
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+            threads = self.threads
+        for _ in threads:
+            self.ready.put(None)
+
+    def subscriber(self, callback):
+        """Return the Subscriber for a callback, creating it with the default policy"""
+        subscriber = self.subscribers.get(callback)
+        if subscriber is None:
+            with self.lock:
+                subscriber = self.subscribers.get(callback)
+                if subscriber is None:
+                    subscriber = self.subscribers[callback] = Subscriber(callback, self.policy, self.max_queue)
+        return subscriber
+
+    def set_policy(self, callback, policy, max_queue=None):
+        """Change a callback's delivery policy and queue size; pending ticks are kept"""
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown callback policy: {policy}")
+        if max_queue is not None and max_queue <= 0:
+            raise ValueError("max_queue must be positive")
+
+        subscriber = self.subscriber(callback)
+        with subscriber.lock:
+            items = subscriber.take(len(subscriber))
+            subscriber.policy = policy
+            if max_queue is not None:
+                subscriber.max_queue = max_queue
+            for tick, symbol, enqueued in items:
+                subscriber.offer(tick, symbol, enqueued)
+        return subscriber
+
+    def remove(self, callback):
+        """Forget a callback and discard its pending ticks"""
+        with self.lock:
+            subscriber = self.subscribers.pop(callback, None)
+        if subscriber is not None:
+            with subscriber.lock:
+                subscriber.take(len(subscriber))
+
+    def dispatch(self, deliveries):
+        """
+        Queue ticks for delivery without running any callback
+
+        Args:
+            deliveries (list): (callbacks, tick, symbol) tuples
+        """
+        if not self.running:
+            self.start()
+
+        now = time.monotonic()
+        for callbacks, tick, symbol in deliveries:
+            for callback in callbacks:
+                subscriber = self.subscriber(callback)
+                with subscriber.lock:
+                    subscriber.offer(tick, symbol, now)
+                    if subscriber.scheduled:
+                        continue
+                    subscriber.scheduled = True
+                self.ready.put(subscriber)
+
+    def _worker(self):
+        """Deliver queued ticks for one ready subscriber at a time"""
+        while True:
+            subscriber = self.ready.get()
+            if subscriber is None:
+                return
+
+            with subscriber.lock:
+                items = subscriber.take(self.drain_limit)
+
+            for tick, symbol, enqueued in items:
+                lag = time.monotonic() - enqueued
+                subscriber.last_lag = lag
+                if lag > subscriber.max_lag:
+                    subscriber.max_lag = lag
+                try:
+                    subscriber.callback(tick, symbol)
+                    subscriber.delivered += 1
+                except Exception as callback_err:
+                    subscriber.errors += 1
+                    logger.log_websocket_event("CALLBACK_ERROR", f"Callback error for {symbol}: {str(callback_err)}", level="error")
+                    logger.log_websocket_event("CALLBACK_ERROR", traceback.format_exc(), level="debug")
+
+            # Requeue behind other subscribers if more ticks arrived meanwhile
+            with subscriber.lock:
+                if len(subscriber):
+                    requeue = True
+                else:
+                    subscriber.scheduled = False
+                    requeue = False
+            if requeue:
+                self.ready.put(subscriber)
+
+    def get_stats(self):
+        """Get dispatcher metrics with a per-subscriber breakdown"""
+        subscribers = [subscriber.get_stats() for subscriber in list(self.subscribers.values())]
+        return {
+            'workers': self.workers,
+            'running': self.running,
+            'ready': self.ready.qsize(),
+            'pending': sum(stats['pending'] for stats in subscribers),
+            'delivered': sum(stats['delivered'] for stats in subscribers),
+            'dropped': sum(stats['dropped'] for stats in subscribers),
+            'conflated': sum(stats['conflated'] for stats in subscribers),
+            'max_lag_ms': max((stats['max_lag_ms'] for stats in subscribers), default=0.0),
+            'subscribers': subscribers
+        }
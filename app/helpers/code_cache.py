@@ -0,0 +1,155 @@
+import os
+import hashlib
+import marshal
+import struct
+import threading
+import time
+import importlib.util
+from collections import OrderedDict
+from app.helpers.logger_helper import logger
+
+# On-disk entry: interpreter bytecode magic, seconds the compile took, then the marshalled code object
+DISK_HEADER_STRUCT = struct.Struct('<4sd')
+DISK_SUFFIX = '.code'
+
+
+def source_key(source):
+    """Cache key of a strategy's source text"""
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+class CodeCache:
+    """
+    Process-wide cache of compiled strategy code, keyed by a hash of the source
+
+    Code objects are kept in memory with least-recently-used eviction and, when a
+    directory is set, marshalled to disk so a restarted process skips compiling too.
+    Disk entries are tagged with the interpreter's bytecode magic and ignored by other
+    Python versions. Edited code hashes to a new key, so a stale entry is never used;
+    invalidate() only frees it.
+    """
+
+    def __init__(self, capacity=128, directory=None):
+        self.capacity = capacity
+        self.directory = directory
+        self.entries = OrderedDict()  # key -> (code object, seconds its compile took)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.compile_seconds = 0.0  # Spent compiling
+        self.saved_seconds = 0.0  # Compile time avoided by hits
+
+    def get(self, source, filename='<strategy>'):
+        """
+        Compiled code for a source text, compiling it on a miss
+
+        Returns (code, info) where info is a dict with the tier it came from
+        ('memory', 'disk' or 'compiled'), compile_ms spent and saved_ms avoided.
+        SyntaxError propagates as from compile().
+        """
+        key = source_key(source)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry[1]
+                return entry[0], {'source': 'memory', 'compile_ms': 0.0, 'saved_ms': round(entry[1] * 1000, 3)}
+
+        entry = self._load(key)
+        if entry is not None:
+            tier = 'disk'
+        else:
+            started = time.perf_counter()
+            code = compile(source, filename, 'exec')
+            entry = (code, time.perf_counter() - started)
+            tier = 'compiled'
+            self._save(key, entry)
+
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            if tier == 'disk':
+                self.disk_hits += 1
+                self.saved_seconds += entry[1]
+            else:
+                self.misses += 1
+                self.compile_seconds += entry[1]
+
+        if tier == 'disk':
+            return entry[0], {'source': tier, 'compile_ms': 0.0, 'saved_ms': round(entry[1] * 1000, 3)}
+        return entry[0], {'source': tier, 'compile_ms': round(entry[1] * 1000, 3), 'saved_ms': 0.0}
+
+    def invalidate(self, source):
+        """Drop the entry of a source text, in memory and on disk"""
+        key = source_key(source)
+        with self.lock:
+            self.entries.pop(key, None)
+        if self.directory:
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.log_app_event("CODE_CACHE_ERROR", f"Error removing cached code {key}: {str(e)}", "error")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + DISK_SUFFIX)
+
+    def _load(self, key):
+        """Entry from the disk tier, or None"""
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            magic, seconds = DISK_HEADER_STRUCT.unpack_from(data, 0)
+            if magic != importlib.util.MAGIC_NUMBER:
+                return None
+            return marshal.loads(data[DISK_HEADER_STRUCT.size:]), seconds
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.log_app_event("CODE_CACHE_ERROR", f"Ignoring unreadable cached code {key}: {str(e)}", "warning")
+            return None
+
+    def _save(self, key, entry):
+        """Write an entry to the disk tier; a partial file is never visible under the final name"""
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            path = self._path(key)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(DISK_HEADER_STRUCT.pack(importlib.util.MAGIC_NUMBER, entry[1]))
+                f.write(marshal.dumps(entry[0]))
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.log_app_event("CODE_CACHE_ERROR", f"Error writing cached code {key}: {str(e)}", "error")
+
+    def get_stats(self):
+        return {
+            'entries': len(self.entries),
+            'capacity': self.capacity,
+            'directory': self.directory,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'compile_ms': round(self.compile_seconds * 1000, 3),
+            'saved_ms': round(self.saved_seconds * 1000, 3)
+        }
+
+
+# Create a singleton instance
+code_cache = CodeCache(directory=os.environ.get('STRATEGY_CODE_CACHE_DIR') or os.path.join(os.getcwd(), 'code_cache'))
@@ -0,0 +1,42 @@
+import fcntl
+import os
+import tempfile
+
+# Held by whichever process has the AngelOne WebSocket open, so a host keeps one broker connection
+DEFAULT_CONNECTION_LOCK_PATH = os.environ.get('MARKET_DATA_CONNECTION_LOCK', os.path.join(tempfile.gettempdir(), 'algotrade_broker_connection.lock'))
+
+
+class HostLock:
+    """Exclusive flock() on a file; the kernel drops it when the holding process exits"""
+
+    def __init__(self, path=DEFAULT_CONNECTION_LOCK_PATH):
+        self.path = path
+        self.fd = None
+
+    def acquire(self):
+        """Take the lock, returning False if another process holds it"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        # Record the owner for anyone inspecting the file
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode('ascii'))
+        self.fd = fd
+        return True
+
+    def owner(self):
+        """PID written by the current holder, or None"""
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def release(self):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
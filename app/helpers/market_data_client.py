@@ -0,0 +1,346 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from app.helpers.tick_buffer import TickRingBuffer
+from app.helpers.tick_bus import TickBusReader, DEFAULT_BUS_NAME, KIND_TICK, KIND_BAR
+from app.helpers.bar_builder import BAR_DTYPE, bars_to_dataframe
+from app.helpers.timeframe import parse_timeframe
+
+# Where the market data daemon listens and the lock that keeps it to one per host
+DEFAULT_SOCKET_PATH = os.environ.get('MARKET_DATA_SOCKET', os.path.join(tempfile.gettempdir(), 'algotrade_market_data.sock'))
+DEFAULT_LOCK_PATH = os.environ.get('MARKET_DATA_LOCK', os.path.join(tempfile.gettempdir(), 'algotrade_market_data.lock'))
+
+# Status fields sent as ISO strings and turned back into datetimes by the client
+DATETIME_FIELDS = ('last_data_time',)
+
+
+class MarketDataError(Exception):
+    """The daemon could not be reached or reported an error"""
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_message(message):
+    """One newline-terminated JSON document per request or response"""
+    return (json.dumps(message, default=_json_default) + "\n").encode('utf-8')
+
+
+def decode_message(line):
+    return json.loads(line.decode('utf-8'))
+
+
+class MarketDataClient:
+    """
+    Client of the market data daemon over its Unix socket
+
+    Mirrors the parts of AngelOneWebSocketManager the web app uses, so a controller
+    can work with either through get_market_data(). One connection is kept open and
+    requests on it are serialized; a broken connection is reopened on the next call.
+
+    When the daemon publishes a tick bus, the client follows it and answers tick and
+    bar reads from what it has read there, going over the socket only for history
+    from before it started following.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=10, tick_bus_name=DEFAULT_BUS_NAME, bus_capacity=1000):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.sock = None
+        self.stream = None
+        self.lock = threading.Lock()
+        self.last_error = None
+
+        self.tick_bus_name = tick_bus_name  # None reads everything over the socket
+        self.bus_capacity = bus_capacity  # Ticks and bars kept per symbol from the bus
+        self.bus_reader = None
+        self.bus_lock = threading.Lock()
+        self.bus_ticks = {}  # symbol -> TickRingBuffer of the ticks read from the bus
+        self.bus_bars = {}  # (symbol, timeframe) -> BAR_DTYPE bars read from the bus
+
+    def call(self, method, **params):
+        """Send one request and return its result, raising MarketDataError on failure"""
+        with self.lock:
+            try:
+                if self.sock is None:
+                    self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    self.sock.settimeout(self.timeout)
+                    self.sock.connect(self.socket_path)
+                    self.stream = self.sock.makefile('rb')
+                self.sock.sendall(encode_message({'method': method, 'params': params}))
+                line = self.stream.readline()
+                if not line:
+                    raise ConnectionError("market data daemon closed the connection")
+                response = decode_message(line)
+            except (OSError, ValueError) as e:
+                self._disconnect()
+                self.last_error = str(e)
+                raise MarketDataError(f"Market data daemon unavailable at {self.socket_path}: {str(e)}")
+
+        if not response.get('ok'):
+            self.last_error = response.get('error')
+            raise MarketDataError(response.get('error') or f"{method} failed")
+        return response.get('result')
+
+    def _call_or_false(self, method, **params):
+        """Manager-style call: False (with last_error set) instead of an exception"""
+        try:
+            return self.call(method, **params)
+        except MarketDataError:
+            return False
+
+    def _disconnect(self):
+        for handle in (self.stream, self.sock):
+            if handle is not None:
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+        self.sock = self.stream = None
+
+    def close(self):
+        with self.lock:
+            self._disconnect()
+        with self.bus_lock:
+            self._drop_bus()
+
+    def _drop_bus(self):
+        if self.bus_reader is not None:
+            self.bus_reader.close()
+        self.bus_reader = None
+        self.bus_ticks.clear()
+        self.bus_bars.clear()
+
+    def _follow_bus(self):
+        """
+        Add the records published since the last call to bus_ticks and bus_bars
+        Returns False when there is no tick bus. The caches only ever hold an unbroken
+        run of records, so they start over whenever the reader fell behind the ring.
+        Call with bus_lock held.
+        """
+        if self.tick_bus_name is None:
+            return False
+        if self.bus_reader is not None and not self.bus_reader.publisher_alive:
+            # A restarted daemon publishes a new bus under the same name
+            self._drop_bus()
+        if self.bus_reader is None:
+            try:
+                self.bus_reader = TickBusReader(self.tick_bus_name, from_start=True)
+            except (FileNotFoundError, ValueError):
+                return False
+
+        reader = self.bus_reader
+        lost = reader.lost
+        records = reader.poll()
+        if reader.lost != lost:
+            self.bus_ticks.clear()
+            self.bus_bars.clear()
+
+        ticks = records[records['kind'] == KIND_TICK]
+        for symbol in np.unique(ticks['symbol']):
+            rows = ticks[ticks['symbol'] == symbol][-self.bus_capacity:]
+            buffer = self.bus_ticks.get(symbol.decode('utf-8'))
+            if buffer is None:
+                buffer = self.bus_ticks[symbol.decode('utf-8')] = TickRingBuffer(self.bus_capacity)
+            if not buffer.with_quotes and not (np.isnan(rows['bid']) & np.isnan(rows['ask'])).all():
+                buffer.enable_quotes()
+            columns = (rows[name].tolist() for name in ('timestamp', 'open', 'high', 'low', 'close', 'volume', 'bid', 'ask'))
+            for tick in zip(*columns):
+                buffer.append(*tick)
+
+        bars = records[records['kind'] == KIND_BAR]
+        for symbol, timeframe in set(zip(bars['symbol'].tolist(), bars['timeframe'].tolist())):
+            rows = bars[(bars['symbol'] == symbol) & (bars['timeframe'] == timeframe)]
+            added = np.zeros(len(rows), dtype=BAR_DTYPE)
+            added['start'] = rows['timestamp']
+            for name in BAR_DTYPE.names[1:]:
+                added[name] = rows[name]
+            key = (symbol.decode('utf-8'), timeframe)
+            held = self.bus_bars.get(key)
+            self.bus_bars[key] = (added if held is None else np.concatenate((held, added)))[-self.bus_capacity:]
+        return True
+
+    def available(self):
+        """True when a daemon answers on the socket"""
+        try:
+            return self.call('ping') == 'pong'
+        except MarketDataError:
+            return False
+
+    @property
+    def connected(self):
+        """Whether the daemon's broker connection is up"""
+        try:
+            return bool(self.call('connected'))
+        except MarketDataError:
+            return False
+
+    def get_connection_status(self):
+        """Daemon status, or a disconnected status carrying the error when it cannot be reached"""
+        try:
+            status = self.call('status')
+        except MarketDataError:
+            return {
+                'connected': False,
+                'reconnect_attempts': 0,
+                'last_error': self.last_error,
+                'error_count': 0,
+                'last_data_time': None,
+                'subscribed_symbols_count': 0,
+                'latency': None,
+                'daemon': None
+            }
+        for field in DATETIME_FIELDS:
+            if status.get(field):
+                status[field] = datetime.fromisoformat(status[field])
+        return status
+
+    @property
+    def continue_iteration(self):
+        """Whether the daemon's WebSocket threads keep iterating"""
+        return bool(self._call_or_false('continue_iteration'))
+
+    @continue_iteration.setter
+    def continue_iteration(self, value):
+        self.call('continue_iteration', value=bool(value))
+
+    def initialize(self, user):
+        """Configure and connect the daemon's WebSocket with the user's credentials"""
+        try:
+            return self.call('initialize', user_id=user.id)
+        except MarketDataError as e:
+            return {'success': False, 'message': str(e)}
+
+    def configure(self, auth_token, api_key, client_code, feed_token):
+        return self._call_or_false('configure', auth_token=auth_token, api_key=api_key,
+                                   client_code=client_code, feed_token=feed_token)
+
+    def connect(self):
+        return self._call_or_false('connect')
+
+    def reconnect(self):
+        return self._call_or_false('reconnect')
+
+    def close_connection(self):
+        return self._call_or_false('close_connection')
+
+    def register_symbol(self, symbol, exchange_type, token):
+        return self._call_or_false('register_symbol', symbol=symbol, exchange_type=exchange_type, token=token)
+
+    def subscribe(self, symbol, callback=None):
+        """Callbacks stay in the daemon process; use the tick bus to follow ticks elsewhere"""
+        if callback is not None:
+            raise ValueError("Callbacks cannot be registered through the market data daemon")
+        return self._call_or_false('subscribe_mode', symbol=symbol, mode=2)
+
+    def subscribe_mode(self, symbol, mode=2, callback=None):
+        if callback is not None:
+            raise ValueError("Callbacks cannot be registered through the market data daemon")
+        return self._call_or_false('subscribe_mode', symbol=symbol, mode=mode)
+
+    def batch_subscribe(self, symbols, mode=2):
+        return self._call_or_false('batch_subscribe', symbols=list(symbols), mode=mode) or {}
+
+    def unsubscribe(self, symbol):
+        return self._call_or_false('unsubscribe', symbol=symbol)
+
+    def is_symbol_subscribed(self, symbol):
+        return bool(self._call_or_false('is_symbol_subscribed', symbol=symbol))
+
+    def get_subscriptions(self):
+        return self._call_or_false('subscriptions') or []
+
+    def get_data_snapshot(self, symbol, limit=100):
+        """The last `limit` ticks, from the tick bus once it has carried that many of them"""
+        if limit is not None:
+            with self.bus_lock:
+                if self._follow_bus():
+                    buffer = self.bus_ticks.get(symbol)
+                    if buffer is not None and len(buffer) >= limit:
+                        return buffer.snapshot(limit)
+
+        columns = self._call_or_false('data', symbol=symbol, limit=limit)
+        if not columns:
+            return None
+        arrays = {name: np.asarray(values) for name, values in columns.items()}
+        arrays['timestamp'] = arrays['timestamp'].astype(np.int64)
+        return arrays
+
+    def get_data_as_dataframe(self, symbol, limit=100):
+        columns = self.get_data_snapshot(symbol, limit)
+        if columns is None:
+            return pd.DataFrame()
+        return TickRingBuffer.columns_to_dataframe(columns)
+
+    def get_bars(self, symbol, timeframe, limit=None, include_forming=False):
+        """Completed bars from the tick bus once it has carried `limit` of them; the forming bar is only on the socket"""
+        if limit is not None and not include_forming:
+            with self.bus_lock:
+                try:
+                    key = (symbol, parse_timeframe(timeframe))
+                except ValueError:
+                    key = None
+                if key is not None and self._follow_bus():
+                    held = self.bus_bars.get(key)
+                    if held is not None and len(held) >= limit:
+                        return bars_to_dataframe(held[len(held) - limit:])
+
+        columns = self._call_or_false('bars', symbol=symbol, timeframe=timeframe, limit=limit, include_forming=include_forming)
+        bars = np.zeros(len(columns['start']) if columns else 0, dtype=BAR_DTYPE)
+        for name in BAR_DTYPE.names if columns else ():
+            bars[name] = columns[name]
+        return bars_to_dataframe(bars)
+
+    def get_quote(self, symbol):
+        return self._call_or_false('quote', symbol=symbol) or None
+
+    def get_quote_snapshot(self):
+        quotes = self._call_or_false('quotes') or {}
+        return pd.DataFrame.from_dict(quotes, orient='index')
+
+    def activate_strategy_instance(self, user, instance):
+        """Start the instance's runner in the daemon"""
+        try:
+            return self.call('activate_strategy', user_id=user.id, instance_id=instance.id)
+        except MarketDataError as e:
+            return {'success': False, 'error': str(e)}
+
+    def deactivate_strategy_instance(self, instance_id):
+        try:
+            return self.call('deactivate_strategy', instance_id=instance_id)
+        except MarketDataError as e:
+            return {'success': False, 'error': str(e)}
+
+
+def use_market_data_daemon(app=None):
+    """True when this process leaves market data and strategy runners to the daemon"""
+    if app is None:
+        from flask import current_app, has_app_context
+        if not has_app_context():
+            return False
+        app = current_app
+    return bool(app.config.get('MARKET_DATA_DAEMON'))
+
+
+def get_market_data():
+    """The in-process WebSocket manager, or the daemon client when the web app runs without one"""
+    if use_market_data_daemon():
+        return market_data_client
+    from app.helpers.websocket_helper import websocket_manager
+    return websocket_manager
+
+
+# Shared client instance
+market_data_client = MarketDataClient()
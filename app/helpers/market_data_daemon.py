@@ -0,0 +1,222 @@
+import os
+import signal
+import socketserver
+import threading
+import time
+import traceback
+from app.helpers.logger_helper import logger
+from app.helpers.market_data_client import DEFAULT_SOCKET_PATH, DEFAULT_LOCK_PATH, encode_message, decode_message
+from app.helpers.websocket_helper import websocket_manager
+from app.helpers.code_cache import code_cache
+from app.helpers.host_lock import HostLock
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers newline-delimited JSON requests until the client disconnects"""
+
+    def handle(self):
+        for line in self.rfile:
+            self.wfile.write(self.server.market_data_daemon.handle_request(line))
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class MarketDataDaemon:
+    """
+    Standalone process that owns the broker WebSocket and the strategy runners
+
+    Only one daemon runs per host, guarded by a HostLock. The web app talks to it
+    through MarketDataClient over a Unix socket, and other processes can follow
+    ticks zero-copy on the shared-memory tick bus, so web traffic never shares a
+    GIL with tick processing. Each `rpc_<name>` method is callable as `name`.
+    """
+
+    def __init__(self, app=None, manager=None, socket_path=DEFAULT_SOCKET_PATH, lock_path=DEFAULT_LOCK_PATH):
+        self.app = app  # Flask app for database access by strategy runners
+        self.manager = manager or websocket_manager
+        self.socket_path = socket_path
+        self.host_lock = HostLock(lock_path)
+        self.server = None
+        self.server_thread = None
+        self.stop_event = threading.Event()
+        self.started_at = None
+        self.request_count = 0
+        self.error_count = 0
+        self.last_error = None
+
+    def start(self, tick_bus=True):
+        """Take the host lock and start serving requests in a background thread"""
+        if not self.host_lock.acquire():
+            raise RuntimeError(f"Market data daemon already running (pid {self.host_lock.owner()}, lock {self.host_lock.path})")
+
+        try:
+            # Holding the lock means any socket file left behind is stale
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.server = _UnixServer(self.socket_path, _RequestHandler)
+            self.server.market_data_daemon = self
+            os.chmod(self.socket_path, 0o600)
+        except Exception:
+            self.host_lock.release()
+            raise
+
+        if tick_bus:
+            self.manager.enable_tick_bus()
+
+        self.server_thread = threading.Thread(target=self.server.serve_forever, name="MarketDataDaemon", daemon=True)
+        self.server_thread.start()
+        self.started_at = time.time()
+        logger.log_app_event("MARKET_DATA_DAEMON", f"Market data daemon {os.getpid()} listening on {self.socket_path}")
+        return self
+
+    def stop(self):
+        """Stop serving, release the socket and the host lock"""
+        self.stop_event.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        self.host_lock.release()
+        logger.log_app_event("MARKET_DATA_DAEMON", "Market data daemon stopped")
+
+    def serve_forever(self, tick_bus=True):
+        """Run until SIGTERM or SIGINT, then close the broker connection and clean up"""
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: self.stop_event.set())
+        self.start(tick_bus=tick_bus)
+        try:
+            while not self.stop_event.wait(1):
+                pass
+        finally:
+            self.manager.close_connection()
+            self.manager.disable_tick_bus()
+            self.stop()
+
+    def handle_request(self, line):
+        """Decode one request, dispatch it and return the encoded response"""
+        self.request_count += 1
+        try:
+            request = decode_message(line)
+            method = getattr(self, f"rpc_{request.get('method')}", None)
+            if method is None:
+                raise ValueError(f"Unknown method: {request.get('method')}")
+            params = request.get('params') or {}
+            if self.app is not None:
+                with self.app.app_context():
+                    result = method(**params)
+            else:
+                result = method(**params)
+            return encode_message({'ok': True, 'result': result})
+        except Exception as e:
+            self.error_count += 1
+            self.last_error = str(e)
+            logger.log_app_event("MARKET_DATA_DAEMON_ERROR", f"Error handling request: {str(e)}", "error")
+            logger.log_app_event("MARKET_DATA_DAEMON_ERROR", traceback.format_exc(), "error")
+            return encode_message({'ok': False, 'error': str(e)})
+
+    def rpc_ping(self):
+        return 'pong'
+
+    def rpc_connected(self):
+        return self.manager.connected
+
+    def rpc_status(self):
+        status = self.manager.get_connection_status()
+        status['daemon'] = {
+            'pid': os.getpid(),
+            'socket': self.socket_path,
+            'uptime_seconds': round(time.time() - self.started_at, 1) if self.started_at else 0,
+            'requests': self.request_count,
+            'errors': self.error_count,
+            'last_error': self.last_error
+        }
+        status['code_cache'] = code_cache.get_stats()
+        return status
+
+    def rpc_continue_iteration(self, value=None):
+        """Set the iteration flag when a value is given; returns the current flag"""
+        if value is not None:
+            self.manager.continue_iteration = bool(value)
+        return self.manager.continue_iteration
+
+    def rpc_initialize(self, user_id):
+        from app.models.user import User
+        from app.helpers.websocket_helper import initialize_angelone_websocket
+
+        user = User.query.get(user_id)
+        if not user:
+            return {'success': False, 'message': f"Unknown user {user_id}"}
+        return initialize_angelone_websocket(user, self.manager)
+
+    def rpc_configure(self, auth_token, api_key, client_code, feed_token):
+        return self.manager.configure(auth_token, api_key, client_code, feed_token)
+
+    def rpc_connect(self):
+        return self.manager.connect()
+
+    def rpc_reconnect(self):
+        return self.manager.reconnect()
+
+    def rpc_close_connection(self):
+        return self.manager.close_connection()
+
+    def rpc_register_symbol(self, symbol, exchange_type, token):
+        return self.manager.register_symbol(symbol, exchange_type, token)
+
+    def rpc_subscribe_mode(self, symbol, mode=2):
+        return self.manager.subscribe_mode(symbol, mode)
+
+    def rpc_batch_subscribe(self, symbols, mode=2):
+        return self.manager.batch_subscribe(symbols, mode)
+
+    def rpc_unsubscribe(self, symbol):
+        return self.manager.unsubscribe(symbol)
+
+    def rpc_is_symbol_subscribed(self, symbol):
+        return self.manager.is_symbol_subscribed(symbol)
+
+    def rpc_subscriptions(self):
+        return self.manager.get_subscriptions()
+
+    def rpc_data(self, symbol, limit=100):
+        """Buffered ticks as column lists; timestamps are epoch ns"""
+        return self.manager.get_data_snapshot(symbol, limit)
+
+    def rpc_bars(self, symbol, timeframe, limit=None, include_forming=False):
+        """Bars of a tracked series as column lists, None if the series is not built"""
+        series = self.manager.bar_builder.get_series(symbol, timeframe)
+        if series is None:
+            return None
+        bars = series.get_bars(limit, include_forming)
+        return {name: bars[name] for name in bars.dtype.names}
+
+    def rpc_quote(self, symbol):
+        return self.manager.get_quote(symbol)
+
+    def rpc_quotes(self):
+        return self.manager.get_quote_snapshot().to_dict(orient='index')
+
+    def rpc_activate_strategy(self, user_id, instance_id):
+        from app.models.user import User
+        from app.models.instance import StrategyInstance
+        from app.helpers.strategy_helper import activate_strategy_instance
+
+        user = User.query.get(user_id)
+        instance = StrategyInstance.query.get(instance_id)
+        if not user or not instance:
+            return {'success': False, 'error': f"Unknown user {user_id} or instance {instance_id}"}
+        return activate_strategy_instance(user, instance)
+
+    def rpc_deactivate_strategy(self, instance_id):
+        from app.helpers.strategy_helper import deactivate_strategy_instance
+        return deactivate_strategy_instance(instance_id)
+
+    def rpc_active_strategies(self):
+        from app.helpers.strategy_helper import active_strategies
+        return list(active_strategies)
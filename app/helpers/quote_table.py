@@ -0,0 +1,152 @@
+import threading
+import numpy as np
+import pandas as pd
+
+# One row per registered instrument; prices are NaN and times 0 until the first tick
+QUOTE_DTYPE = np.dtype([
+    ('last_price', 'f8'),
+    ('bid', 'f8'),
+    ('ask', 'f8'),
+    ('volume', 'i8'),
+    ('exchange_ns', 'i8'),  # Exchange timestamp of the last tick, epoch ns
+    ('update_ns', 'i8'),  # When the row was last written, epoch ns
+    ('ticks', 'i8')  # Ticks applied to the row
+])
+
+
+def empty_quotes(count):
+    """Rows in their initial state"""
+    rows = np.zeros(count, dtype=QUOTE_DTYPE)
+    rows['last_price'] = rows['bid'] = rows['ask'] = np.nan
+    return rows
+
+
+class QuoteTable:
+    """
+    Dense latest-quote table for every registered instrument
+
+    Rows live in one preallocated NumPy structured array and are overwritten in place.
+    A symbol keeps its row index for as long as it is registered, so a single read
+    is a dict lookup plus a row copy, and a snapshot of the whole universe is one
+    array copy. The tick processor applies a decoded batch with one vectorized
+    assignment per column; the short table lock only keeps readers from seeing a
+    half-applied batch.
+    """
+
+    def __init__(self, capacity=1024):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self._lock = threading.Lock()
+        self._quotes = empty_quotes(capacity)
+        self._in_use = np.zeros(capacity, dtype=bool)
+        self._symbols = [None] * capacity  # row -> symbol
+        self._free = []  # Released rows below _size
+        self._size = 0  # Rows ever handed out
+        self.rows = {}  # symbol -> row
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def capacity(self):
+        return len(self._quotes)
+
+    def add(self, symbol):
+        """Give a symbol a row if it has none; returns the row index"""
+        with self._lock:
+            row = self.rows.get(symbol)
+            if row is not None:
+                return row
+
+            if self._free:
+                row = self._free.pop()
+            else:
+                if self._size == len(self._quotes):
+                    self._grow(len(self._quotes) * 2)
+                row = self._size
+                self._size += 1
+
+            self._quotes[row] = empty_quotes(1)[0]
+            self._in_use[row] = True
+            self._symbols[row] = symbol
+            self.rows[symbol] = row
+            return row
+
+    def _grow(self, capacity):
+        """Reallocate the arrays (caller holds the lock)"""
+        quotes = empty_quotes(capacity)
+        quotes[:len(self._quotes)] = self._quotes
+        in_use = np.zeros(capacity, dtype=bool)
+        in_use[:len(self._in_use)] = self._in_use
+        self._quotes = quotes
+        self._in_use = in_use
+        self._symbols.extend([None] * (capacity - len(self._symbols)))
+
+    def remove(self, symbol):
+        """Release a symbol's row for reuse"""
+        with self._lock:
+            row = self.rows.pop(symbol, None)
+            if row is None:
+                return False
+            self._in_use[row] = False
+            self._symbols[row] = None
+            self._free.append(row)
+            return True
+
+    def update(self, row, last_price, volume, exchange_ns, update_ns, bid=np.nan, ask=np.nan):
+        """Write one tick to a row"""
+        with self._lock:
+            quote = self._quotes[row]
+            self._quotes[row] = (last_price, bid, ask, volume, exchange_ns, update_ns, quote['ticks'] + 1)
+
+    def update_many(self, rows, last_price, bid, ask, volume, exchange_ns, update_ns):
+        """
+        Write a batch of ticks, one vectorized assignment per column
+        When a row appears more than once the last tick in the batch wins.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        with self._lock:
+            quotes = self._quotes
+            quotes['last_price'][rows] = last_price
+            quotes['bid'][rows] = bid
+            quotes['ask'][rows] = ask
+            quotes['volume'][rows] = volume
+            quotes['exchange_ns'][rows] = exchange_ns
+            quotes['update_ns'][rows] = update_ns
+            np.add.at(quotes['ticks'], rows, 1)
+
+    def update_book(self, rows, bid, ask, update_ns):
+        """Write only the top of book, for depth frames that carry no trade data"""
+        rows = np.asarray(rows, dtype=np.intp)
+        with self._lock:
+            quotes = self._quotes
+            quotes['bid'][rows] = bid
+            quotes['ask'][rows] = ask
+            quotes['update_ns'][rows] = update_ns
+
+    def get(self, symbol):
+        """Latest quote of one symbol as a dict, or None if it has no row"""
+        row = self.rows.get(symbol)
+        if row is None:
+            return None
+        with self._lock:
+            quote = self._quotes[row].copy()
+        return {name: quote[name].item() for name in QUOTE_DTYPE.names}
+
+    def snapshot(self):
+        """
+        Copy every row in use at once
+        Returns (symbols, quotes) where quotes is a QUOTE_DTYPE array aligned with symbols.
+        """
+        with self._lock:
+            size = self._size
+            quotes = self._quotes[:size].copy()
+            in_use = self._in_use[:size].copy()
+            symbols = self._symbols[:size]
+        return [symbol for symbol, used in zip(symbols, in_use) if used], quotes[in_use]
+
+    def to_dataframe(self):
+        """Snapshot as a DataFrame indexed by symbol"""
+        symbols, quotes = self.snapshot()
+        return pd.DataFrame(quotes, index=pd.Index(symbols, name='symbol'))
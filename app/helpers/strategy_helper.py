@@ -12,11 +12,23 @@ import threading
 from datetime import datetime, timedelta
 from app.helpers.openalgo_helper import get_openalgo_client
 from app.helpers.websocket_helper import websocket_manager
+from app.helpers.market_data_client import market_data_client, use_market_data_daemon
 from app.helpers.logger_helper import logger
+from app.helpers.timeframe import parse_timeframe, historical_interval, resample_ohlcv, last_session_time
+from app.helpers.bar_builder import NS_PER_SECOND, dataframe_to_bars, append_bars
+from app.helpers.bar_archive import bar_archive
+from app.helpers.code_cache import code_cache
+from app.helpers.strategy_runtime import StrategyRuntime
+from app.helpers.bar_trigger import BarTrigger, WAKE_BAR, WAKE_INTRABAR
 
 # Store active strategies for real-time processing
 active_strategies = {}  
 
+# Bars a running instance keeps and hands to its strategy, as many as a live bar series holds
+REALTIME_WINDOW_BARS = 1000
+# Newest live bars read on each wake; a longer gap since the last one reads the whole series
+LIVE_FETCH_BARS = 16
+
 def extract_params_from_code(code):
     """
     Extract parameter definitions from strategy code
@@ -60,6 +72,8 @@ def execute_strategy_code(code, historical_data=None, params=None, strategy_name
     """
     Execute the strategy code and capture signals
     Returns a dict with success flag, signals, and possibly error message
+    The code is compiled once per source text, see code_cache; the result's 'compile'
+    entry says where the code object came from and the compile time it saved.
     """
     # Create a StringIO to capture stdout
     stdout_capture = StringIO()
@@ -75,7 +89,11 @@ def execute_strategy_code(code, historical_data=None, params=None, strategy_name
     if params:
         local_vars.update(params)
     
+    compile_info = None
     try:
+        # Compiled code is shared by every run of the same source
+        compiled, compile_info = code_cache.get(code)
+        
         # Add signal functions to the local variables
         local_vars['long_entry'] = lambda: signals.append(('long_entry', len(signals) + 1))
         local_vars['long_exit'] = lambda: signals.append(('long_exit', len(signals) + 1))
@@ -84,7 +102,7 @@ def execute_strategy_code(code, historical_data=None, params=None, strategy_name
         
         # Redirect stdout to our capture
         with contextlib.redirect_stdout(stdout_capture):
-            exec(code, {}, local_vars)
+            exec(compiled, {}, local_vars)
         
         # Log signal generation if strategy and instance names are provided
         if strategy_name and instance_name and signals:
@@ -102,7 +120,8 @@ def execute_strategy_code(code, historical_data=None, params=None, strategy_name
         return {
             'success': True,
             'signals': signals,
-            'output': stdout_capture.getvalue()
+            'output': stdout_capture.getvalue(),
+            'compile': compile_info
         }
     
     except Exception as e:
@@ -123,7 +142,8 @@ def execute_strategy_code(code, historical_data=None, params=None, strategy_name
         return {
             'success': False,
             'error': error_msg,
-            'traceback': error_trace
+            'traceback': error_trace,
+            'compile': compile_info
         }
 
 def get_historical_data(user, symbol, exchange, timeframe, start_date=None, end_date=None):
@@ -147,20 +167,9 @@ def get_historical_data(user, symbol, exchange, timeframe, start_date=None, end_
         # Create AngelOne SmartConnect client
         client = get_angelone_client(user)
         
-        # Map the timeframe to AngelOne's interval format
-        interval_map = {
-            '1min': 'ONE_MINUTE',
-            '3min': 'THREE_MINUTE',
-            '5min': 'FIVE_MINUTE', 
-            '10min': 'TEN_MINUTE',
-            '15min': 'FIFTEEN_MINUTE',
-            '30min': 'THIRTY_MINUTE',
-            '1hour': 'ONE_HOUR',
-            '1day': 'ONE_DAY'
-        }
-        
-        # Default to 1 day if timeframe not recognized
-        interval = interval_map.get(timeframe.lower(), 'ONE_DAY')
+        # Map the timeframe to AngelOne's interval format; other timeframes are resampled from a shorter interval
+        seconds = parse_timeframe(timeframe)
+        interval, interval_seconds = historical_interval(seconds)
         
         # Get the token for the symbol from the symbol mapping
         symbol_mapping = get_symbol_token_mapping(symbol, exchange)
@@ -171,7 +180,7 @@ def get_historical_data(user, symbol, exchange, timeframe, start_date=None, end_
         if not start_date:
             # For intervals less than or equal to 15 minutes, get data for 7 days
             # For larger intervals, get data for 20 days
-            if interval in ['ONE_MINUTE', 'THREE_MINUTE', 'FIVE_MINUTE', 'TEN_MINUTE', 'FIFTEEN_MINUTE']:
+            if interval_seconds <= 900:
                 start_date_obj = datetime.now() - timedelta(days=7)
             else:
                 start_date_obj = datetime.now() - timedelta(days=20)
@@ -234,6 +243,10 @@ def get_historical_data(user, symbol, exchange, timeframe, start_date=None, end_
                 # Convert volume to integer
                 df['volume'] = pd.to_numeric(df['volume'], errors='coerce').astype('int64')
                 
+                # Build the requested bars when AngelOne has no interval of that length
+                if interval_seconds != seconds:
+                    df = resample_ohlcv(df, seconds, exchange)
+                
                 # Log result summary
                 data_points = len(df)
                 logger.log_strategy_event(
@@ -276,6 +289,49 @@ def get_historical_data(user, symbol, exchange, timeframe, start_date=None, end_
         # Reraise the exception
         raise
 
+def warm_up_bars(user, symbol, exchange, timeframe, days=7, limit=None):
+    """
+    Get the last `days` of completed bars from the on-disk bar archive, at most `limit` of them
+    Only bars that can have completed since the archive was last in sync are downloaded
+    with get_historical_data(), and they are archived for the next caller. A failed
+    download is logged and the archived bars are returned as they are.
+    """
+    seconds = parse_timeframe(timeframe)
+    span_ns = seconds * NS_PER_SECOND
+    now_ns = time.time_ns()
+    start_ns = now_ns - days * 86400 * NS_PER_SECOND
+    session_ns = int(last_session_time(exchange=exchange).timestamp()) * NS_PER_SECOND
+    synced_until = bar_archive.synced_until(symbol, exchange, seconds)
+    
+    # A bar can only be missing if one completed in session since the last sync
+    if synced_until + span_ns <= session_ns:
+        fetch_from = datetime.fromtimestamp(max(synced_until, start_ns) / 1e9)
+        try:
+            tail = get_historical_data(
+                user, 
+                symbol, 
+                exchange, 
+                timeframe,
+                start_date=fetch_from.strftime("%Y-%m-%d %H:%M"),
+                end_date=datetime.now().strftime("%Y-%m-%d %H:%M")
+            )
+            bars = dataframe_to_bars(tail)
+            if len(bars):
+                # The newest candle may still be forming; the archive is in sync up to its start
+                forming = bars['start'] + span_ns > now_ns
+                synced_ns = min(session_ns, int(bars['start'][forming][0])) if forming.any() else session_ns
+                bar_archive.write(symbol, exchange, seconds, bars[~forming], synced_until_ns=synced_ns)
+        except Exception as e:
+            logger.log_strategy_event(
+                "DataFetch", 
+                f"{symbol}@{exchange}", 
+                "WARM_UP_ERROR", 
+                f"Could not download missing {timeframe} bars, using the archive only: {str(e)}",
+                "warning"
+            )
+    
+    return bar_archive.get_dataframe(symbol, exchange, seconds, start_ns, limit)
+
 def backtest_strategy(strategy_code, historical_data, params=None):
     """
     Run a backtest of the strategy on historical data
@@ -311,6 +367,17 @@ def get_realtime_data(symbol, limit=100):
     """
     return websocket_manager.get_data_as_dataframe(symbol, limit)
 
+def get_realtime_bars(symbol, timeframe, limit=None, exchange=None, include_forming=True):
+    """
+    Get real-time bars for a symbol at a strategy timeframe
+    Timeframes the shared bar builder serves are read from it, so every instance on a symbol
+    reads the same bars; others are resampled from the buffered ticks, forming bar included.
+    """
+    if websocket_manager.bar_builder.get_series(symbol, timeframe) is not None:
+        return websocket_manager.get_bars(symbol, timeframe, limit, include_forming=include_forming)
+    bars = resample_to_timeframe(get_realtime_data(symbol), timeframe, exchange)
+    return bars.iloc[-limit:] if limit else bars
+
 def is_symbol_subscribed(symbol):
     """
     Check if a symbol is already subscribed to in the WebSocket
@@ -367,7 +434,9 @@ def process_realtime_data(user_id, instance_id, symbol, exchange_type, token, st
     use_websocket = True
     position = 0
     last_signal_time = None
-    signals = []
+    
+    # Wakes the loop below on each completed bar; deactivation stops it
+    trigger = active_strategies.get(instance_id) or BarTrigger(timeframe, instance.exchange, instance.intrabar_interval)
     
     # Try to get real-time data via WebSocket
     if not is_symbol_subscribed(symbol):
@@ -404,44 +473,41 @@ def process_realtime_data(user_id, instance_id, symbol, exchange_type, token, st
     # Get initial historical data for context
     initial_data = None
     
-    # Try WebSocket first
+    # Start building live bars before the warm-up, so none are missed in between
     if use_websocket:
-        raw_data = get_realtime_data(symbol)
-        if not raw_data.empty:
-            # Resample the raw tick data to the requested timeframe
-            initial_data = resample_to_timeframe(raw_data, timeframe)
-            logger.log_strategy_event(
-                strategy_name, 
-                instance_name, 
-                "WEBSOCKET_DATA", 
-                f"Resampled {len(raw_data)} ticks to {len(initial_data)} {timeframe} candles"
-            )
+        # Bars of every timeframe are built once per symbol and shared by all its instances
+        websocket_manager.subscribe_bars(symbol, exchange=instance.exchange)
+        websocket_manager.subscribe_bars(symbol, timeframe, trigger.on_bar, exchange=instance.exchange)
+        websocket_manager.enable_bar_archive(bar_archive)
     
-    # Fall back to AngelOne if WebSocket data is empty
-    if initial_data is None or initial_data.empty:
-        try:
-            logger.log_strategy_event(
-                strategy_name, 
-                instance_name, 
-                "INITIAL_DATA", 
-                f"Getting initial data from AngelOne API for {symbol}"
-            )
-            
-            initial_data = get_historical_data(
-                user, 
-                symbol, 
-                instance.exchange,
-                instance.timeframe,
-                start_date=(datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d"),
-                end_date=datetime.now().strftime("%Y-%m-%d")
-            )
-        except Exception as e:
+    # Warm up from the bar archive; only bars it is missing come from AngelOne
+    try:
+        initial_data = warm_up_bars(user, symbol, instance.exchange, instance.timeframe, limit=REALTIME_WINDOW_BARS)
+        logger.log_strategy_event(
+            strategy_name, 
+            instance_name, 
+            "INITIAL_DATA", 
+            f"Loaded {len(initial_data)} {timeframe} candles for {symbol} from the bar archive"
+        )
+    except Exception as e:
+        logger.log_strategy_event(
+            strategy_name, 
+            instance_name, 
+            "INITIAL_DATA_ERROR", 
+            f"Error getting initial data: {str(e)}",
+            "error"
+        )
+    
+    # Add the live bars completed so far
+    if use_websocket:
+        bars = get_realtime_bars(symbol, timeframe, exchange=instance.exchange, include_forming=False)
+        if not bars.empty:
+            initial_data = append_bars(initial_data if initial_data is not None else pd.DataFrame(), bars, REALTIME_WINDOW_BARS)
             logger.log_strategy_event(
                 strategy_name, 
                 instance_name, 
-                "INITIAL_DATA_ERROR", 
-                f"Error getting initial data: {str(e)}",
-                "error"
+                "WEBSOCKET_DATA", 
+                f"Added {len(bars)} {timeframe} candles from the shared WebSocket bars"
             )
     
     current_data = initial_data.copy() if initial_data is not None and not initial_data.empty else pd.DataFrame()
@@ -463,49 +529,68 @@ def process_realtime_data(user_id, instance_id, symbol, exchange_type, token, st
             f"Initial data loaded with {len(current_data)} {timeframe} candles"
         )
     
-    # Main processing loop
-    while instance_id in active_strategies:
+    # Load the strategy once; per-bar entry points are then called once per new bar
+    runtime = StrategyRuntime(strategy_code, params, strategy_name, instance_name, symbol)
+    if runtime.load():
+        logger.log_strategy_event(
+            strategy_name, 
+            instance_name, 
+            "RUNTIME_LOADED", 
+            f"Strategy loaded in {runtime.get_stats()['load_ms']} ms, calling {runtime.entry_point}() per bar"
+        )
+    last_bar = None
+    if trigger.intrabar_interval and not use_websocket:
+        # Downloaded candles have no forming bar to run on
+        trigger.intrabar_interval = None
+    if trigger.intrabar_interval and runtime.intrabar_entry_point is None:
+        # on_bar must see each bar once, so only on_intrabar() runs on the forming bar
+        trigger.intrabar_interval = None
+        logger.log_strategy_event(
+            strategy_name, 
+            instance_name, 
+            "INTRABAR_DISABLED", 
+            "The strategy does not define on_intrabar(bars), running on completed bars only",
+            "warning"
+        )
+    if trigger.intrabar_interval:
+        logger.log_strategy_event(
+            strategy_name, 
+            instance_name, 
+            "INTRABAR", 
+            f"Also running every {trigger.intrabar_interval} seconds on the forming {timeframe} bar"
+        )
+    
+    # Main processing loop, the first pass runs on the warm-up bars straight away
+    wake = WAKE_BAR
+    while instance_id in active_strategies and not trigger.is_stopped():
         try:
             new_data = None
             
-            # Try WebSocket first if available
-            if use_websocket:
-                raw_data = get_realtime_data(symbol)
+            # Intra-bar runs see the forming bar as the last row, the others completed bars only
+            intrabar = wake == WAKE_INTRABAR
+            
+            # Try WebSocket first if available, reading only the bars since the last wake
+            if use_websocket and intrabar:
+                new_data = get_realtime_bars(symbol, timeframe, limit=1, exchange=instance.exchange, include_forming=True)
+            elif use_websocket:
+                new_data = get_realtime_bars(symbol, timeframe, limit=LIVE_FETCH_BARS, exchange=instance.exchange, include_forming=False)
+                if not new_data.empty and not current_data.empty and new_data.index[0] > current_data.index[-1]:
+                    new_data = get_realtime_bars(symbol, timeframe, exchange=instance.exchange, include_forming=False)
                 
-                # If we got data from WebSocket, resample it to the required timeframe
-                if not raw_data.empty:
-                    new_data = resample_to_timeframe(raw_data, timeframe)
-                    
-                    if current_data.empty:
-                        current_data = new_data
+                if not new_data.empty:
+                    last_candle = current_data.index[-1] if not current_data.empty else None
+                    current_data = append_bars(current_data, new_data, REALTIME_WINDOW_BARS)
+                    if current_data.index[-1] != last_candle:
                         logger.log_strategy_event(
                             strategy_name, 
                             instance_name, 
                             "DATA_UPDATE", 
-                            f"Received initial WebSocket data with {len(new_data)} {timeframe} candles"
-                        )
-                    else:
-                        # Merge with current data, keeping only the latest values for each timestamp
-                        current_data = pd.concat([current_data, new_data])
-                        current_data = current_data[~current_data.index.duplicated(keep='last')]
-                        
-                        # Sort by timestamp
-                        current_data.sort_index(inplace=True)
-                        
-                        logger.log_strategy_event(
-                            strategy_name, 
-                            instance_name, 
-                            "DATA_UPDATE", 
-                            f"Updated data from WebSocket, now have {len(current_data)} {timeframe} candles"
+                            f"Added WebSocket candles, now have {len(current_data)} {timeframe} candles"
                         )
             
-            # Fall back to AngelOne API if WebSocket failed or had no data
-            if new_data is None or new_data.empty:
+            # Fall back to AngelOne API if WebSocket failed or had no data; it only has completed candles
+            if (new_data is None or new_data.empty) and not intrabar:
                 try:
-                    # Fall back to AngelOne for data
-                    end_date = datetime.now().strftime("%Y-%m-%d %H:%M")
-                    start_date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d %H:%M")
-                    
                     logger.log_strategy_event(
                         strategy_name, 
                         instance_name, 
@@ -513,14 +598,8 @@ def process_realtime_data(user_id, instance_id, symbol, exchange_type, token, st
                         f"Falling back to AngelOne API for {symbol} data"
                     )
                     
-                    new_data = get_historical_data(
-                        user, 
-                        symbol, 
-                        instance.exchange, 
-                        instance.timeframe,
-                        start_date=start_date,
-                        end_date=end_date
-                    )
+                    # Only bars the archive does not have yet are downloaded
+                    new_data = warm_up_bars(user, symbol, instance.exchange, instance.timeframe, limit=REALTIME_WINDOW_BARS)
                     
                     if not new_data.empty:
                         current_data = new_data
@@ -540,173 +619,164 @@ def process_realtime_data(user_id, instance_id, symbol, exchange_type, token, st
                     )
             
             # If we have data, execute the strategy
-            if not current_data.empty:
-                # Create a custom params dict
-                strategy_params = params.copy() if params else {}
-                strategy_params['historical_data'] = current_data
-                strategy_params['symbol'] = symbol
-                
-                # Execute strategy code
-                result = execute_strategy_code(
-                    strategy_code, 
-                    current_data, 
-                    strategy_params,
-                    strategy_name,
-                    instance_name
-                )
-                
+            result = None
+            if intrabar:
+                # The forming bar is appended for this run only, it is not kept
+                if new_data is not None and not new_data.empty and (current_data.empty or new_data.index[-1] > current_data.index[-1]):
+                    result = runtime.run(pd.concat([current_data.iloc[1 - REALTIME_WINDOW_BARS:], new_data]), intrabar=True)
+            elif not current_data.empty and (runtime.entry_point is None or current_data.index[-1] != last_bar):
+                # A loaded strategy runs once per completed bar, legacy scripts on every wake
+                last_bar = current_data.index[-1]
+                result = runtime.run(current_data)
+            
+            if result is not None:
                 if result['success'] and result['signals']:
-                    # Process new signals
-                    new_signals = result['signals']
+                    # run() returns only the signals this run added
+                    latest_signals = result['signals']
                     current_time = datetime.now()
                     
-                    # Avoid duplicate signals - only process if we have new ones
-                    if len(new_signals) > len(signals):
-                        latest_signals = new_signals[len(signals):]
-                        signals = new_signals
-                        
-                        logger.log_strategy_event(
-                            strategy_name, 
-                            instance_name, 
-                            "SIGNALS_DETECTED", 
-                            f"Detected {len(latest_signals)} new signals"
-                        )
-                        
-                        for signal_type, signal_id in latest_signals:
-                            # Skip if we've sent a signal recently (avoid duplicates)
-                            if last_signal_time and (current_time - last_signal_time).total_seconds() < 60:
-                                logger.log_strategy_event(
-                                    strategy_name, 
-                                    instance_name, 
-                                    "SIGNAL_SKIPPED", 
-                                    f"Signal {signal_type} skipped - too soon after last signal",
-                                    "warning"
-                                )
-                                continue
-                                
-                            # Handle position tracking and signal sending
-                            if signal_type == 'long_entry' and position <= 0:
-                                position = 1
-                                # Send signal to broker
-                                from app.helpers.openalgo_helper import send_strategy_signal
-                                logger.log_strategy_event(
-                                    strategy_name, 
-                                    instance_name, 
-                                    "SIGNAL_SENDING", 
-                                    f"Sending LONG_ENTRY for {symbol} with action {instance.long_entry_action}"
-                                )
-                                
-                                response = send_strategy_signal(
-                                    user,
-                                    instance.webhook_id,
-                                    symbol,
-                                    instance.long_entry_action,
-                                    instance.position_size
-                                )
-                                
-                                # Log trade execution
-                                logger.log_trade(
-                                    instance.webhook_id,
-                                    symbol,
-                                    instance.long_entry_action,
-                                    instance.position_size,
-                                    str(response)
-                                )
-                                
-                                last_signal_time = current_time
-                                
-                            elif signal_type == 'long_exit' and position > 0:
-                                position = 0
-                                # Send signal to broker
-                                from app.helpers.openalgo_helper import send_strategy_signal
-                                logger.log_strategy_event(
-                                    strategy_name, 
-                                    instance_name, 
-                                    "SIGNAL_SENDING", 
-                                    f"Sending LONG_EXIT for {symbol} with action {instance.long_exit_action}"
-                                )
-                                
-                                response = send_strategy_signal(
-                                    user,
-                                    instance.webhook_id,
-                                    symbol,
-                                    instance.long_exit_action,
-                                    instance.position_size
-                                )
-                                
-                                # Log trade execution
-                                logger.log_trade(
-                                    instance.webhook_id,
-                                    symbol,
-                                    instance.long_exit_action,
-                                    instance.position_size,
-                                    str(response)
-                                )
-                                
-                                last_signal_time = current_time
-                                
-                            elif signal_type == 'short_entry' and position >= 0:
-                                position = -1
-                                # Send signal to broker
-                                from app.helpers.openalgo_helper import send_strategy_signal
-                                logger.log_strategy_event(
-                                    strategy_name, 
-                                    instance_name, 
-                                    "SIGNAL_SENDING", 
-                                    f"Sending SHORT_ENTRY for {symbol} with action {instance.short_entry_action}"
-                                )
-                                
-                                response = send_strategy_signal(
-                                    user,
-                                    instance.webhook_id,
-                                    symbol,
-                                    instance.short_entry_action,
-                                    instance.position_size
-                                )
-                                
-                                # Log trade execution
-                                logger.log_trade(
-                                    instance.webhook_id,
-                                    symbol,
-                                    instance.short_entry_action,
-                                    instance.position_size,
-                                    str(response)
-                                )
-                                
-                                last_signal_time = current_time
-                                
-                            elif signal_type == 'short_exit' and position < 0:
-                                position = 0
-                                # Send signal to broker
-                                from app.helpers.openalgo_helper import send_strategy_signal
-                                logger.log_strategy_event(
-                                    strategy_name, 
-                                    instance_name, 
-                                    "SIGNAL_SENDING", 
-                                    f"Sending SHORT_EXIT for {symbol} with action {instance.short_exit_action}"
-                                )
-                                
-                                response = send_strategy_signal(
-                                    user,
-                                    instance.webhook_id,
-                                    symbol,
-                                    instance.short_exit_action,
-                                    instance.position_size
-                                )
-                                
-                                # Log trade execution
-                                logger.log_trade(
-                                    instance.webhook_id,
-                                    symbol,
-                                    instance.short_exit_action,
-                                    instance.position_size,
-                                    str(response)
-                                )
-                                
-                                last_signal_time = current_time
+                    logger.log_strategy_event(
+                        strategy_name, 
+                        instance_name, 
+                        "SIGNALS_DETECTED", 
+                        f"Detected {len(latest_signals)} new signals"
+                    )
+                    
+                    for signal_type, signal_id in latest_signals:
+                        # Skip if we've sent a signal recently (avoid duplicates)
+                        if last_signal_time and (current_time - last_signal_time).total_seconds() < 60:
+                            logger.log_strategy_event(
+                                strategy_name, 
+                                instance_name, 
+                                "SIGNAL_SKIPPED", 
+                                f"Signal {signal_type} skipped - too soon after last signal",
+                                "warning"
+                            )
+                            continue
+                            
+                        # Handle position tracking and signal sending
+                        if signal_type == 'long_entry' and position <= 0:
+                            position = 1
+                            # Send signal to broker
+                            from app.helpers.openalgo_helper import send_strategy_signal
+                            logger.log_strategy_event(
+                                strategy_name, 
+                                instance_name, 
+                                "SIGNAL_SENDING", 
+                                f"Sending LONG_ENTRY for {symbol} with action {instance.long_entry_action}"
+                            )
+                            
+                            response = send_strategy_signal(
+                                user,
+                                instance.webhook_id,
+                                symbol,
+                                instance.long_entry_action,
+                                instance.position_size
+                            )
+                            
+                            # Log trade execution
+                            logger.log_trade(
+                                instance.webhook_id,
+                                symbol,
+                                instance.long_entry_action,
+                                instance.position_size,
+                                str(response)
+                            )
+                            
+                            last_signal_time = current_time
+                            
+                        elif signal_type == 'long_exit' and position > 0:
+                            position = 0
+                            # Send signal to broker
+                            from app.helpers.openalgo_helper import send_strategy_signal
+                            logger.log_strategy_event(
+                                strategy_name, 
+                                instance_name, 
+                                "SIGNAL_SENDING", 
+                                f"Sending LONG_EXIT for {symbol} with action {instance.long_exit_action}"
+                            )
+                            
+                            response = send_strategy_signal(
+                                user,
+                                instance.webhook_id,
+                                symbol,
+                                instance.long_exit_action,
+                                instance.position_size
+                            )
+                            
+                            # Log trade execution
+                            logger.log_trade(
+                                instance.webhook_id,
+                                symbol,
+                                instance.long_exit_action,
+                                instance.position_size,
+                                str(response)
+                            )
+                            
+                            last_signal_time = current_time
+                            
+                        elif signal_type == 'short_entry' and position >= 0:
+                            position = -1
+                            # Send signal to broker
+                            from app.helpers.openalgo_helper import send_strategy_signal
+                            logger.log_strategy_event(
+                                strategy_name, 
+                                instance_name, 
+                                "SIGNAL_SENDING", 
+                                f"Sending SHORT_ENTRY for {symbol} with action {instance.short_entry_action}"
+                            )
+                            
+                            response = send_strategy_signal(
+                                user,
+                                instance.webhook_id,
+                                symbol,
+                                instance.short_entry_action,
+                                instance.position_size
+                            )
+                            
+                            # Log trade execution
+                            logger.log_trade(
+                                instance.webhook_id,
+                                symbol,
+                                instance.short_entry_action,
+                                instance.position_size,
+                                str(response)
+                            )
+                            
+                            last_signal_time = current_time
+                            
+                        elif signal_type == 'short_exit' and position < 0:
+                            position = 0
+                            # Send signal to broker
+                            from app.helpers.openalgo_helper import send_strategy_signal
+                            logger.log_strategy_event(
+                                strategy_name, 
+                                instance_name, 
+                                "SIGNAL_SENDING", 
+                                f"Sending SHORT_EXIT for {symbol} with action {instance.short_exit_action}"
+                            )
+                            
+                            response = send_strategy_signal(
+                                user,
+                                instance.webhook_id,
+                                symbol,
+                                instance.short_exit_action,
+                                instance.position_size
+                            )
+                            
+                            # Log trade execution
+                            logger.log_trade(
+                                instance.webhook_id,
+                                symbol,
+                                instance.short_exit_action,
+                                instance.position_size,
+                                str(response)
+                            )
+                            
+                            last_signal_time = current_time
             
-            # Sleep before next cycle (10 seconds)
-            time.sleep(10)
+            # Block until the next bar completes or the intra-bar interval elapses
+            wake = trigger.wait()
             
         except Exception as e:
             logger.log_strategy_event(
@@ -723,20 +793,30 @@ def process_realtime_data(user_id, instance_id, symbol, exchange_type, token, st
                 traceback.format_exc(),
                 "error"
             )
-            time.sleep(30)  # Longer sleep on error
+            trigger.pause(30)  # Back off on error, unless deactivated first
+    
+    if use_websocket:
+        websocket_manager.unsubscribe_bars(symbol, timeframe, trigger.on_bar)
     
     # Log strategy stopped
+    trigger_stats = trigger.get_stats()
     logger.log_strategy_event(
         strategy_name, 
         instance_name, 
         "STOPPED", 
-        f"Strategy instance stopped processing"
+        f"Strategy instance stopped processing after {runtime.runs} runs "
+        f"({trigger_stats['bar_wakes']} bar closes, {trigger_stats['intrabar_wakes']} intra-bar, "
+        f"last close-to-wake latency {trigger_stats['last_latency_ms']} ms)"
     )
 
 def activate_strategy_instance(user, instance):
     """
     Activate a strategy instance for real-time processing
     """
+    # Strategy runners live next to the feed in the market data daemon when there is one
+    if use_market_data_daemon():
+        return market_data_client.activate_strategy_instance(user, instance)
+    
     instance_id = instance.id
     strategy_name = instance.strategy.name
     instance_name = instance.name
@@ -758,8 +838,8 @@ def activate_strategy_instance(user, instance):
         # Get params directly, no need to parse JSON as SQLAlchemy does that automatically
         params = instance.parameters if instance.parameters else {}
         
-        # Mark as active
-        active_strategies[instance_id] = True
+        # Mark as active; the trigger wakes the runner on each completed bar
+        active_strategies[instance_id] = BarTrigger(instance.timeframe, instance.exchange, instance.intrabar_interval)
         
         # Get the symbol exchange mapping
         symbol_mapping = get_symbol_token_mapping(instance.symbol, instance.exchange)
@@ -810,12 +890,16 @@ def deactivate_strategy_instance(instance_id):
     """
     from app.models.instance import StrategyInstance
     
+    if use_market_data_daemon():
+        return market_data_client.deactivate_strategy_instance(instance_id)
+    
     instance = StrategyInstance.query.get(instance_id)
     strategy_name = instance.strategy.name if instance else "Unknown"
     instance_name = instance.name if instance else f"ID: {instance_id}"
     
     if instance_id in active_strategies:
-        del active_strategies[instance_id]
+        # Stopping the trigger wakes the runner, so it exits without waiting for the next bar
+        active_strategies.pop(instance_id).stop()
         logger.log_strategy_event(
             strategy_name, 
             instance_name, 
@@ -879,47 +963,24 @@ def get_symbol_token_mapping(symbol, exchange):
     # Default mapping if not found
     return {'exchange_type': 1, 'token': '26000'}
 
-def resample_to_timeframe(data_df, timeframe):
+def resample_to_timeframe(data_df, timeframe, exchange=None):
     """
     Resample tick data or higher frequency data to the specified timeframe
-    Returns a new DataFrame with OHLC data at the requested timeframe
+    Returns a new DataFrame with OHLC data at the requested timeframe, intraday bars
+    starting at the exchange session open
     """
     if data_df.empty:
         return data_df
     
-    # Make a copy to avoid modifying the original
-    df = data_df.copy()
-    
-    # Map timeframe to pandas frequency string
-    freq_map = {
-        '1min': '1T',
-        '3min': '3T',
-        '5min': '5T',
-        '10min': '10T',
-        '15min': '15T',
-        '30min': '30T',
-        '1hour': '1H',
-        '1day': '1D'
-    }
-    
-    # Default to 1 day if timeframe not recognized
-    freq = freq_map.get(timeframe.lower(), '1D')
+    try:
+        seconds = parse_timeframe(timeframe)
+    except ValueError as e:
+        logger.log_strategy_event("DataResample", str(timeframe), "RESAMPLE_ERROR", str(e), "warning")
+        return data_df
     
     # Only resample if we have a valid date/time index
-    if isinstance(df.index, pd.DatetimeIndex):
-        # Perform the resampling to get OHLC bars at the desired frequency
-        resampled = df.resample(freq).agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last',
-            'volume': 'sum'
-        })
-        
-        # Drop NaN rows that might result from resampling
-        resampled = resampled.dropna()
-        
-        return resampled
+    if isinstance(data_df.index, pd.DatetimeIndex):
+        return resample_ohlcv(data_df, seconds, exchange)
     else:
         # If index is not a DatetimeIndex, log warning and return original
         logger.log_strategy_event(
@@ -929,4 +990,4 @@ def resample_to_timeframe(data_df, timeframe):
             f"Data does not have DatetimeIndex, cannot resample to {timeframe}",
             "warning"
         )
-        return df
+        return data_df
@@ -0,0 +1,173 @@
+import contextlib
+import time
+import traceback
+from io import StringIO
+import numpy as np
+import pandas as pd
+from app.helpers.code_cache import code_cache
+from app.helpers.logger_helper import logger
+
+SIGNAL_TYPES = ('long_entry', 'long_exit', 'short_entry', 'short_exit')
+
+# Functions a strategy can define to be called per bar, in order of preference
+ENTRY_POINTS = ('on_bar', 'run_strategy')
+
+# Optional function called with the forming bar as the last row, see run(intrabar=True)
+INTRABAR_ENTRY_POINT = 'on_intrabar'
+
+
+class StrategyRuntime:
+    """
+    A strategy loaded once per activation and called for each new bar
+
+    load() runs the module-level code once into a namespace kept for the life of the
+    runtime, with `historical_data` set to None, so imports, definitions and anything
+    set up there persist. The instance params then replace the module's defaults.
+    Each run(bars) calls on_bar(bars), or run_strategy(bars) when the strategy has no
+    on_bar; both see the module's globals and a `state` dict carried across calls.
+
+    on_bar only has to handle the newest bar and its signals accumulate across calls.
+    run_strategy recomputes over all bars, so its signals are reset on every call.
+    Either way run() returns only the signals that call added.
+    A strategy that also defines on_intrabar(bars) gets the intra-bar runs; on_bar
+    and run_strategy only ever see completed bars, so nothing is applied twice.
+    Strategies that define neither are run as before, the whole script per call,
+    through execute_strategy_code().
+    """
+
+    def __init__(self, code, params=None, strategy_name=None, instance_name=None, symbol=None):
+        self.code = code
+        self.params = dict(params or {})
+        self.strategy_name = strategy_name
+        self.instance_name = instance_name
+        self.symbol = symbol
+        self.namespace = None
+        self.entry_point = None  # Name of the per-bar function, None for a legacy script
+        self.intrabar_entry_point = None  # INTRABAR_ENTRY_POINT if the strategy defines it
+        self.signals = []  # (signal type, signal id), shared with the strategy's signal functions
+        self.reported = 0  # Signals of the last recompute already returned, for run_strategy and legacy scripts
+        self.load_error = None
+        self.load_seconds = 0.0
+        self.runs = 0
+        self.run_seconds = 0.0  # Total time spent in the entry point
+        self.last_run_seconds = 0.0
+
+    def _signal_function(self, signal_type):
+        signals = self.signals
+        return lambda: signals.append((signal_type, len(signals) + 1))
+
+    def load(self):
+        """Run the module-level code once; returns True if the strategy has a per-bar entry point"""
+        namespace = {
+            '__name__': '__strategy__',
+            'np': np,
+            'pd': pd,
+            'signals': self.signals,
+            'historical_data': None,
+            'symbol': self.symbol,
+            'state': {}
+        }
+        for signal_type in SIGNAL_TYPES:
+            namespace[signal_type] = self._signal_function(signal_type)
+
+        started = time.perf_counter()
+        try:
+            compiled, _ = code_cache.get(self.code)
+            with contextlib.redirect_stdout(StringIO()):
+                exec(compiled, namespace)
+        except Exception as e:
+            # Scripts that need data at module level stay legacy scripts
+            self.load_error = str(e)
+            self._log("RUNTIME_LEGACY", f"Module code needs data, running the whole script per call: {str(e)}", "warning")
+            return False
+        finally:
+            self.load_seconds = time.perf_counter() - started
+
+        namespace.update(self.params)
+        self.entry_point = next((name for name in ENTRY_POINTS if callable(namespace.get(name))), None)
+        if self.entry_point is not None and callable(namespace.get(INTRABAR_ENTRY_POINT)):
+            self.intrabar_entry_point = INTRABAR_ENTRY_POINT
+        self.namespace = namespace
+        del self.signals[:]
+        return self.entry_point is not None
+
+    def run(self, bars, intrabar=False):
+        """
+        Call the strategy for the bars up to and including the newest one
+        With intrabar the newest bar is still forming and on_intrabar is called instead.
+        Returns a dict like execute_strategy_code(): success, output or error, and the
+        signals this call added.
+        """
+        if intrabar and self.intrabar_entry_point is None:
+            raise ValueError("The strategy does not define on_intrabar()")
+        if self.entry_point is None:
+            from app.helpers.strategy_helper import execute_strategy_code
+            params = dict(self.params, historical_data=bars, symbol=self.symbol)
+            result = execute_strategy_code(self.code, bars, params, self.strategy_name, self.instance_name)
+            if result['success']:
+                # The script recomputes every signal, the ones past the last call's are new
+                signals = result['signals']
+                result['signals'] = signals[self.reported:]
+                self.reported = len(signals)
+            return result
+
+        stdout_capture = StringIO()
+        entry_point = self.intrabar_entry_point if intrabar else self.entry_point
+        if entry_point == 'run_strategy':
+            previous = self.reported
+            del self.signals[:]
+        else:
+            previous = len(self.signals)
+        self.namespace['historical_data'] = bars
+
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(stdout_capture):
+                self.namespace[entry_point](bars)
+        except Exception as e:
+            self._log("EXECUTION_ERROR", str(e), "error")
+            return {
+                'success': False,
+                'error': str(e),
+                'traceback': traceback.format_exc()
+            }
+        finally:
+            self.last_run_seconds = time.perf_counter() - started
+            self.run_seconds += self.last_run_seconds
+            self.runs += 1
+
+        new_signals = self.signals[previous:]
+        if entry_point == 'run_strategy':
+            self.reported = len(self.signals)
+
+        # Log the signals this call added
+        if self.strategy_name and self.instance_name:
+            for signal_type, signal_id in new_signals:
+                logger.log_signal(
+                    self.strategy_name,
+                    self.instance_name,
+                    self.symbol or 'unknown',
+                    signal_type,
+                    f"Signal ID: {signal_id}"
+                )
+
+        return {
+            'success': True,
+            'signals': new_signals,
+            'output': stdout_capture.getvalue()
+        }
+
+    def _log(self, event_type, message, level='info'):
+        if self.strategy_name and self.instance_name:
+            logger.log_strategy_event(self.strategy_name, self.instance_name, event_type, message, level)
+
+    def get_stats(self):
+        return {
+            'entry_point': self.entry_point,
+            'intrabar_entry_point': self.intrabar_entry_point,
+            'load_error': self.load_error,
+            'load_ms': round(self.load_seconds * 1000, 3),
+            'runs': self.runs,
+            'avg_run_ms': round(self.run_seconds / self.runs * 1000, 3) if self.runs else 0.0,
+            'last_run_ms': round(self.last_run_seconds * 1000, 3)
+        }
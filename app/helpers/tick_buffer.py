@@ -0,0 +1,179 @@
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+
+def ns_to_datetime(timestamp_ns):
+    """Convert an epoch nanosecond tick timestamp to a local naive datetime, None stays None"""
+    if timestamp_ns is None:
+        return None
+    return datetime.fromtimestamp(timestamp_ns / 1e9)
+
+
+class TickRingBuffer:
+    """
+    Fixed-capacity columnar ring buffer for per-symbol tick history
+
+    Columns are preallocated NumPy arrays: timestamp (int64 epoch nanoseconds),
+    open, high, low, close (float64), volume (int64) and optionally bid/ask (float64).
+    Every value is written twice, at slot i and i + capacity, so the most recent
+    `limit` rows are always one contiguous slice and reads never need to copy.
+
+    Writes are bracketed by a sequence number that is odd while a write is in
+    progress (a seqlock). snapshot() copies without any lock and retries if a write
+    overlapped, so readers never make the single writer wait.
+    """
+    PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+    QUOTE_COLUMNS = ('bid', 'ask')
+
+    def __init__(self, capacity=1000, with_quotes=False):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = capacity
+        self.with_quotes = False
+        self._write_pos = 0  # Next slot to write in [0, capacity)
+        self._count = 0
+        self.sequence = 0  # Odd while a write is in progress
+
+        size = capacity * 2
+        self.timestamp = np.zeros(size, dtype=np.int64)
+        self.open = np.zeros(size, dtype=np.float64)
+        self.high = np.zeros(size, dtype=np.float64)
+        self.low = np.zeros(size, dtype=np.float64)
+        self.close = np.zeros(size, dtype=np.float64)
+        self.volume = np.zeros(size, dtype=np.int64)
+        self.bid = None
+        self.ask = None
+
+        if with_quotes:
+            self.enable_quotes()
+
+    def enable_quotes(self):
+        """Allocate the optional bid/ask columns"""
+        if self.with_quotes:
+            return
+        size = self.capacity * 2
+        self.sequence += 1
+        self.bid = np.full(size, np.nan, dtype=np.float64)
+        self.ask = np.full(size, np.nan, dtype=np.float64)
+        self.with_quotes = True
+        self.sequence += 1
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        """Memory held by the column arrays"""
+        return sum(array.nbytes for array in self._arrays().values())
+
+    def _arrays(self):
+        arrays = {
+            'timestamp': self.timestamp,
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'volume': self.volume
+        }
+        if self.with_quotes:
+            arrays['bid'] = self.bid
+            arrays['ask'] = self.ask
+        return arrays
+
+    def append(self, timestamp, open_price, high, low, close, volume=0, bid=np.nan, ask=np.nan):
+        """Append one tick in O(1); the oldest tick is overwritten once the buffer is full"""
+        i = self._write_pos
+        j = i + self.capacity
+
+        self.sequence += 1
+        self.timestamp[i] = self.timestamp[j] = timestamp
+        self.open[i] = self.open[j] = open_price
+        self.high[i] = self.high[j] = high
+        self.low[i] = self.low[j] = low
+        self.close[i] = self.close[j] = close
+        self.volume[i] = self.volume[j] = volume
+        if self.with_quotes:
+            self.bid[i] = self.bid[j] = bid
+            self.ask[i] = self.ask[j] = ask
+
+        self._write_pos = i + 1 if i + 1 < self.capacity else 0
+        if self._count < self.capacity:
+            self._count += 1
+        self.sequence += 1
+
+    def _window(self, limit=None):
+        """Return the [start, end) slice covering the last `limit` ticks"""
+        count = self._count if limit is None else max(0, min(limit, self._count))
+        # The newest tick sits just before the write position in the mirrored upper half
+        end = self._write_pos + self.capacity if self._count == self.capacity else self._write_pos
+        return end - count, end
+
+    def view(self, limit=None):
+        """
+        Return the last `limit` ticks as a dict of contiguous, read-only column views
+        The views share memory with the buffer and are overwritten as new ticks arrive,
+        so copy them if they must outlive the next append.
+        """
+        start, end = self._window(limit)
+        columns = {}
+        for name, array in self._arrays().items():
+            column = array[start:end]
+            column.flags.writeable = False
+            columns[name] = column
+        return columns
+
+    def last(self):
+        """Return the newest tick as a dict, or None if the buffer is empty"""
+        if not self._count:
+            return None
+        _, end = self._window(1)
+        return {name: array[end - 1].item() for name, array in self._arrays().items()}
+
+    def clear(self):
+        """Forget all buffered ticks without releasing memory"""
+        self.sequence += 1
+        self._write_pos = 0
+        self._count = 0
+        self.sequence += 1
+
+    def snapshot(self, limit=None):
+        """
+        Copy the last `limit` ticks into a dict of new column arrays
+        Takes no lock: the copy is retried until no write overlapped it. Safe against
+        one concurrent writer; the copies can be turned into a DataFrame with
+        columns_to_dataframe().
+        """
+        while True:
+            sequence = self.sequence
+            if sequence & 1:
+                time.sleep(0)  # A write is in progress, let the writer finish
+                continue
+            start, end = self._window(limit)
+            columns = {name: array[start:end].copy() for name, array in self._arrays().items()}
+            if self.sequence == sequence:
+                return columns
+
+    @staticmethod
+    def columns_to_dataframe(columns):
+        """
+        Build a DataFrame from snapshot() columns
+        The index is a DatetimeIndex named 'timestamp' in local wall-clock time.
+        """
+        if not len(columns['timestamp']):
+            return pd.DataFrame()
+
+        # Single vectorized epoch -> local time conversion
+        local_offset_ns = time.localtime().tm_gmtoff * 1_000_000_000
+        index = pd.DatetimeIndex(
+            (columns['timestamp'] + local_offset_ns).astype('datetime64[ns]'),
+            name='timestamp'
+        )
+        data = {name: column for name, column in columns.items() if name != 'timestamp'}
+        return pd.DataFrame(data, index=index, copy=False)
+
+    def to_dataframe(self, limit=None):
+        """Build a DataFrame of the last `limit` ticks directly from the column arrays"""
+        return self.columns_to_dataframe(self.snapshot(limit))
@@ -0,0 +1,261 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from multiprocessing import resource_tracker, shared_memory
+from app.helpers.logger_helper import logger
+
+DEFAULT_BUS_NAME = 'algotrade_ticks'
+MAGIC = b'TICKBUS1'
+
+# Record kinds
+KIND_TICK = 0
+KIND_BAR = 1
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('record_size', '<u4'),
+    ('reserved', '<u4'),
+    ('capacity', '<i8'),
+    ('claim_seq', '<i8'),  # Newest sequence being written, moves before the slots change
+    ('write_seq', '<i8'),  # Newest complete sequence, moves after the slots are written
+    ('publisher_pid', '<i8'),
+    ('created_ns', '<i8'),
+    ('padding', 'V8')
+])
+HEADER_SIZE = HEADER_DTYPE.itemsize  # 64 bytes
+
+# One tick or bar; sequence is -1 while the slot is being rewritten
+RECORD_DTYPE = np.dtype([
+    ('sequence', '<i8'),
+    ('timestamp', '<i8'),  # Epoch ns (bar start for bars)
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<i8'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+    ('ticks', '<i8'),  # Ticks in a bar, 0 for ticks
+    ('timeframe', '<i4'),  # Bar length in seconds, 0 for ticks
+    ('kind', 'u1'),
+    ('symbol', 'S27')
+])
+
+# Fields a publisher provides, in order
+TICK_FIELDS = ('symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume', 'bid', 'ask')
+BAR_FIELDS = ('symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume', 'ticks')
+
+
+def _pid_alive(pid):
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _layout(shm):
+    """Header and record ring as NumPy views onto the shared memory block"""
+    header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)
+    capacity = int(header['capacity'][0])
+    records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=shm.buf, offset=HEADER_SIZE)
+    return header, records
+
+
+class TickBusPublisher:
+    """
+    Single writer of a host-wide tick bus in POSIX shared memory
+
+    Decoded ticks and bars are appended to a fixed ring of RECORD_DTYPE records with
+    increasing sequence numbers. The header's claim_seq moves before a batch is
+    written and write_seq after it, and each slot gets its sequence stamped only
+    once its fields are in place, so readers in other processes can tell finished
+    records from ones being overwritten. Only one process may publish: an existing
+    bus is taken over only when its publisher is no longer alive.
+    """
+
+    def __init__(self, name=DEFAULT_BUS_NAME, capacity=65536):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.name = name
+        self.lock = threading.Lock()  # Serializes the manager's tick processors
+        self.published = 0
+        size = HEADER_SIZE + capacity * RECORD_DTYPE.itemsize
+
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            existing = shared_memory.SharedMemory(name=name)
+            header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=existing.buf)
+            pid = int(header['publisher_pid'][0])
+            del header
+            if pid != os.getpid() and _pid_alive(pid):
+                existing.close()
+                resource_tracker.unregister(existing._name, 'shared_memory')
+                raise RuntimeError(f"Tick bus {name} is already published by process {pid}")
+            # Left behind by a publisher that died, start it afresh
+            existing.close()
+            existing.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=self.shm.buf)
+        header[0] = (MAGIC, RECORD_DTYPE.itemsize, 0, capacity, 0, 0, os.getpid(), time.time_ns(), b'')
+        self.header, self.records = _layout(self.shm)
+        self.records['sequence'] = -1
+        self.capacity = capacity
+        logger.log_websocket_event("TICK_BUS", f"Publishing tick bus {name} ({capacity} records, {size / 1048576:.1f} MiB)")
+
+    def publish_ticks(self, rows):
+        """Append ticks given as tuples in TICK_FIELDS order"""
+        self._publish(rows, TICK_FIELDS, KIND_TICK, 0)
+
+    def publish_bars(self, rows, timeframe):
+        """Append bars of `timeframe` seconds given as tuples in BAR_FIELDS order"""
+        self._publish(rows, BAR_FIELDS, KIND_BAR, timeframe)
+
+    def _publish(self, rows, fields, kind, timeframe):
+        if not rows:
+            return
+        batch = np.zeros(len(rows), dtype=RECORD_DTYPE)
+        batch['bid'] = batch['ask'] = np.nan
+        columns = list(zip(*rows))
+        for name, values in zip(fields, columns):
+            batch[name] = [value.encode('utf-8') for value in values] if name == 'symbol' else values
+        batch['kind'] = kind
+        batch['timeframe'] = timeframe
+
+        with self.lock:
+            if self.header is None:
+                return  # Closed while the batch was being built
+            header = self.header
+            records = self.records
+            capacity = self.capacity
+            first = int(header['write_seq'][0]) + 1
+            # A batch larger than the ring only keeps its newest records
+            if len(batch) > capacity:
+                first += len(batch) - capacity
+                batch = batch[-capacity:]
+            sequences = np.arange(first, first + len(batch), dtype=np.int64)
+            batch['sequence'] = -1
+            header['claim_seq'] = sequences[-1]
+
+            # At most two contiguous runs of slots, before and after the ring wraps
+            start = first % capacity
+            head = min(len(batch), capacity - start)
+            runs = [(slice(start, start + head), 0, head)]
+            if head < len(batch):
+                runs.append((slice(0, len(batch) - head), head, len(batch)))
+            for slots, begin, end in runs:
+                # Invalidate, fill, then stamp the slots so readers never take a half-written record
+                records['sequence'][slots] = -1
+                records[slots] = batch[begin:end]
+                records['sequence'][slots] = sequences[begin:end]
+            header['write_seq'] = sequences[-1]
+            self.published += len(batch)
+
+    def get_stats(self):
+        return {
+            'name': self.name,
+            'capacity': self.capacity,
+            'write_seq': int(self.header['write_seq'][0]),
+            'published': self.published
+        }
+
+    def close(self, unlink=True):
+        """Stop publishing; by default the bus is removed once readers detach"""
+        self.header = self.records = None
+        self.shm.close()
+        if unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class TickBusReader:
+    """
+    Reader of a tick bus published by another process on the same host
+
+    `records` is a zero-copy view of the ring. poll() returns the records published
+    since the previous poll as one copied array, dropping any that were overwritten
+    before or while they were read; those are counted in `lost`.
+    """
+
+    def __init__(self, name=DEFAULT_BUS_NAME, from_start=False):
+        self.name = name
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.header, self.records = _layout(self.shm)
+
+        # Readers in other processes must not unlink the block when they exit
+        if int(self.header['publisher_pid'][0]) != os.getpid():
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        if bytes(self.header['magic'][0]) != MAGIC or int(self.header['record_size'][0]) != RECORD_DTYPE.itemsize:
+            self.close()
+            raise ValueError(f"Shared memory {name} is not a compatible tick bus")
+
+        self.capacity = len(self.records)
+        write_seq = int(self.header['write_seq'][0])
+        self.next_seq = max(1, write_seq - self.capacity + 1) if from_start else write_seq + 1
+        self.lost = 0
+
+    @property
+    def write_seq(self):
+        return int(self.header['write_seq'][0])
+
+    @property
+    def publisher_alive(self):
+        """False once the publishing process has exited, its bus then never moves again"""
+        return _pid_alive(int(self.header['publisher_pid'][0]))
+
+    @property
+    def lag(self):
+        """Records published but not yet polled"""
+        return self.write_seq - self.next_seq + 1
+
+    def poll(self, max_records=None):
+        """Return new records (RECORD_DTYPE array) in sequence order"""
+        write_seq = self.write_seq
+        start = max(self.next_seq, write_seq - self.capacity + 1)
+        self.lost += start - self.next_seq
+        end = write_seq if max_records is None else min(write_seq, start + max_records - 1)
+        if end < start:
+            return np.empty(0, dtype=RECORD_DTYPE)
+
+        sequences = np.arange(start, end + 1, dtype=np.int64)
+        batch = self.records[sequences % self.capacity]
+
+        # Keep records carrying their own sequence whose slots were not claimed again during the copy
+        valid = (batch['sequence'] == sequences) & (sequences > int(self.header['claim_seq'][0]) - self.capacity)
+        if not valid.all():
+            self.lost += int((~valid).sum())
+            batch = batch[valid]
+        self.next_seq = end + 1
+        return batch
+
+    def close(self):
+        self.header = self.records = None
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def records_to_dataframe(records):
+    """Build a DataFrame from bus records, with a DatetimeIndex in local wall-clock time"""
+    if not len(records):
+        return pd.DataFrame()
+    local_offset_ns = time.localtime().tm_gmtoff * 1_000_000_000
+    index = pd.DatetimeIndex((records['timestamp'] + local_offset_ns).astype('datetime64[ns]'), name='timestamp')
+    data = {name: records[name] for name in RECORD_DTYPE.names if name not in ('timestamp', 'symbol')}
+    data['symbol'] = np.char.decode(records['symbol'], 'utf-8')
+    return pd.DataFrame(data, index=index)
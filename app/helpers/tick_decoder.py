@@ -0,0 +1,392 @@
+import struct
+import numpy as np
+
+# Subscription modes as sent in the first byte of every frame
+MODE_LTP = 1
+MODE_QUOTE = 2
+MODE_SNAP_QUOTE = 3
+MODE_DEPTH = 4
+
+# Best-five packets carry a side flag: 1 = buy, 0 = sell
+BUY_FLAG = 1
+SELL_FLAG = 0
+
+# Prices arrive in paise
+PRICE_DIVISOR = 100.0
+
+# Precompiled wire layouts (little endian, no padding)
+# Header shared by every mode: mode, exchange type, token, sequence number, exchange timestamp, LTP
+HEADER_STRUCT = struct.Struct('<BB25sqqq')
+# Quote section following the header
+QUOTE_STRUCT = struct.Struct('<qqqddqqqq')
+# Snap quote section following the quote section
+SNAP_QUOTE_STRUCT = struct.Struct('<qqd')
+BEST_FIVE_STRUCT = struct.Struct('<' + 'HqqH' * 10)
+SNAP_QUOTE_TAIL_STRUCT = struct.Struct('<qqqq')
+# Depth mode header: mode, exchange type, token, (unused), packet timestamp
+DEPTH_HEADER_STRUCT = struct.Struct('<BB25sqq')
+
+LTP_FRAME_SIZE = HEADER_STRUCT.size                                # 51
+QUOTE_FRAME_SIZE = LTP_FRAME_SIZE + QUOTE_STRUCT.size              # 123
+SNAP_QUOTE_OFFSET = QUOTE_FRAME_SIZE
+BEST_FIVE_OFFSET = SNAP_QUOTE_OFFSET + SNAP_QUOTE_STRUCT.size      # 147
+SNAP_QUOTE_TAIL_OFFSET = BEST_FIVE_OFFSET + BEST_FIVE_STRUCT.size  # 347
+SNAP_QUOTE_FRAME_SIZE = SNAP_QUOTE_TAIL_OFFSET + SNAP_QUOTE_TAIL_STRUCT.size  # 379
+DEPTH_LEVELS = 20
+DEPTH_FRAME_SIZE = DEPTH_HEADER_STRUCT.size + DEPTH_LEVELS * 2 * 10  # 443
+
+FRAME_SIZES = {
+    MODE_LTP: LTP_FRAME_SIZE,
+    MODE_QUOTE: QUOTE_FRAME_SIZE,
+    MODE_SNAP_QUOTE: SNAP_QUOTE_FRAME_SIZE,
+    MODE_DEPTH: DEPTH_FRAME_SIZE
+}
+
+# Raw wire layouts as NumPy dtypes, used by the batch decoder
+_RAW_HEADER_FIELDS = [
+    ('mode', 'u1'),
+    ('exchange_type', 'u1'),
+    ('token', 'S25'),
+    ('sequence_number', '<i8'),
+    ('exchange_timestamp', '<i8'),
+    ('last_price', '<i8')
+]
+_RAW_QUOTE_FIELDS = _RAW_HEADER_FIELDS + [
+    ('last_traded_quantity', '<i8'),
+    ('average_traded_price', '<i8'),
+    ('volume_traded', '<i8'),
+    ('total_buy_quantity', '<f8'),
+    ('total_sell_quantity', '<f8'),
+    ('open_price', '<i8'),
+    ('high_price', '<i8'),
+    ('low_price', '<i8'),
+    ('close_price', '<i8')
+]
+RAW_DEPTH_LEVEL_DTYPE = np.dtype([
+    ('flag', '<u2'),
+    ('quantity', '<i8'),
+    ('price', '<i8'),
+    ('orders', '<u2')
+])
+_RAW_SNAP_QUOTE_FIELDS = _RAW_QUOTE_FIELDS + [
+    ('last_traded_timestamp', '<i8'),
+    ('open_interest', '<i8'),
+    ('open_interest_change', '<f8'),
+    ('best_five', RAW_DEPTH_LEVEL_DTYPE, (10,)),
+    ('upper_circuit', '<i8'),
+    ('lower_circuit', '<i8'),
+    ('yearly_high', '<i8'),
+    ('yearly_low', '<i8')
+]
+
+# Depth frames share the header up to the timestamp, the sequence number slot is unused
+_RAW_DEPTH_HEADER_FIELDS = _RAW_HEADER_FIELDS[:3] + [('unused', '<i8'), ('exchange_timestamp', '<i8')]
+
+RAW_DTYPES = {
+    MODE_LTP: np.dtype(_RAW_HEADER_FIELDS),
+    MODE_QUOTE: np.dtype(_RAW_QUOTE_FIELDS),
+    MODE_SNAP_QUOTE: np.dtype(_RAW_SNAP_QUOTE_FIELDS),
+    MODE_DEPTH: np.dtype(_RAW_DEPTH_HEADER_FIELDS)
+}
+
+# Decoded tick layout produced by decode_frames()
+TICK_DTYPE = np.dtype([
+    ('mode', 'u1'),
+    ('exchange_type', 'u1'),
+    ('token', 'S25'),
+    ('sequence_number', 'i8'),
+    ('exchange_timestamp', 'i8'),
+    ('last_price', 'f8'),
+    ('last_traded_quantity', 'i8'),
+    ('average_traded_price', 'f8'),
+    ('volume_traded', 'i8'),
+    ('total_buy_quantity', 'f8'),
+    ('total_sell_quantity', 'f8'),
+    ('open_price', 'f8'),
+    ('high_price', 'f8'),
+    ('low_price', 'f8'),
+    ('close_price', 'f8'),
+    ('best_bid_price', 'f8'),
+    ('best_bid_quantity', 'i8'),
+    ('best_ask_price', 'f8'),
+    ('best_ask_quantity', 'i8')
+])
+
+# Market depth books are float64 arrays of shape (2, levels, 3):
+# book[side, level] = (price, quantity, orders) with side BID or ASK
+BID = 0
+ASK = 1
+DEPTH_PRICE = 0
+DEPTH_QUANTITY = 1
+DEPTH_ORDERS = 2
+DEPTH_LEVELS_BY_MODE = {
+    MODE_SNAP_QUOTE: 5,
+    MODE_DEPTH: DEPTH_LEVELS
+}
+# Depth mode levels: 20 buy levels followed by 20 sell levels
+RAW_DEPTH20_LEVEL_DTYPE = np.dtype([
+    ('quantity', '<i4'),
+    ('price', '<i4'),
+    ('orders', '<i2')
+])
+
+_PRICE_FIELDS = ('last_price', 'average_traded_price', 'open_price', 'high_price', 'low_price', 'close_price')
+
+
+def frame_key(frame):
+    """
+    Return the (exchange_type, token bytes) key of a raw frame without decoding it
+    """
+    return frame[1], frame[2:27].partition(b'\x00')[0]
+
+
+def decode_frame(frame):
+    """
+    Decode a single binary tick frame into a dict
+    Returns None if the frame is too short for its mode or the mode is unknown
+    """
+    size = len(frame)
+    if size < LTP_FRAME_SIZE:
+        return None
+
+    mode = frame[0]
+
+    if mode == MODE_DEPTH:
+        if size < DEPTH_HEADER_STRUCT.size:
+            return None
+        _, exchange_type, token, _, timestamp = DEPTH_HEADER_STRUCT.unpack_from(frame)
+        return {
+            'mode': mode,
+            'exchange_type': exchange_type,
+            'token': token.partition(b'\x00')[0].decode('utf-8'),
+            'exchange_timestamp': timestamp
+        }
+
+    if mode not in FRAME_SIZES or size < FRAME_SIZES[mode]:
+        return None
+
+    _, exchange_type, token, sequence_number, timestamp, ltp = HEADER_STRUCT.unpack_from(frame)
+    tick = {
+        'mode': mode,
+        'exchange_type': exchange_type,
+        'token': token.partition(b'\x00')[0].decode('utf-8'),
+        'sequence_number': sequence_number,
+        'exchange_timestamp': timestamp,
+        'last_price': ltp / PRICE_DIVISOR
+    }
+
+    if mode == MODE_LTP:
+        return tick
+
+    (ltq, atp, volume, total_buy, total_sell,
+     open_price, high_price, low_price, close_price) = QUOTE_STRUCT.unpack_from(frame, LTP_FRAME_SIZE)
+    tick['last_traded_quantity'] = ltq
+    tick['average_traded_price'] = atp / PRICE_DIVISOR
+    tick['volume_traded'] = volume
+    tick['total_buy_quantity'] = total_buy
+    tick['total_sell_quantity'] = total_sell
+    tick['open_price'] = open_price / PRICE_DIVISOR
+    tick['high_price'] = high_price / PRICE_DIVISOR
+    tick['low_price'] = low_price / PRICE_DIVISOR
+    tick['close_price'] = close_price / PRICE_DIVISOR
+
+    if mode == MODE_QUOTE:
+        return tick
+
+    last_traded_timestamp, open_interest, oi_change = SNAP_QUOTE_STRUCT.unpack_from(frame, SNAP_QUOTE_OFFSET)
+    upper_circuit, lower_circuit, yearly_high, yearly_low = SNAP_QUOTE_TAIL_STRUCT.unpack_from(frame, SNAP_QUOTE_TAIL_OFFSET)
+    tick['last_traded_timestamp'] = last_traded_timestamp
+    tick['open_interest'] = open_interest
+    tick['open_interest_change'] = oi_change
+    tick['upper_circuit'] = upper_circuit / PRICE_DIVISOR
+    tick['lower_circuit'] = lower_circuit / PRICE_DIVISOR
+    tick['yearly_high'] = yearly_high / PRICE_DIVISOR
+    tick['yearly_low'] = yearly_low / PRICE_DIVISOR
+
+    # First packets of the best-five block flagged as buy (1) / sell (0) are the top of book
+    levels = BEST_FIVE_STRUCT.unpack_from(frame, BEST_FIVE_OFFSET)
+    for i in range(0, len(levels), 4):
+        if levels[i] == BUY_FLAG and 'best_bid_price' not in tick:
+            tick['best_bid_quantity'] = levels[i + 1]
+            tick['best_bid_price'] = levels[i + 2] / PRICE_DIVISOR
+        elif levels[i] == SELL_FLAG and 'best_ask_price' not in tick:
+            tick['best_ask_quantity'] = levels[i + 1]
+            tick['best_ask_price'] = levels[i + 2] / PRICE_DIVISOR
+
+    return tick
+
+
+def decode_frames(frames, return_index=False):
+    """
+    Decode many binary tick frames at once into a NumPy structured array (TICK_DTYPE)
+    Frames are grouped by mode so each group is decoded with a single frombuffer call.
+    Fields a mode does not carry are left at zero, best bid and ask at NaN; depth
+    frames only fill the header fields. Frames that cannot be decoded (unknown mode,
+    truncated) are skipped. With return_index, returns (ticks, index) where index
+    holds the position in `frames` each tick was decoded from.
+    """
+    # mode -> (output positions, payloads); positions keep the arrival order
+    groups = {}
+    index = []
+    for position, frame in enumerate(frames):
+        if len(frame) < LTP_FRAME_SIZE:
+            continue
+        mode = frame[0]
+        if mode not in RAW_DTYPES or len(frame) < FRAME_SIZES[mode]:
+            continue
+        positions, payloads = groups.setdefault(mode, ([], []))
+        positions.append(len(index))
+        index.append(position)
+        # Frames may carry trailing bytes (depth frames their levels), keep only the mode's layout
+        size = RAW_DTYPES[mode].itemsize
+        payloads.append(frame if len(frame) == size else frame[:size])
+
+    ticks = np.zeros(len(index), dtype=TICK_DTYPE)
+    ticks['best_bid_price'] = ticks['best_ask_price'] = np.nan
+
+    for mode, (positions, payloads) in groups.items():
+        raw = np.frombuffer(b''.join(payloads), dtype=RAW_DTYPES[mode])
+        target = np.asarray(positions)
+        for name in raw.dtype.names:
+            if name not in TICK_DTYPE.names:
+                continue
+            if name in _PRICE_FIELDS:
+                ticks[name][target] = raw[name] / PRICE_DIVISOR
+            else:
+                ticks[name][target] = raw[name]
+
+        if mode == MODE_SNAP_QUOTE:
+            # Top of book is the first best-five packet flagged buy, and the first flagged sell
+            levels = raw['best_five']
+            rows = np.arange(len(raw))
+            for flag, side in ((BUY_FLAG, 'bid'), (SELL_FLAG, 'ask')):
+                flagged = levels['flag'] == flag
+                first = flagged.argmax(axis=1)
+                found = flagged.any(axis=1)
+                top = levels[rows, first]
+                ticks[f'best_{side}_price'][target[found]] = top['price'][found] / PRICE_DIVISOR
+                ticks[f'best_{side}_quantity'][target[found]] = top['quantity'][found]
+
+    if return_index:
+        return ticks, np.asarray(index, dtype=np.intp)
+    return ticks
+
+
+def new_depth_book(levels=DEPTH_LEVELS_BY_MODE[MODE_SNAP_QUOTE]):
+    """Allocate an empty (2, levels, 3) market depth book"""
+    return np.zeros((2, levels, 3), dtype=np.float64)
+
+
+def decode_depth(frame, book):
+    """
+    Decode the market depth of a snap quote (best five) or depth (20 levels) frame
+    into `book` in place. Levels beyond those carried by the frame are zeroed.
+    Returns False if the frame carries no depth.
+    """
+    mode = frame[0]
+    size = book.shape[1]
+
+    if mode == MODE_SNAP_QUOTE and len(frame) >= SNAP_QUOTE_FRAME_SIZE:
+        # Ten packets, each flagged buy or sell
+        values = BEST_FIVE_STRUCT.unpack_from(frame, BEST_FIVE_OFFSET)
+        bids = []
+        asks = []
+        for i in range(0, len(values), 4):
+            side = bids if values[i] == BUY_FLAG else asks
+            side.append((values[i + 2] / PRICE_DIVISOR, values[i + 1], values[i + 3]))
+        empty = (0.0, 0, 0)
+        bids.extend([empty] * (size - len(bids)))
+        asks.extend([empty] * (size - len(asks)))
+        book[:] = (bids[:size], asks[:size])
+        return True
+
+    if mode == MODE_DEPTH and len(frame) >= DEPTH_FRAME_SIZE:
+        # 20 buy levels then 20 sell levels, read through a zero-copy view
+        levels = np.frombuffer(
+            frame, dtype=RAW_DEPTH20_LEVEL_DTYPE, count=DEPTH_LEVELS * 2, offset=DEPTH_HEADER_STRUCT.size
+        ).reshape(2, DEPTH_LEVELS)
+        count = min(size, DEPTH_LEVELS)
+        levels = levels[:, :count]
+        book[:, :count, DEPTH_PRICE] = levels['price']
+        book[:, :count, DEPTH_PRICE] /= PRICE_DIVISOR
+        book[:, :count, DEPTH_QUANTITY] = levels['quantity']
+        book[:, :count, DEPTH_ORDERS] = levels['orders']
+        book[:, count:] = 0
+        return True
+
+    return False
+
+
+def encode_frame(tick):
+    """
+    Build a binary frame from a dict in the decode_frame() format
+    Used to produce synthetic frames for tests, benchmarks and replay
+    """
+    mode = tick.get('mode', MODE_LTP)
+    token = str(tick.get('token', '')).encode('utf-8')
+
+    # Depth levels are given as lists of (price, quantity, orders)
+    bids = list(tick.get('bids', []))
+    asks = list(tick.get('asks', []))
+
+    if mode == MODE_DEPTH:
+        frame = bytearray(DEPTH_FRAME_SIZE)
+        DEPTH_HEADER_STRUCT.pack_into(
+            frame, 0, mode, tick.get('exchange_type', 1), token,
+            0, tick.get('exchange_timestamp', 0)
+        )
+        levels = np.zeros(DEPTH_LEVELS * 2, dtype=RAW_DEPTH20_LEVEL_DTYPE)
+        for offset, side in ((0, bids), (DEPTH_LEVELS, asks)):
+            for i, (price, quantity, orders) in enumerate(side[:DEPTH_LEVELS]):
+                levels[offset + i] = (quantity, round(price * PRICE_DIVISOR), orders)
+        frame[DEPTH_HEADER_STRUCT.size:] = levels.tobytes()
+        return bytes(frame)
+
+    frame = bytearray(FRAME_SIZES[mode])
+    HEADER_STRUCT.pack_into(
+        frame, 0, mode, tick.get('exchange_type', 1), token,
+        tick.get('sequence_number', 0),
+        tick.get('exchange_timestamp', 0),
+        round(tick.get('last_price', 0) * PRICE_DIVISOR)
+    )
+
+    if mode in (MODE_QUOTE, MODE_SNAP_QUOTE):
+        QUOTE_STRUCT.pack_into(
+            frame, LTP_FRAME_SIZE,
+            tick.get('last_traded_quantity', 0),
+            round(tick.get('average_traded_price', 0) * PRICE_DIVISOR),
+            tick.get('volume_traded', 0),
+            float(tick.get('total_buy_quantity', 0)),
+            float(tick.get('total_sell_quantity', 0)),
+            round(tick.get('open_price', 0) * PRICE_DIVISOR),
+            round(tick.get('high_price', 0) * PRICE_DIVISOR),
+            round(tick.get('low_price', 0) * PRICE_DIVISOR),
+            round(tick.get('close_price', 0) * PRICE_DIVISOR)
+        )
+
+    if mode == MODE_SNAP_QUOTE:
+        SNAP_QUOTE_STRUCT.pack_into(
+            frame, SNAP_QUOTE_OFFSET,
+            tick.get('last_traded_timestamp', 0),
+            tick.get('open_interest', 0),
+            float(tick.get('open_interest_change', 0))
+        )
+        if not bids and 'best_bid_price' in tick:
+            bids = [(tick['best_bid_price'], tick.get('best_bid_quantity', 0), 0)]
+        if not asks and 'best_ask_price' in tick:
+            asks = [(tick['best_ask_price'], tick.get('best_ask_quantity', 0), 0)]
+        levels = []
+        for flag, side in ((BUY_FLAG, bids), (SELL_FLAG, asks)):
+            side = side[:5] + [(0, 0, 0)] * (5 - len(side[:5]))
+            for price, quantity, orders in side:
+                levels.extend((flag, quantity, round(price * PRICE_DIVISOR), orders))
+        BEST_FIVE_STRUCT.pack_into(frame, BEST_FIVE_OFFSET, *levels)
+        SNAP_QUOTE_TAIL_STRUCT.pack_into(
+            frame, SNAP_QUOTE_TAIL_OFFSET,
+            round(tick.get('upper_circuit', 0) * PRICE_DIVISOR),
+            round(tick.get('lower_circuit', 0) * PRICE_DIVISOR),
+            round(tick.get('yearly_high', 0) * PRICE_DIVISOR),
+            round(tick.get('yearly_low', 0) * PRICE_DIVISOR)
+        )
+
+    return bytes(frame)
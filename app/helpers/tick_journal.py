@@ -0,0 +1,319 @@
+import os
+import mmap
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from app.helpers.logger_helper import logger
+
+# File header: magic, format version, committed end of the record area
+JOURNAL_MAGIC = b'TICKJRNL'
+JOURNAL_VERSION = 1
+FILE_HEADER_STRUCT = struct.Struct('<8sIxxxxq')
+FILE_HEADER_SIZE = 32
+
+# Record: receive time (epoch ns), frame length, then the raw frame bytes
+RECORD_HEADER_STRUCT = struct.Struct('<qH')
+RECORD_HEADER_SIZE = RECORD_HEADER_STRUCT.size
+
+# Sparse time index entries written alongside the journal
+INDEX_DTYPE = np.dtype([('receive_ns', '<i8'), ('offset', '<i8')])
+
+JOURNAL_SUFFIX = '.ticks'
+INDEX_SUFFIX = '.idx'
+
+
+def journal_path(directory, day):
+    """Path of the journal file for a date"""
+    return os.path.join(directory, day.strftime('%Y%m%d') + JOURNAL_SUFFIX)
+
+
+def list_journals(directory):
+    """Journal files in a directory, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith(JOURNAL_SUFFIX)
+    )
+
+
+def _next_midnight_ns(receive_ns):
+    """Epoch ns of the local midnight following a receive time"""
+    day = datetime.fromtimestamp(receive_ns / 1e9).date() + timedelta(days=1)
+    return int(datetime(day.year, day.month, day.day).timestamp()) * 1_000_000_000
+
+
+class TickJournal:
+    """
+    Append-only per-day journal of raw binary frames
+
+    record() only appends to an in-memory batch, a background thread copies batches
+    into the memory-mapped file of the receive day. The file grows in chunks and its
+    header holds the committed end offset, so readers never see a partial batch.
+    Every `index_interval_ns` of receive time an (receive_ns, offset) entry is added
+    to the sparse index file next to the journal.
+    """
+
+    def __init__(self, directory=None, flush_interval=0.2, grow_bytes=64 * 1024 * 1024,
+                 index_interval_ns=1_000_000_000):
+        self.directory = directory or os.path.join(os.getcwd(), 'journal')
+        self.flush_interval = flush_interval
+        self.grow_bytes = grow_bytes
+        self.index_interval_ns = index_interval_ns
+        self.lock = threading.Lock()  # Guards the pending batch, held only to append or swap it
+        self.flush_lock = threading.Lock()  # Serializes writers of the mapped file
+        self.pending = []  # (receive_ns, frame) waiting for the flusher
+        self.path = None
+        self.file = None
+        self.mm = None
+        self.index_file = None
+        self.end = FILE_HEADER_SIZE  # Committed end of the record area
+        self.day_end_ns = 0  # Records received from here on go to the next day's file
+        self.next_index_ns = 0
+        self.records = 0
+        self.bytes_written = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """Start the background flusher"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._flush_loop, name="TickJournal")
+        self.thread.daemon = True
+        self.thread.start()
+        logger.log_websocket_event("JOURNAL", f"Tick journal started in {self.directory}")
+
+    def stop(self):
+        """Flush everything pending and close the current file"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+        self.flush()
+        with self.flush_lock:
+            self._close_file()
+        logger.log_websocket_event("JOURNAL", f"Tick journal stopped after {self.records} records")
+
+    def record(self, frame, receive_ns=None):
+        """
+        Queue a raw frame for the journal; called on the WebSocket threads
+        `receive_ns` is the stamp the frame's latency is measured from, the frame is
+        stamped now without one. Each flush writes its frames in stamp order.
+        """
+        with self.lock:
+            self.pending.append((time.time_ns() if receive_ns is None else receive_ns, frame))
+
+    def _flush_loop(self):
+        while self.running:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.log_websocket_event("JOURNAL_ERROR", f"Error flushing tick journal: {str(e)}", level="error")
+
+    def flush(self):
+        """Write all pending frames to the journal, returns the number of records written"""
+        with self.flush_lock:
+            with self.lock:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return 0
+            # Connections stamp frames before queueing them, so theirs can interleave slightly
+            batch.sort(key=lambda record: record[0])
+
+            started = time.perf_counter()
+            start = 0
+            while start < len(batch):
+                first_ns = batch[start][0]
+                if self.mm is None or first_ns >= self.day_end_ns:
+                    self._open_day(first_ns)
+
+                # Records up to the next midnight belong to the current file
+                stop = start
+                while stop < len(batch) and batch[stop][0] < self.day_end_ns:
+                    stop += 1
+                self._write_records(batch[start:stop])
+                start = stop
+
+            self.flushes += 1
+            self.last_flush_seconds = time.perf_counter() - started
+            return len(batch)
+
+    def _write_records(self, records):
+        """Copy records into the mapped file with one memmove, then commit the new end"""
+        pack = RECORD_HEADER_STRUCT.pack
+        chunks = []
+        index_entries = []
+        offset = self.end
+        for receive_ns, frame in records:
+            if receive_ns >= self.next_index_ns:
+                index_entries.append((receive_ns, offset))
+                self.next_index_ns = receive_ns - receive_ns % self.index_interval_ns + self.index_interval_ns
+            chunks.append(pack(receive_ns, len(frame)))
+            chunks.append(frame)
+            offset += RECORD_HEADER_SIZE + len(frame)
+
+        data = b''.join(chunks)
+        self._ensure_capacity(self.end + len(data))
+        self.mm[self.end:self.end + len(data)] = data
+        self.end += len(data)
+
+        # Commit the records before indexing them, so the index never points past the end
+        FILE_HEADER_STRUCT.pack_into(self.mm, 0, JOURNAL_MAGIC, JOURNAL_VERSION, self.end)
+        if index_entries:
+            self.index_file.write(np.array(index_entries, dtype=INDEX_DTYPE).tobytes())
+            self.index_file.flush()
+
+        self.records += len(records)
+        self.bytes_written += len(data)
+
+    def _ensure_capacity(self, size):
+        """Grow the file and its mapping in chunks"""
+        if size <= len(self.mm):
+            return
+        new_size = len(self.mm)
+        while new_size < size:
+            new_size += self.grow_bytes
+        self.mm.flush()
+        self.mm.close()
+        self.file.truncate(new_size)
+        self.mm = mmap.mmap(self.file.fileno(), new_size)
+
+    def _open_day(self, receive_ns):
+        """Switch to the journal file of the day a receive time falls in"""
+        self._close_file()
+        os.makedirs(self.directory, exist_ok=True)
+        day = datetime.fromtimestamp(receive_ns / 1e9).date()
+        self.path = journal_path(self.directory, day)
+        self.day_end_ns = _next_midnight_ns(receive_ns)
+
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) >= FILE_HEADER_SIZE
+        self.file = open(self.path, 'r+b' if exists else 'w+b')
+        if not exists:
+            self.file.truncate(FILE_HEADER_SIZE + self.grow_bytes)
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+
+        if exists:
+            magic, version, end = FILE_HEADER_STRUCT.unpack_from(self.mm, 0)
+            if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+                raise ValueError(f"{self.path} is not a version {JOURNAL_VERSION} tick journal")
+            # Continue after the last committed batch, anything beyond it was never committed
+            self.end = end
+        else:
+            self.end = FILE_HEADER_SIZE
+            FILE_HEADER_STRUCT.pack_into(self.mm, 0, JOURNAL_MAGIC, JOURNAL_VERSION, self.end)
+
+        self.index_file = open(self.path[:-len(JOURNAL_SUFFIX)] + INDEX_SUFFIX, 'ab')
+        self.next_index_ns = 0  # Index the first record written to this file
+        logger.log_websocket_event("JOURNAL", f"Writing tick journal {self.path}")
+
+    def _close_file(self):
+        if self.mm is not None:
+            self.mm.flush()
+            self.mm.close()
+            self.mm = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.index_file is not None:
+            self.index_file.close()
+            self.index_file = None
+
+    def get_stats(self):
+        """Get journal write statistics"""
+        return {
+            'path': self.path,
+            'records': self.records,
+            'bytes_written': self.bytes_written,
+            'pending': len(self.pending),
+            'flushes': self.flushes,
+            'last_flush_ms': round(self.last_flush_seconds * 1000, 3)
+        }
+
+
+class TickJournalReader:
+    """
+    Read-only, zero-copy view of a journal file
+
+    Frames are returned as memoryviews into the mapping; release them before close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self.mm)
+
+        magic, version, _ = FILE_HEADER_STRUCT.unpack_from(self.mm, 0)
+        if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {JOURNAL_VERSION} tick journal")
+
+        index_path = path[:-len(JOURNAL_SUFFIX)] + INDEX_SUFFIX
+        if os.path.exists(index_path) and os.path.getsize(index_path) >= INDEX_DTYPE.itemsize:
+            self.index = np.fromfile(index_path, dtype=INDEX_DTYPE)
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __iter__(self):
+        return self.iter_records()
+
+    @property
+    def end(self):
+        """Committed end of the record area; grows while a writer is appending"""
+        return FILE_HEADER_STRUCT.unpack_from(self.mm, 0)[2]
+
+    def seek(self, receive_ns):
+        """Offset of the first record received at or after `receive_ns`"""
+        offset = FILE_HEADER_SIZE
+        if len(self.index):
+            # Start from the last index entry at or before the target, then scan
+            position = int(np.searchsorted(self.index['receive_ns'], receive_ns, side='right')) - 1
+            if position >= 0:
+                offset = int(self.index['offset'][position])
+
+        end = min(self.end, len(self.mm))
+        unpack_from = RECORD_HEADER_STRUCT.unpack_from
+        while offset < end:
+            record_ns, length = unpack_from(self.mm, offset)
+            if record_ns >= receive_ns:
+                break
+            offset += RECORD_HEADER_SIZE + length
+        return offset
+
+    def iter_records(self, start_ns=None, end_ns=None):
+        """Yield (receive_ns, frame memoryview) for records in [start_ns, end_ns)"""
+        offset = FILE_HEADER_SIZE if start_ns is None else self.seek(start_ns)
+        end = min(self.end, len(self.mm))
+        unpack_from = RECORD_HEADER_STRUCT.unpack_from
+        buffer = self.buffer
+        while offset < end:
+            receive_ns, length = unpack_from(self.mm, offset)
+            if end_ns is not None and receive_ns >= end_ns:
+                return
+            start = offset + RECORD_HEADER_SIZE
+            yield receive_ns, buffer[start:start + length]
+            offset = start + length
+
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.release()
+            self.buffer = None
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
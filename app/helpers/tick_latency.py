@@ -0,0 +1,137 @@
+import numpy as np
+
+# Pipeline stages measured for every tick
+EXCHANGE_TO_RECEIVE = 'exchange_to_receive'  # Exchange timestamp in the frame -> _on_data
+RECEIVE_TO_DEQUEUE = 'receive_to_dequeue'  # _on_data -> taken off the update queue
+DEQUEUE_TO_DECODE = 'dequeue_to_decode'  # Taken off the queue -> frame decoded
+DECODE_TO_DISPATCH = 'decode_to_dispatch'  # Decoded -> buffered and handed to the callback dispatcher
+RECEIVE_TO_DISPATCH = 'receive_to_dispatch'  # Whole in-process path
+STAGES = (EXCHANGE_TO_RECEIVE, RECEIVE_TO_DEQUEUE, DEQUEUE_TO_DECODE, DECODE_TO_DISPATCH, RECEIVE_TO_DISPATCH)
+
+# Log-linear buckets: each power of two in nanoseconds is split into SUB_BUCKETS,
+# which bounds the percentile error to 1 / SUB_BUCKETS of the value
+SUB_BUCKETS = 8
+BUCKET_COUNT = 64 * SUB_BUCKETS
+
+# Below this many samples a Python loop beats the NumPy call overhead
+VECTOR_THRESHOLD = 32
+
+
+def bucket_upper_bounds():
+    """Upper bound in ns of every bucket"""
+    exponents = np.arange(BUCKET_COUNT) // SUB_BUCKETS
+    subs = np.arange(BUCKET_COUNT) % SUB_BUCKETS
+    return np.ldexp(1.0 + (subs + 1) / SUB_BUCKETS, exponents - 1)
+
+
+BUCKET_UPPER_NS = bucket_upper_bounds()
+
+
+def bucket_index(value_ns):
+    """Bucket index of one latency in plain integer arithmetic, matching bucket_indices()"""
+    value = max(int(value_ns), 1)
+    exponent = value.bit_length()
+    # The SUB_BUCKETS bits below the leading one select the sub-bucket
+    shift = exponent - 4
+    sub = (value >> shift) & 7 if shift >= 0 else (value << -shift) & 7
+    return min(exponent * SUB_BUCKETS + sub, BUCKET_COUNT - 1)
+
+
+def bucket_indices(values_ns):
+    """Bucket index of each latency; values below 1 ns land in the first bucket"""
+    values = np.maximum(np.asarray(values_ns, dtype=np.float64), 1.0)
+    # values = mantissa * 2**exponent with mantissa in [0.5, 1)
+    mantissa, exponent = np.frexp(values)
+    subs = ((mantissa * 2.0 - 1.0) * SUB_BUCKETS).astype(np.int64)
+    return np.minimum(exponent.astype(np.int64) * SUB_BUCKETS + subs, BUCKET_COUNT - 1)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram in nanoseconds
+
+    Writers only add to preallocated counters and never take a lock, so each
+    histogram must have a single writer thread. Readers may see a sample counted
+    in one field and not yet in another, which is harmless for monitoring.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(BUCKET_COUNT, dtype=np.int64)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, value_ns, count=1):
+        """Record one latency, optionally shared by `count` ticks"""
+        value_ns = max(int(value_ns), 0)
+        self.counts[bucket_index(value_ns)] += count
+        self.count += count
+        self.total_ns += value_ns * count
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def record_many(self, values_ns):
+        """Record many latencies; large batches use one bincount"""
+        if len(values_ns) < VECTOR_THRESHOLD:
+            for value_ns in values_ns:
+                self.record(value_ns)
+            return
+
+        values = np.maximum(np.asarray(values_ns, dtype=np.int64), 0)
+        self.counts += np.bincount(bucket_indices(values), minlength=BUCKET_COUNT)
+        self.count += len(values)
+        self.total_ns += int(values.sum())
+        largest = int(values.max())
+        if largest > self.max_ns:
+            self.max_ns = largest
+
+    def merge(self, other):
+        """Add another histogram's samples to this one"""
+        self.counts += other.counts
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        return self
+
+    def percentile(self, q):
+        """Approximate q-th percentile in ns (upper bound of the bucket holding it)"""
+        if not self.count:
+            return 0.0
+        cumulative = np.cumsum(self.counts)
+        position = int(np.searchsorted(cumulative, cumulative[-1] * q / 100.0))
+        return min(float(BUCKET_UPPER_NS[min(position, BUCKET_COUNT - 1)]), float(self.max_ns))
+
+    def get_stats(self):
+        """Summary in microseconds"""
+        return {
+            'count': int(self.count),
+            'mean_us': round(self.total_ns / self.count / 1000, 1) if self.count else 0.0,
+            'p50_us': round(self.percentile(50) / 1000, 1),
+            'p99_us': round(self.percentile(99) / 1000, 1),
+            'max_us': round(self.max_ns / 1000, 1)
+        }
+
+
+class LatencyRecorder:
+    """One histogram per pipeline stage"""
+
+    def __init__(self):
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+
+    def __getitem__(self, stage):
+        return self.stages[stage]
+
+    def reset(self):
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+
+    @classmethod
+    def merged(cls, recorders):
+        """A new recorder holding the samples of several recorders"""
+        total = cls()
+        for recorder in recorders:
+            for stage, histogram in recorder.stages.items():
+                total.stages[stage].merge(histogram)
+        return total
+
+    def get_stats(self):
+        return {stage: histogram.get_stats() for stage, histogram in self.stages.items()}
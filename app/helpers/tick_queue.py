@@ -0,0 +1,151 @@
+import itertools
+import queue
+import threading
+from collections import deque
+
+# Overflow policies
+POLICY_CONFLATE = 'conflate'  # Keep only the newest pending frame per (mode, exchange, token)
+POLICY_BLOCK = 'block'  # Make the producer wait for space
+POLICY_DROP_OLDEST = 'drop_oldest'  # Discard the oldest pending message to make space
+POLICIES = (POLICY_CONFLATE, POLICY_BLOCK, POLICY_DROP_OLDEST)
+
+# Binary frames start with mode (1 byte), exchange type (1 byte) and the 25 byte token
+CONFLATION_KEY_SIZE = 27
+
+
+class TickQueue:
+    """
+    Bounded ingestion queue between a WebSocket connection and its tick processor
+
+    Messages are kept in arrival order as keys into a dict. In conflate mode a binary
+    frame for a (mode, exchange, token) that is already pending replaces the queued
+    frame in place, so the processor only sees the newest state of each instrument
+    and the backlog can never exceed the number of subscribed tokens. Other messages
+    get unique keys and are never conflated. When the queue is full, block mode makes
+    the producer wait and the other modes drop the oldest pending message.
+    """
+
+    def __init__(self, maxsize=10000, policy=POLICY_CONFLATE):
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._keys = deque()  # Pending keys in arrival order
+        self._messages = {}  # key -> (newest message for that key, its receive time in ns)
+        self._sequence = itertools.count()  # Unique keys for messages that are not conflated
+        self.maxsize = 0
+        self.policy = None
+        self.put_count = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.high_water = 0
+        self.configure(maxsize, policy)
+
+    def configure(self, maxsize=None, policy=None):
+        """Change the size limit or overflow policy; pending messages are kept"""
+        if maxsize is not None and maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        if policy is not None and policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if policy is not None:
+                self.policy = policy
+            self._not_full.notify_all()
+
+    def qsize(self):
+        return len(self._keys)
+
+    def empty(self):
+        return not self._keys
+
+    def put(self, message, receive_ns=0):
+        """Queue a message, applying the overflow policy when the queue is full"""
+        with self._lock:
+            self.put_count += 1
+
+            if (self.policy == POLICY_CONFLATE and isinstance(message, bytes)
+                    and len(message) >= CONFLATION_KEY_SIZE):
+                key = message[:CONFLATION_KEY_SIZE]
+                if key in self._messages:
+                    # Replace the pending frame, keeping its place in the queue
+                    self._messages[key] = (message, receive_ns)
+                    self.conflated += 1
+                    return
+            else:
+                key = next(self._sequence)
+
+            if len(self._keys) >= self.maxsize:
+                if self.policy == POLICY_BLOCK:
+                    self.blocked += 1
+                    while len(self._keys) >= self.maxsize and self.policy == POLICY_BLOCK:
+                        self._not_full.wait()
+                # Evict from the front until there is room (policy may have changed while blocked)
+                while len(self._keys) >= self.maxsize:
+                    del self._messages[self._keys.popleft()]
+                    self.dropped += 1
+
+            self._keys.append(key)
+            self._messages[key] = (message, receive_ns)
+            if len(self._keys) > self.high_water:
+                self.high_water = len(self._keys)
+            self._not_empty.notify()
+
+    def get_batch(self, max_items, timeout=None):
+        """
+        Remove up to `max_items` messages in arrival order
+
+        Blocks until at least one message is queued, or raises queue.Empty once `timeout`
+        seconds pass without one.
+        """
+        return [message for message, _ in self.get_batch_stamped(max_items, timeout)]
+
+    def get_batch_stamped(self, max_items, timeout=None):
+        """Like get_batch(), returning (message, receive_ns) pairs"""
+        with self._lock:
+            if not self._keys:
+                self._not_empty.wait(timeout)
+                if not self._keys:
+                    raise queue.Empty
+
+            count = min(max_items, len(self._keys))
+            popleft = self._keys.popleft
+            pop = self._messages.pop
+            batch = [pop(popleft()) for _ in range(count)]
+            self._not_full.notify_all()
+            return batch
+
+    def get(self, timeout=None):
+        """Remove and return the oldest message"""
+        return self.get_batch(1, timeout)[0]
+
+    def get_nowait(self):
+        """Remove and return the oldest message without waiting"""
+        with self._lock:
+            if not self._keys:
+                raise queue.Empty
+            message, _ = self._messages.pop(self._keys.popleft())
+            self._not_full.notify()
+            return message
+
+    def clear(self):
+        """Discard all pending messages"""
+        with self._lock:
+            self._keys.clear()
+            self._messages.clear()
+            self._not_full.notify_all()
+
+    def get_stats(self):
+        """Get queue depth and overload counters"""
+        return {
+            'policy': self.policy,
+            'maxsize': self.maxsize,
+            'size': len(self._keys),
+            'high_water': self.high_water,
+            'put_count': self.put_count,
+            'conflated': self.conflated,
+            'dropped': self.dropped,
+            'blocked': self.blocked
+        }
@@ -0,0 +1,304 @@
+import threading
+import time
+import numpy as np
+from app.helpers.logger_helper import logger
+from app.helpers.tick_decoder import encode_frame, frame_key, MODE_QUOTE
+from app.helpers.tick_journal import TickJournalReader
+
+
+def journal_source(paths, start_ns=None, end_ns=None):
+    """Yield (receive_ns, frame) from recorded journal files in order"""
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        with TickJournalReader(path) as reader:
+            for receive_ns, data in reader.iter_records(start_ns, end_ns):
+                yield receive_ns, bytes(data)
+                del data
+
+
+def synthetic_source(tokens, ticks_per_token, interval_ns=1_000_000, mode=MODE_QUOTE,
+                     exchange_type=1, start_ns=None, seed=0):
+    """
+    Yield (receive_ns, frame) for a random walk on each token, round-robin across tokens
+
+    One tick per token is produced every `interval_ns`, so the real-time rate is
+    len(tokens) * 1e9 / interval_ns frames per second.
+    """
+    rng = np.random.default_rng(seed)
+    start_ns = time.time_ns() if start_ns is None else start_ns
+    prices = 100.0 + rng.random(len(tokens)) * 900.0
+    volumes = np.zeros(len(tokens), dtype=np.int64)
+    sequence = 0
+
+    for step in range(ticks_per_token):
+        receive_ns = start_ns + step * interval_ns
+        prices *= 1.0 + rng.normal(0.0, 0.0005, len(tokens))
+        volumes += rng.integers(1, 500, len(tokens))
+        for i, token in enumerate(tokens):
+            sequence += 1
+            price = round(float(prices[i]), 2)
+            yield receive_ns, encode_frame({
+                'mode': mode,
+                'exchange_type': exchange_type,
+                'token': str(token),
+                'sequence_number': sequence,
+                'exchange_timestamp': receive_ns // 1_000_000,
+                'last_price': price,
+                'open_price': price,
+                'high_price': price,
+                'low_price': price,
+                'close_price': price,
+                'volume_traded': int(volumes[i])
+            })
+
+
+class ReplayWebSocket:
+    """
+    Stand-in for SmartWebSocketV2 fed by a TickReplay instead of the broker
+
+    Like the real client it calls on_open from connect() and then blocks until the
+    connection is closed, and it only delivers frames for tokens it subscribed.
+    """
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.tokens = set()  # (exchange_type, token bytes) subscribed on this connection
+        self.closed = threading.Event()
+        self.on_open = None
+        self.on_data = None
+        self.on_error = None
+        self.on_close = None
+
+    def connect(self):
+        self.closed.clear()
+        self.replay._attach(self)
+        self.on_open(None)
+        self.closed.wait()
+
+    def subscribe(self, correlation_id, mode, token_list):
+        for entry in token_list:
+            for token in entry['tokens']:
+                key = (int(entry['exchangeType']), str(token).encode('utf-8'))
+                self.tokens.add(key)
+                self.replay._route(key, self)
+
+    def unsubscribe(self, correlation_id, token_list):
+        for entry in token_list:
+            for token in entry['tokens']:
+                key = (int(entry['exchangeType']), str(token).encode('utf-8'))
+                self.tokens.discard(key)
+                self.replay._unroute(key, self)
+
+    def send(self, message):
+        if message == "ping":
+            self.on_data(None, "pong")
+
+    def close_connection(self):
+        self.replay._detach(self)
+        self.closed.set()
+
+
+class TickReplay:
+    """
+    Drive AngelOneWebSocketManager offline from recorded or synthetic frames
+
+    Pass the instance to manager.set_transport() (or use attach()); every pooled
+    connection then gets a ReplayWebSocket. Frames are paced by their receive time
+    divided by `speed`, or sent as fast as possible when speed is None. While running,
+    the manager's status is sampled to measure sustained throughput and to find the
+    point where the pipeline stops keeping up.
+    """
+
+    def __init__(self, source, speed=1.0, sample_interval=1.0, behind_queue_size=1000):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive, or None for maximum speed")
+
+        self.source = source
+        self.speed = speed
+        self.sample_interval = sample_interval
+        self.behind_queue_size = behind_queue_size  # Backlog that counts as falling behind
+        self.lock = threading.Lock()
+        self.transports = []
+        self.routes = {}  # (exchange_type, token bytes) -> ReplayWebSocket
+        self.manager = None
+        self.thread = None
+        self.running = False
+        self.finished = threading.Event()
+        self.frames_sent = 0
+        self.frames_unrouted = 0
+        self.max_schedule_lag = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self.samples = []
+        self.fell_behind = None
+        self._baseline = None
+
+    def __call__(self, auth_token=None, api_key=None, client_code=None, feed_token=None):
+        """Transport factory with the SmartWebSocketV2 signature"""
+        return ReplayWebSocket(self)
+
+    def attach(self, manager):
+        """Make the manager's connections replay transports, with placeholder credentials if needed"""
+        if not all([manager.auth_token, manager.api_key, manager.client_code, manager.feed_token]):
+            manager.configure('replay', 'replay', 'replay', 'replay')
+        manager.set_transport(self)
+        self.manager = manager
+        return self
+
+    def _attach(self, transport):
+        with self.lock:
+            if transport not in self.transports:
+                self.transports.append(transport)
+
+    def _detach(self, transport):
+        with self.lock:
+            if transport in self.transports:
+                self.transports.remove(transport)
+            for key in list(transport.tokens):
+                if self.routes.get(key) is transport:
+                    del self.routes[key]
+
+    def _route(self, key, transport):
+        with self.lock:
+            self.routes[key] = transport
+
+    def _unroute(self, key, transport):
+        with self.lock:
+            if self.routes.get(key) is transport:
+                del self.routes[key]
+
+    def start(self, manager=None):
+        """Start replaying on a background thread"""
+        if manager is not None:
+            self.manager = manager
+        self.running = True
+        self.finished.clear()
+        self.thread = threading.Thread(target=self._run, name="TickReplay")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def run(self, manager=None, timeout=None):
+        """Replay the whole source, wait for the pipeline to drain and return the report"""
+        self.start(manager)
+        self.finished.wait(timeout)
+        return self.get_report()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def _run(self):
+        logger.log_websocket_event("REPLAY", f"Replay started at {'max' if self.speed is None else f'{self.speed}x'} speed")
+        self.started_at = time.perf_counter()
+        self._baseline = self._status()
+        next_sample = self.started_at + self.sample_interval
+        first_ns = None
+        routes = self.routes
+
+        try:
+            for receive_ns, frame in self.source:
+                if not self.running:
+                    break
+
+                now = time.perf_counter()
+                if self.speed is not None:
+                    if first_ns is None:
+                        first_ns = receive_ns
+                    # Sleep until the frame is due, or record how late it is
+                    due = self.started_at + (receive_ns - first_ns) / 1e9 / self.speed
+                    if due > now:
+                        time.sleep(due - now)
+                        now = time.perf_counter()
+                    elif now - due > self.max_schedule_lag:
+                        self.max_schedule_lag = now - due
+
+                if now >= next_sample:
+                    self._sample(now)
+                    next_sample = now + self.sample_interval
+
+                transport = routes.get(frame_key(frame))
+                if transport is None:
+                    self.frames_unrouted += 1
+                    continue
+                transport.on_data(None, frame)
+                self.frames_sent += 1
+
+            self.finished_at = time.perf_counter()
+            self._drain()
+        except Exception as e:
+            logger.log_websocket_event("REPLAY_ERROR", f"Replay failed: {str(e)}", level="error")
+        finally:
+            if self.finished_at is None:
+                self.finished_at = time.perf_counter()
+            self.running = False
+            self.finished.set()
+            logger.log_websocket_event("REPLAY", f"Replay finished: {self.frames_sent} frames in {self.finished_at - self.started_at:.2f}s")
+
+    def _status(self):
+        return self.manager.get_connection_status() if self.manager is not None else None
+
+    def _drain(self, timeout=30):
+        """Wait until the manager has processed everything it was sent"""
+        deadline = time.perf_counter() + timeout
+        baseline = self._baseline
+        while self.manager is not None and time.perf_counter() < deadline:
+            status = self._status()
+            # Every sent frame is either processed or was conflated or dropped in the queue
+            accounted = sum(status[name] - baseline[name] for name in ('processed_count', 'queue_conflated', 'queue_dropped'))
+            if status['queue_size'] == 0 and accounted >= self.frames_sent:
+                break
+            time.sleep(0.01)
+        self._sample(time.perf_counter())
+
+    def _sample(self, now):
+        """Record throughput and backlog, and note the first sample where the pipeline fell behind"""
+        status = self._status()
+        elapsed = now - self.started_at
+        sample = {
+            'elapsed': round(elapsed, 3),
+            'frames_sent': self.frames_sent,
+            'send_rate': round(self.frames_sent / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        if status is not None:
+            baseline = self._baseline
+            sample.update({
+                'processed': status['processed_count'] - baseline['processed_count'],
+                'queue_size': status['queue_size'],
+                'conflated': status['queue_conflated'] - baseline['queue_conflated'],
+                'dropped': status['queue_dropped'] - baseline['queue_dropped']
+            })
+            behind = (
+                sample['queue_size'] >= self.behind_queue_size
+                or sample['conflated'] > 0
+                or sample['dropped'] > 0
+            )
+            if behind and self.fell_behind is None:
+                self.fell_behind = sample
+        self.samples.append(sample)
+
+    def get_report(self):
+        """Throughput summary of the replay so far"""
+        if self.started_at is None:
+            return None
+        end = self.finished_at or time.perf_counter()
+        elapsed = end - self.started_at
+        last = self.samples[-1] if self.samples else {}
+        processed = last.get('processed')
+        return {
+            'speed': self.speed,
+            'elapsed': round(elapsed, 3),
+            'frames_sent': self.frames_sent,
+            'frames_unrouted': self.frames_unrouted,
+            'send_rate': round(self.frames_sent / elapsed, 1) if elapsed > 0 else 0.0,
+            'processed': processed,
+            'processed_rate': round(processed / last['elapsed'], 1) if processed and last.get('elapsed') else None,
+            'conflated': last.get('conflated'),
+            'dropped': last.get('dropped'),
+            'max_queue_size': max((sample.get('queue_size', 0) for sample in self.samples), default=0),
+            'max_schedule_lag_ms': round(self.max_schedule_lag * 1000, 3),
+            'fell_behind': self.fell_behind,
+            'finished': self.finished.is_set()
+        }
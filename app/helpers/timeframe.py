@@ -0,0 +1,196 @@
+import re
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+
+NS_PER_SECOND = 1_000_000_000
+DAY_SECONDS = 86400
+
+# Ticks per second of each DatetimeIndex resolution
+UNIT_TICKS = {'s': 1, 'ms': 1_000, 'us': 1_000_000, 'ns': NS_PER_SECOND}
+
+# Units accepted after the count in a timeframe string, lower case, so 'M' is a minute too
+UNIT_SECONDS = {
+    's': 1, 'sec': 1, 'second': 1, 'seconds': 1,
+    'm': 60, 't': 60, 'min': 60, 'mins': 60, 'minute': 60, 'minutes': 60,
+    'h': 3600, 'hr': 3600, 'hour': 3600, 'hours': 3600,
+    'd': DAY_SECONDS, 'day': DAY_SECONDS, 'days': DAY_SECONDS
+}
+
+# AngelOne historical candle intervals by length in seconds
+ANGELONE_INTERVALS = {
+    60: 'ONE_MINUTE',
+    180: 'THREE_MINUTE',
+    300: 'FIVE_MINUTE',
+    600: 'TEN_MINUTE',
+    900: 'FIFTEEN_MINUTE',
+    1800: 'THIRTY_MINUTE',
+    3600: 'ONE_HOUR',
+    86400: 'ONE_DAY'
+}
+
+# Session open and close in minutes after local midnight; intraday bars start at the open
+SESSION_OPEN_MINUTES = {'NSE': 555, 'BSE': 555, 'NFO': 555, 'BFO': 555, 'CDS': 540, 'MCX': 540}
+SESSION_CLOSE_MINUTES = {'NSE': 930, 'BSE': 930, 'NFO': 930, 'BFO': 930, 'CDS': 1020, 'MCX': 1435}
+DEFAULT_SESSION_OPEN_MINUTES = 555
+DEFAULT_SESSION_CLOSE_MINUTES = 930
+
+_TIMEFRAME_PATTERN = re.compile(r'^(\d*)\s*([a-z]+)$')
+_INTERVAL_SECONDS = {name.lower(): seconds for seconds, name in ANGELONE_INTERVALS.items()}
+
+
+def parse_timeframe(timeframe):
+    """
+    Length of a timeframe in seconds
+
+    Accepts a number of seconds or strings such as '1m', '5min', '15T', '1h', '60m',
+    '1hour', 'D', '1day' and AngelOne interval names like 'FIVE_MINUTE'. A missing
+    count means one unit. Raises ValueError for anything else.
+    """
+    if isinstance(timeframe, (int, float, np.integer, np.floating)) and not isinstance(timeframe, bool):
+        seconds = int(timeframe)
+        if seconds <= 0 or seconds != timeframe:
+            raise ValueError(f"Timeframe must be a positive whole number of seconds: {timeframe!r}")
+        return seconds
+
+    text = str(timeframe).strip().lower()
+    if text in _INTERVAL_SECONDS:
+        return _INTERVAL_SECONDS[text]
+    match = _TIMEFRAME_PATTERN.match(text)
+    if not match or match.group(2) not in UNIT_SECONDS or int(match.group(1) or 1) == 0:
+        raise ValueError(f"Unknown timeframe: {timeframe!r}")
+    return int(match.group(1) or 1) * UNIT_SECONDS[match.group(2)]
+
+
+def normalize_timeframe(timeframe):
+    """Canonical label of a timeframe, as offered by StrategyInstanceForm ('1m', '5m', '60m', 'D', ...)"""
+    seconds = parse_timeframe(timeframe)
+    if seconds % DAY_SECONDS == 0:
+        days = seconds // DAY_SECONDS
+        return 'D' if days == 1 else f"{days}D"
+    if seconds % 60 == 0:
+        return f"{seconds // 60}m"
+    return f"{seconds}s"
+
+
+def historical_interval(timeframe):
+    """
+    AngelOne candle interval to download for a timeframe, as (interval name, seconds)
+
+    Timeframes AngelOne has no interval for get the longest interval that divides
+    them, so the candles can be resampled up; shorter than a minute gets one-minute candles.
+    """
+    seconds = parse_timeframe(timeframe)
+    for interval_seconds in sorted(ANGELONE_INTERVALS, reverse=True):
+        if seconds % interval_seconds == 0:
+            return ANGELONE_INTERVALS[interval_seconds], interval_seconds
+    return ANGELONE_INTERVALS[60], 60
+
+
+def session_open_ns(exchange=None):
+    """Session open of an exchange as ns after local midnight, NSE hours if unknown"""
+    minutes = SESSION_OPEN_MINUTES.get(str(exchange).upper(), DEFAULT_SESSION_OPEN_MINUTES)
+    return minutes * 60 * NS_PER_SECOND
+
+
+def last_session_time(now=None, exchange=None):
+    """
+    Latest local time up to `now` that the exchange was in session, as a naive datetime
+    Bars can only have completed up to here. Weekends are skipped, holidays are not known.
+    """
+    now = now or datetime.now()
+    open_ = SESSION_OPEN_MINUTES.get(str(exchange).upper(), DEFAULT_SESSION_OPEN_MINUTES)
+    close = SESSION_CLOSE_MINUTES.get(str(exchange).upper(), DEFAULT_SESSION_CLOSE_MINUTES)
+    day = datetime(now.year, now.month, now.day)
+    if day.weekday() < 5 and now >= day + timedelta(minutes=open_):
+        return min(now, day + timedelta(minutes=close))
+
+    # Before today's open or on a weekend: the close of the previous weekday
+    day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day + timedelta(minutes=close)
+
+
+def session_anchor_ns(timeframe, exchange=None):
+    """
+    Wall-clock time in ns after midnight that bars of a timeframe are aligned to
+    Intraday bars start at the session open, so a 60m bar covers 09:15-10:15 on NSE;
+    daily and longer bars start at midnight.
+    """
+    if parse_timeframe(timeframe) >= DAY_SECONDS:
+        return 0
+    return session_open_ns(exchange)
+
+
+def session_offset_ns(timeframe, exchange=None):
+    """BarSeries offset_ns that aligns epoch ns timestamps to session_anchor_ns() in local time"""
+    return time.localtime().tm_gmtoff * NS_PER_SECOND - session_anchor_ns(timeframe, exchange)
+
+
+def resample_ohlcv(data_df, timeframe, exchange=None):
+    """
+    Resample OHLCV rows into bars of a timeframe anchored at the exchange session open
+
+    A vectorized replacement for df.resample().agg(): rows are assigned to buckets with
+    integer arithmetic on the index and each bar is reduced with np.*.reduceat over
+    the runs of equal buckets. Rows must be in time order, as ticks and candles are;
+    out of order rows are sorted first. Rows with a missing price are skipped and,
+    as with resample().agg().dropna(), empty intervals produce no bar.
+
+    Args:
+        data_df (DataFrame): open, high, low, close and volume columns on a DatetimeIndex,
+            naive local time or timezone aware (bars are aligned to its wall clock)
+        timeframe: Anything parse_timeframe() accepts
+        exchange (str): Exchange whose session open anchors intraday bars
+
+    Returns:
+        DataFrame of open, high, low, close and volume indexed by bar start
+    """
+    seconds = parse_timeframe(timeframe)
+    index = data_df.index
+    if not isinstance(index, pd.DatetimeIndex):
+        raise ValueError("Data does not have a DatetimeIndex")
+
+    # Wall-clock integers in the index's own resolution, converting units would cost more than the resampling
+    tz = index.tz
+    unit = getattr(index, 'unit', 'ns')
+    wall = index.tz_localize(None) if tz is not None else index
+    wall_ticks = wall.asi8
+
+    open_ = data_df['open'].to_numpy(dtype=np.float64)
+    high = data_df['high'].to_numpy(dtype=np.float64)
+    low = data_df['low'].to_numpy(dtype=np.float64)
+    close = data_df['close'].to_numpy(dtype=np.float64)
+    volume = data_df['volume'].to_numpy()
+
+    valid = ~(np.isnan(open_) | np.isnan(high) | np.isnan(low) | np.isnan(close))
+    if not valid.all():
+        wall_ticks, open_, high, low, close, volume = (column[valid] for column in (wall_ticks, open_, high, low, close, volume))
+    if len(wall_ticks) and np.any(wall_ticks[1:] < wall_ticks[:-1]):
+        order = np.argsort(wall_ticks, kind='stable')
+        wall_ticks, open_, high, low, close, volume = (column[order] for column in (wall_ticks, open_, high, low, close, volume))
+
+    if not len(wall_ticks):
+        return pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'],
+                            index=pd.DatetimeIndex([], tz=tz, name=index.name))
+
+    # Bucket start of every row, then the first row of each run of equal buckets
+    ticks_per_second = UNIT_TICKS[unit]
+    span = seconds * ticks_per_second
+    anchor = session_anchor_ns(seconds, exchange) // NS_PER_SECOND * ticks_per_second
+    buckets = wall_ticks - (wall_ticks - anchor) % span
+    firsts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    lasts = np.concatenate((firsts[1:] - 1, [len(buckets) - 1]))
+
+    bar_index = pd.DatetimeIndex(buckets[firsts].view(f'datetime64[{unit}]'), name=index.name)
+    if tz is not None:
+        bar_index = bar_index.tz_localize(tz)
+    return pd.DataFrame({
+        'open': open_[firsts],
+        'high': np.maximum.reduceat(high, firsts),
+        'low': np.minimum.reduceat(low, firsts),
+        'close': close[lasts],
+        'volume': np.add.reduceat(volume, firsts)
+    }, index=bar_index)
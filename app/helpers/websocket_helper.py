@@ -3,21 +3,133 @@ import threading
 import json
 import time
 import pandas as pd
-from datetime import datetime
+import numpy as np
 import queue
 import traceback
 import logging
 from app.helpers.logger_helper import logger
+from app.helpers.tick_buffer import TickRingBuffer, ns_to_datetime
+from app.helpers.quote_table import QuoteTable
+from app.helpers.callback_dispatcher import CallbackDispatcher
+from app.helpers.tick_queue import TickQueue, POLICIES as QUEUE_POLICIES
+from app.helpers.tick_journal import TickJournal
+from app.helpers.tick_bus import TickBusPublisher, DEFAULT_BUS_NAME
+from app.helpers.bar_builder import BarBuilder, BAR_DTYPE
+from app.helpers.market_data_client import use_market_data_daemon
+from app.helpers.host_lock import HostLock
+from app.helpers.tick_latency import (
+    LatencyRecorder, EXCHANGE_TO_RECEIVE, RECEIVE_TO_DEQUEUE, DEQUEUE_TO_DECODE,
+    DECODE_TO_DISPATCH, RECEIVE_TO_DISPATCH
+)
+from app.helpers.tick_decoder import (
+    decode_frames, decode_depth, new_depth_book,
+    MODE_LTP, MODE_DEPTH, DEPTH_LEVELS_BY_MODE
+)
+
+# SmartWebSocketV2 rejects depth (mode 4) requests with more tokens than this
+DEPTH_SUBSCRIBE_LIMIT = 50
 
 # Configure WebSocket logger
 ws_logger = logging.getLogger("websocket")
 ws_logger.setLevel(logging.INFO)
 
+class WebSocketShard:
+    """
+    One pooled SmartWebSocketV2 connection with its own update queue and tick processor thread
+
+    Shards are owned by AngelOneWebSocketManager, which decides which symbols each one carries.
+    """
+
+    def __init__(self, manager, index):
+        self.manager = manager
+        self.index = index
+        self.ws = None
+        self.connected = False
+        self.active = True  # Cleared when the shard is dropped from the pool, stops its processor
+        self.symbols = set()  # Symbols whose tokens are subscribed on this connection
+        self.update_queue = TickQueue(manager.queue_max_size, manager.queue_policy)  # Bounded queue for this connection's updates
+        self.reconnect_attempts = 0
+        self.last_data_ns = None  # Epoch ns of the last message, see last_data_time
+        self.drain_rate = 0.0  # Messages per second drained by this shard's tick processor
+        self.processed_count = 0
+        self.last_batch_size = 0
+        self.latency = LatencyRecorder()  # Written only by this shard's tick processor
+        self.opened_at = None  # Monotonic time of the last on_open
+        self.disconnected_at = None  # Monotonic time the connection was lost, cleared by the first tick after recovery
+        self.awaiting_first_tick = False
+        self.open_to_first_tick_seconds = None
+        self.last_recovery_seconds = None  # Disconnect to first tick of the last reconnect
+        self.last_resubscribe_seconds = None
+        self.ws_thread = None
+        self.processor_thread = None
+
+    def start(self):
+        """Open the connection and make sure the tick processor thread is running"""
+        manager = self.manager
+
+        # Initialize the SmartWebSocketV2 client (or a stand-in transport) with proper parameters
+        transport = manager.transport_factory or SmartWebSocketV2
+        self.ws = transport(
+            manager.auth_token,
+            manager.api_key,
+            manager.client_code,
+            manager.feed_token
+        )
+
+        # Route callbacks back to the manager, tagged with this shard
+        self.ws.on_open = lambda wsapp: manager._on_open(wsapp, self)
+        self.ws.on_data = lambda wsapp, message: manager._on_data(wsapp, message, self)
+        self.ws.on_error = lambda wsapp, error: manager._on_error(wsapp, error, self)
+        self.ws.on_close = lambda wsapp, close_status_code=None, close_msg=None: manager._on_close(wsapp, close_status_code, close_msg, self)
+
+        # Start WebSocket connection in a separate thread
+        self.ws_thread = threading.Thread(target=self.ws.connect, name=f"WebSocketConnection-{self.index}")
+        self.ws_thread.daemon = True
+        self.ws_thread.start()
+
+        # The processor outlives reconnects, only start it once
+        if self.processor_thread is None or not self.processor_thread.is_alive():
+            self.processor_thread = threading.Thread(target=manager._process_update_queue, args=(self,), name=f"TickProcessor-{self.index}")
+            self.processor_thread.daemon = True
+            self.processor_thread.start()
+
+    def close(self):
+        """Close the connection, returns True if it was open"""
+        was_connected = self.connected
+        self.connected = False
+        if self.ws and was_connected:
+            self.ws.close_connection()
+        return was_connected
+
+    @property
+    def last_data_time(self):
+        """Time of the last message as a datetime, converted only when asked for"""
+        return ns_to_datetime(self.last_data_ns)
+
+    def get_status(self):
+        """Get this connection's status"""
+        return {
+            'index': self.index,
+            'connected': self.connected,
+            'tokens': len(self.symbols),
+            'reconnect_attempts': self.reconnect_attempts,
+            'last_data_time': self.last_data_time,
+            'queue_size': self.update_queue.qsize(),
+            'queue': self.update_queue.get_stats(),
+            'last_batch_size': self.last_batch_size,
+            'drain_rate': round(self.drain_rate, 1),
+            'processed_count': self.processed_count,
+            'open_to_first_tick_ms': None if self.open_to_first_tick_seconds is None else round(self.open_to_first_tick_seconds * 1000, 1),
+            'last_recovery_ms': None if self.last_recovery_seconds is None else round(self.last_recovery_seconds * 1000, 1),
+            'last_resubscribe_ms': None if self.last_resubscribe_seconds is None else round(self.last_resubscribe_seconds * 1000, 1)
+        }
+
 class AngelOneWebSocketManager:
     """
     Singleton WebSocket client manager for AngelOne to manage all WebSocket connections
     """
     _instance = None
+    shard_class = WebSocketShard  # Connection type created for the pool
     
     def __new__(cls):
         if cls._instance is None:
@@ -33,18 +145,36 @@ class AngelOneWebSocketManager:
         self.api_key = None
         self.client_code = None
         self.feed_token = None
-        self.ws = None
-        self.connected = False
-        self.subscribed_symbols = {}  # symbol -> {exchange_type, token, callbacks: [], data: []}
+        self.shards = []  # Pooled WebSocketShard connections
+        self.symbol_shards = {}  # symbol -> WebSocketShard carrying its subscription
+        self.max_connections = 1  # Number of pooled WebSocket connections
+        self.max_tokens_per_connection = 1000  # Token subscription cap per connection
+        self.subscribed_symbols = {}  # symbol -> {exchange_type, token, callbacks: [], data: TickRingBuffer}
         self.symbol_token_map = {}  # symbol -> {exchange_type, token}
-        self.reconnect_attempts = 0
+        self.token_symbol_map = {}  # (int exchange_type, token bytes) -> symbol, reverse of symbol_token_map
         self.max_reconnect_attempts = 5
+        self.reconnect_delay = 0.25  # Seconds before the first reconnect attempt, doubled on each retry
         self.data_buffer_max_size = 1000  # Max number of ticks to store per symbol
-        self.data_lock = threading.Lock()  # For thread-safe operations
-        self.update_queue = queue.Queue()  # Queue for processing WebSocket updates
+        self.data_lock = threading.Lock()  # Guards subscription and shard bookkeeping; each subscription's 'lock' guards its buffers
+        self.process_batch_size = 500  # Max queued messages handled per processor wakeup
+        self.subscribe_chunk_size = 500  # Max tokens sent in one subscribe request
+        self.queue_max_size = 10000  # Pending messages per connection before the queue policy applies
+        self.queue_policy = 'conflate'  # 'conflate', 'block' or 'drop_oldest'
+        self.callback_dispatcher = CallbackDispatcher()  # Runs subscriber callbacks off the tick processors
+        self.snapshot_readers = threading.BoundedSemaphore(1)  # Concurrent tick snapshot reads, see get_data_snapshot()
+        self.journal = None  # TickJournal recording raw frames, see enable_journal()
+        self.quote_table = QuoteTable()  # Latest quote of every registered symbol
+        self.tick_bus = None  # TickBusPublisher sharing ticks with other processes, see enable_tick_bus()
+        self.bar_builder = BarBuilder()  # Incremental OHLCV bars of tracked symbols, see subscribe_bars()
+        self.bar_archive = None  # BarArchive storing completed bars on disk, see enable_bar_archive()
+        self.bar_close_delay = 1.0  # Seconds past a bar's end before the timer completes it without a newer tick
+        self.bar_timer_interval = 0.25  # Seconds between checks for bars due to complete
+        self.bar_timer_thread = None
+        self.transport_factory = None  # Replaces SmartWebSocketV2 when set, see set_transport()
+        self.connection_lock = HostLock()  # Held while connected to the broker, one broker connection per host
         self.last_error = None
         self.error_count = 0
-        self.last_data_time = None
+        self.last_data_ns = None  # Epoch ns of the last message on any connection
         self.health_check_interval = 30  # Seconds between health checks
         self.health_check_running = False
         self.continue_iteration = True  # Flag to control if the WebSocket should continue iterating
@@ -76,63 +206,332 @@ class AngelOneWebSocketManager:
             logger.log_websocket_event("CONFIG_ERROR", str(e), level="error")
             return False
         
+    def configure_pool(self, max_connections=None, max_tokens_per_connection=None):
+        """
+        Configure the connection pool; takes effect on the next connect()
+        
+        Args:
+            max_connections (int): Number of WebSocket connections to spread subscriptions across
+            max_tokens_per_connection (int): Maximum tokens subscribed on a single connection
+        """
+        try:
+            if self.connected:
+                logger.log_websocket_event("CONFIG_ERROR", "Cannot resize the connection pool while connected", level="error")
+                self.last_error = "Close the WebSocket connection before resizing the pool"
+                return False
+                
+            if max_connections is not None:
+                if int(max_connections) < 1:
+                    raise ValueError("max_connections must be at least 1")
+                self.max_connections = int(max_connections)
+            if max_tokens_per_connection is not None:
+                if int(max_tokens_per_connection) < 1:
+                    raise ValueError("max_tokens_per_connection must be at least 1")
+                self.max_tokens_per_connection = int(max_tokens_per_connection)
+                
+            # Drop the old pool, subscriptions are placed on the new shards when connecting
+            with self.data_lock:
+                for shard in self.shards:
+                    shard.active = False
+                self.shards = []
+                self.symbol_shards = {}
+                
+            logger.log_websocket_event("CONFIG", f"Connection pool: {self.max_connections} connection(s), {self.max_tokens_per_connection} tokens each")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.log_websocket_event("CONFIG_ERROR", str(e), level="error")
+            return False
+    
+    def configure_queue(self, max_size=None, policy=None):
+        """
+        Configure the bounded update queue of every pooled connection
+        
+        Args:
+            max_size (int): Pending messages kept per connection
+            policy (str): 'conflate' keeps only the newest pending frame per token,
+                'block' makes the WebSocket thread wait for space, 'drop_oldest' discards
+                the oldest pending message
+        """
+        try:
+            if max_size is not None and max_size <= 0:
+                raise ValueError("max_size must be positive")
+            if policy is not None and policy not in QUEUE_POLICIES:
+                raise ValueError(f"Unknown queue policy: {policy}")
+                
+            for shard in self.shards:
+                shard.update_queue.configure(max_size, policy)
+            if max_size is not None:
+                self.queue_max_size = max_size
+            if policy is not None:
+                self.queue_policy = policy
+            logger.log_websocket_event("CONFIG", f"Update queues: {self.queue_max_size} messages, {self.queue_policy} policy")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.log_websocket_event("CONFIG_ERROR", str(e), level="error")
+            return False
+    
+    def set_transport(self, factory=None):
+        """
+        Use a stand-in for SmartWebSocketV2 on the next connect(), or the real client again
+        
+        Args:
+            factory (callable): Called like SmartWebSocketV2(auth_token, api_key, client_code, feed_token)
+        """
+        if self.connected:
+            logger.log_websocket_event("CONFIG_ERROR", "Cannot change the transport while connected", level="error")
+            self.last_error = "Close the WebSocket connection before changing the transport"
+            return False
+        self.transport_factory = factory
+        logger.log_websocket_event("CONFIG", f"WebSocket transport: {getattr(factory, '__qualname__', factory) if factory else 'SmartWebSocketV2'}")
+        return True
+    
+    def enable_journal(self, directory=None, flush_interval=0.2):
+        """
+        Record every raw binary frame with its receive time to per-day journal files
+        
+        Args:
+            directory (str): Journal directory, defaults to ./journal
+            flush_interval (float): Seconds between batched writes to the journal file
+        """
+        try:
+            if self.journal is not None:
+                return True
+            journal = TickJournal(directory, flush_interval=flush_interval)
+            journal.start()
+            self.journal = journal
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.log_websocket_event("JOURNAL_ERROR", f"Error enabling tick journal: {str(e)}", level="error")
+            return False
+    
+    def disable_journal(self):
+        """Stop recording frames and flush the journal"""
+        journal, self.journal = self.journal, None
+        if journal is not None:
+            try:
+                journal.stop()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.log_websocket_event("JOURNAL_ERROR", f"Error closing tick journal: {str(e)}", level="error")
+    
+    def subscribe_bars(self, symbol, timeframe=None, callback=None, exchange=None):
+        """
+        Build OHLCV bars of a symbol from its ticks as they arrive
+        
+        The symbol still needs a tick subscription of its own. Bars are completed by the
+        first tick of the next interval, or by a timer once the interval has ended.
+        Whole-minute timeframes are rolled up from the symbol's shared 1-minute bars.
+        
+        Args:
+            symbol (str): Symbol name
+            timeframe: Bar length in seconds or a timeframe string such as '5m', or None for the
+                1-minute bars and every cascade timeframe (3, 5, 10, 15, 30, 60 minutes and daily)
+            callback (function): Called as callback(bar, symbol) on each completed bar, where
+                bar is a dict of start (epoch ns), open, high, low, close, volume, ticks and timeframe
+            exchange (str): Exchange whose session open intraday bars start at, NSE's if None
+        """
+        try:
+            if timeframe is None:
+                series = self.bar_builder.track_cascade(symbol, callback, exchange=exchange)
+            else:
+                series = self.bar_builder.track(symbol, timeframe, callback, exchange)
+            self._start_bar_timer()
+            logger.log_websocket_event("BARS", f"Building {timeframe or 'cascade'} bars for {symbol}")
+            return series
+        except Exception as e:
+            self.last_error = str(e)
+            logger.log_websocket_event("BARS_ERROR", f"Error building bars for {symbol}: {str(e)}", level="error")
+            return None
+    
+    def unsubscribe_bars(self, symbol, timeframe=None, callback=None):
+        """Remove a bar callback, or stop building a symbol's bars (all timeframes if none given)"""
+        return self.bar_builder.untrack(symbol, timeframe, callback)
+    
+    def get_bars(self, symbol, timeframe, limit=None, include_forming=False):
+        """Completed bars of a symbol, oldest first, as a DataFrame like resample_to_timeframe() returns"""
+        return self.bar_builder.get_bars(symbol, timeframe, limit, include_forming)
+    
+    def get_forming_bar(self, symbol, timeframe):
+        """The bar still being built as a dict, or None"""
+        return self.bar_builder.get_forming_bar(symbol, timeframe)
+    
+    def _start_bar_timer(self):
+        if self.bar_timer_thread is None or not self.bar_timer_thread.is_alive():
+            self.bar_timer_thread = threading.Thread(target=self._bar_timer, name="BarTimer")
+            self.bar_timer_thread.daemon = True
+            self.bar_timer_thread.start()
+    
+    def _bar_timer(self):
+        """Complete bars whose interval ended without a tick from the next one"""
+        while self.bar_builder.series:
+            self._close_due_bars()
+            time.sleep(self.bar_timer_interval)
+    
+    def _close_due_bars(self):
+        try:
+            closed = self.bar_builder.close_due(time.time_ns() - int(self.bar_close_delay * 1e9))
+            if closed:
+                self._emit_bars(closed)
+        except Exception as e:
+            self.error_count += 1
+            logger.log_websocket_event("BARS_ERROR", f"Error completing bars: {str(e)}", level="error")
+    
+    def _emit_bars(self, closed):
+        """Hand completed (series, bar) pairs to their callbacks and the tick bus"""
+        deliveries = [(tuple(series.callbacks), bar, series.symbol) for series, bar in closed if series.callbacks]
+        if deliveries:
+            self.callback_dispatcher.dispatch(deliveries)
+        
+        tick_bus = self.tick_bus
+        if tick_bus is not None:
+            by_timeframe = {}
+            for series, bar in closed:
+                by_timeframe.setdefault(series.timeframe, []).append((
+                    series.symbol, bar['start'], bar['open'], bar['high'], bar['low'], bar['close'], bar['volume'], bar['ticks']
+                ))
+            for timeframe, rows in by_timeframe.items():
+                tick_bus.publish_bars(rows, timeframe)
+        
+        bar_archive = self.bar_archive
+        if bar_archive is not None:
+            by_series = {}
+            for series, bar in closed:
+                # A series' first bar lacks the ticks before it started, downloads fill it in instead
+                if bar['start'] == series.partial_start:
+                    continue
+                by_series.setdefault(series, []).append(tuple(bar[name] for name in BAR_DTYPE.names))
+            for series, records in by_series.items():
+                try:
+                    bar_archive.write(series.symbol, series.exchange, series.timeframe,
+                                      np.array(records, dtype=BAR_DTYPE), contiguous=True)
+                except Exception as e:
+                    self.error_count += 1
+                    self.last_error = str(e)
+                    logger.log_websocket_event("BAR_ARCHIVE_ERROR", f"Error archiving {series.symbol} bars: {str(e)}", level="error")
+    
+    def enable_tick_bus(self, name=DEFAULT_BUS_NAME, capacity=65536):
+        """
+        Publish every buffered tick to a shared-memory bus readable by other processes on this host
+        
+        Args:
+            name (str): Shared memory block name, readers attach with TickBusReader(name)
+            capacity (int): Ticks kept in the ring before the oldest are overwritten
+        """
+        try:
+            if self.tick_bus is not None:
+                return True
+            self.tick_bus = TickBusPublisher(name, capacity)
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.log_websocket_event("TICK_BUS_ERROR", f"Error enabling tick bus: {str(e)}", level="error")
+            return False
+    
+    def disable_tick_bus(self):
+        """Stop publishing and remove the shared-memory bus"""
+        tick_bus, self.tick_bus = self.tick_bus, None
+        if tick_bus is not None:
+            try:
+                with tick_bus.lock:
+                    tick_bus.close()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.log_websocket_event("TICK_BUS_ERROR", f"Error closing tick bus: {str(e)}", level="error")
+    
+    def enable_bar_archive(self, archive):
+        """Store every completed bar in a BarArchive, so strategies can warm up from disk"""
+        if self.bar_archive is archive:
+            return True
+        self.bar_archive = archive
+        logger.log_websocket_event("BAR_ARCHIVE", f"Archiving completed bars in {archive.directory}")
+        return True
+    
+    def disable_bar_archive(self):
+        """Stop archiving completed bars"""
+        self.bar_archive = None
+    
+    @property
+    def connected(self):
+        """True while at least one pooled connection is open"""
+        return any(shard.connected for shard in self.shards)
+    
+    @property
+    def last_data_time(self):
+        """Time of the last message on any connection as a datetime"""
+        return ns_to_datetime(self.last_data_ns)
+    
+    @property
+    def reconnect_attempts(self):
+        """Highest reconnect attempt count across the pooled connections"""
+        return max((shard.reconnect_attempts for shard in self.shards), default=0)
+    
+    def _primary_shard(self):
+        """Return the first pooled connection, creating the pool entry if needed"""
+        if not self.shards:
+            self.shards.append(self.shard_class(self, 0))
+        return self.shards[0]
+    
+    def _assign_shard(self, symbol, connected_only=True):
+        """
+        Return the shard carrying a symbol, placing new symbols on the least loaded
+        connection below the token cap (caller holds data_lock). Returns None when
+        the pool is full.
+        """
+        shard = self.symbol_shards.get(symbol)
+        if shard is not None:
+            return shard
+            
+        candidates = [
+            shard for shard in self.shards
+            if len(shard.symbols) < self.max_tokens_per_connection and (shard.connected or not connected_only)
+        ]
+        if not candidates:
+            return None
+            
+        shard = min(candidates, key=lambda candidate: len(candidate.symbols))
+        shard.symbols.add(symbol)
+        self.symbol_shards[symbol] = shard
+        return shard
+    
+    def _release_shard(self, symbol):
+        """Free a symbol's slot on its connection (caller holds data_lock)"""
+        shard = self.symbol_shards.pop(symbol, None)
+        if shard is not None:
+            shard.symbols.discard(symbol)
+    
     def connect(self):
-        """Connect to AngelOne WebSocket"""
+        """Connect all pooled AngelOne WebSocket connections"""
         if not all([self.auth_token, self.api_key, self.client_code, self.feed_token]):
             logger.log_websocket_event("CONNECT_ERROR", "WebSocket not configured. Call configure() first.", level="error")
             self.last_error = "WebSocket not properly configured. Missing credentials."
             return False
             
-        try:
-            logger.log_websocket_event("CONNECT", "Initializing WebSocket connection...")
-            
-            # Initialize the SmartWebSocketV2 client with proper parameters
-            self.ws = SmartWebSocketV2(
-                self.auth_token, 
-                self.api_key, 
-                self.client_code,
-                self.feed_token
-            )
-            
-            # Set up callbacks
-            # Make sure to use lambda functions to ensure 'self' context is preserved
-            self.ws.on_open = lambda wsapp: self._on_open(wsapp)
-            self.ws.on_data = lambda wsapp, message: self._on_data(wsapp, message)
-            self.ws.on_error = lambda wsapp, error: self._on_error(wsapp, error)
-            self.ws.on_close = lambda wsapp, close_status_code=None, close_msg=None: self._on_close(wsapp, close_status_code, close_msg)
+        if self._uses_broker() and not self._acquire_connection_lock():
+            return False
             
-            # Start WebSocket connection in a separate thread
-            logger.log_websocket_event("CONNECT", "Starting WebSocket connection thread...")
-            self.ws_thread = threading.Thread(target=self.ws.connect, name="WebSocketConnection")
-            self.ws_thread.daemon = True
-            self.ws_thread.start()
+        try:
+            logger.log_websocket_event("CONNECT", f"Initializing {self.max_connections} WebSocket connection(s)...")
             
-            # Start tick processor thread
-            logger.log_websocket_event("CONNECT", "Starting tick processing thread...")
-            self.processor_thread = threading.Thread(target=self._process_update_queue, name="TickProcessor")
-            self.processor_thread.daemon = True
-            self.processor_thread.start()
+            with self.data_lock:
+                # Grow the pool to its configured size
+                while len(self.shards) < self.max_connections:
+                    self.shards.append(self.shard_class(self, len(self.shards)))
+                    
+                # Place subscriptions that have no connection yet, they are sent from _on_open
+                for symbol in self.subscribed_symbols:
+                    if self._assign_shard(symbol, connected_only=False) is None:
+                        logger.log_websocket_event("CONNECT_ERROR", f"No connection capacity left for {symbol}", level="error")
             
-            # Start health check thread
-            if not self.health_check_running:
-                logger.log_websocket_event("CONNECT", "Starting health check thread...")
-                self.health_check_running = True
-                self.health_check_thread = threading.Thread(target=self._health_check, name="HealthCheck")
-                self.health_check_thread.daemon = True
-                self.health_check_thread.start()
+            self._start_health_check()
             
-            # Wait for connection to establish
-            timeout = 10
-            start_time = time.time()
-            while not self.connected and time.time() - start_time < timeout:
-                time.sleep(0.1)
-                
-            if not self.connected:
-                self.last_error = "WebSocket connection timed out"
-                logger.log_websocket_event("CONNECT_TIMEOUT", "Connection timed out", level="error")
+            pending = [shard for shard in self.shards if not shard.connected]
+            if not self._connect_shards(pending):
                 return False
                 
-            logger.log_websocket_event("CONNECTED", "WebSocket connection established successfully")
+            logger.log_websocket_event("CONNECTED", f"{len(self.shards)} WebSocket connection(s) established successfully")
             return self.connected
             
         except Exception as e:
@@ -141,28 +540,69 @@ class AngelOneWebSocketManager:
             logger.log_websocket_event("CONNECT_ERROR", traceback.format_exc(), level="error")
             return False
     
+    def _uses_broker(self):
+        """Whether connect() opens real broker connections rather than a stand-in transport"""
+        return self.transport_factory is None
+    
+    def _acquire_connection_lock(self):
+        """Take the host's broker connection lock, False if another process holds it"""
+        lock = self.connection_lock
+        if lock.fd is not None or lock.acquire():
+            return True
+        self.last_error = f"Another process (pid {lock.owner()}) holds the broker connection, see {lock.path}"
+        logger.log_websocket_event("CONNECT_ERROR", self.last_error, level="error")
+        return False
+    
+    def _start_health_check(self):
+        """Start the health check thread unless it is already running"""
+        if not self.health_check_running:
+            logger.log_websocket_event("CONNECT", "Starting health check thread...")
+            self.health_check_running = True
+            self.health_check_thread = threading.Thread(target=self._health_check, name="HealthCheck")
+            self.health_check_thread.daemon = True
+            self.health_check_thread.start()
+    
+    def _connect_shards(self, shards, timeout=10):
+        """Start the given connections and wait for all of them to open"""
+        for shard in shards:
+            logger.log_websocket_event("CONNECT", f"Starting WebSocket connection {shard.index} and its tick processor...")
+            shard.start()
+            
+        # Wait for connections to establish
+        start_time = time.time()
+        while any(not shard.connected for shard in shards) and time.time() - start_time < timeout:
+            time.sleep(0.1)
+            
+        pending = [shard.index for shard in shards if not shard.connected]
+        if pending:
+            self.last_error = f"WebSocket connection timed out (connections {pending})"
+            logger.log_websocket_event("CONNECT_TIMEOUT", f"Connection timed out for connections {pending}", level="error")
+            return False
+        return True
+    
     def _health_check(self):
-        """Periodically check WebSocket health and send heartbeats"""
+        """Periodically check the health of every pooled connection and send heartbeats"""
         logger.log_websocket_event("HEALTH_CHECK", "Health check thread started")
         
         while self.health_check_running:
             try:
-                # Send heartbeat if connected
-                if self.connected and self.ws:
-                    logger.log_websocket_event("HEARTBEAT", "Sending ping")
-                    self.ws.send("ping")
-                
-                # Check if connected
-                if not self.connected:
-                    logger.log_websocket_event("HEALTH_CHECK", "WebSocket not connected, attempting to reconnect...", level="warning")
-                    self.reconnect()
-                
-                # Check for data freshness (if we have subscribed symbols)
-                elif self.subscribed_symbols and self.last_data_time:
-                    time_since_data = (datetime.now() - self.last_data_time).total_seconds()
-                    if time_since_data > 60:  # No data for 60 seconds
-                        logger.log_websocket_event("HEALTH_CHECK", f"No data received for {time_since_data:.1f} seconds, reconnecting...", level="warning")
-                        self.reconnect()
+                for shard in list(self.shards):
+                    # Send heartbeat if connected
+                    if shard.connected and shard.ws:
+                        logger.log_websocket_event("HEARTBEAT", f"Sending ping on connection {shard.index}")
+                        shard.ws.send("ping")
+                    
+                    # Check if connected
+                    if not shard.connected:
+                        logger.log_websocket_event("HEALTH_CHECK", f"Connection {shard.index} not connected, attempting to reconnect...", level="warning")
+                        self.reconnect(shard)
+                    
+                    # Check for data freshness (if this connection carries symbols)
+                    elif shard.symbols and shard.last_data_ns:
+                        time_since_data = (time.time_ns() - shard.last_data_ns) / 1e9
+                        if time_since_data > 60:  # No data for 60 seconds
+                            logger.log_websocket_event("HEALTH_CHECK", f"No data received on connection {shard.index} for {time_since_data:.1f} seconds, reconnecting...", level="warning")
+                            self.reconnect(shard)
                         
                 # Check error count
                 if self.error_count > 10:
@@ -175,89 +615,151 @@ class AngelOneWebSocketManager:
             # Sleep before next check - 30 seconds as specified in documentation
             time.sleep(30)
     
-    def reconnect(self):
-        """Attempt to reconnect to the WebSocket"""
-        if self.reconnect_attempts >= self.max_reconnect_attempts:
-            logger.log_websocket_event("RECONNECT_FAILED", f"Maximum reconnect attempts ({self.max_reconnect_attempts}) reached", level="error")
+    def reconnect(self, shard=None):
+        """Attempt to reconnect one pooled connection, or all of them"""
+        if shard is None:
+            if not self.shards:
+                return self.connect()
+            results = [self.reconnect(pooled) for pooled in list(self.shards)]
+            return all(results)
+            
+        if shard.reconnect_attempts >= self.max_reconnect_attempts:
+            logger.log_websocket_event("RECONNECT_FAILED", f"Maximum reconnect attempts ({self.max_reconnect_attempts}) reached for connection {shard.index}", level="error")
             return False
             
-        self.reconnect_attempts += 1
-        logger.log_websocket_event("RECONNECT", f"Attempting to reconnect (Attempt {self.reconnect_attempts}/{self.max_reconnect_attempts})")
+        shard.reconnect_attempts += 1
+        if shard.disconnected_at is None:
+            shard.disconnected_at = time.monotonic()
+        logger.log_websocket_event("RECONNECT", f"Attempting to reconnect connection {shard.index} (Attempt {shard.reconnect_attempts}/{self.max_reconnect_attempts})")
         
         try:
             # Close existing connection if any
-            if self.ws:
-                try:
-                    self.ws.close_connection()
-                except:
-                    pass
+            try:
+                shard.close()
+            except:
+                pass
                 
             # Reset connection status
-            self.connected = False
+            shard.connected = False
             
-            # Wait before reconnecting
-            time.sleep(2)
+            # Back off before reconnecting, briefly on the first attempt
+            time.sleep(self.reconnect_delay * 2 ** (shard.reconnect_attempts - 1))
             
             # Try to connect again
-            return self.connect()
+            return self._connect_shards([shard])
             
         except Exception as e:
             self.last_error = str(e)
             logger.log_websocket_event("RECONNECT_ERROR", f"Error during reconnect: {str(e)}", level="error")
             return False
     
-    def _on_open(self, wsapp):
-        """Called when WebSocket connection is opened"""
-        logger.log_websocket_event("OPEN", "WebSocket connection established")
-        self.connected = True
-        self.reconnect_attempts = 0
-        self.last_data_time = datetime.now()
+    def _on_open(self, wsapp, shard=None):
+        """Called when a pooled WebSocket connection is opened"""
+        shard = shard or self._primary_shard()
+        logger.log_websocket_event("OPEN", f"WebSocket connection {shard.index} established")
+        shard.connected = True
+        shard.reconnect_attempts = 0
+        shard.last_data_ns = self.last_data_ns = time.time_ns()
         
-        # Re-subscribe to symbols
-        if self.subscribed_symbols:
-            # Group tokens by exchange type for efficient subscription
-            exchange_tokens = {}
-            for symbol_info in self.subscribed_symbols.values():
-                exchange_type = symbol_info['exchange_type']
-                token = symbol_info['token']
-                
-                if exchange_type not in exchange_tokens:
-                    exchange_tokens[exchange_type] = []
-                    
-                exchange_tokens[exchange_type].append(token)
+        shard.opened_at = time.monotonic()
+        shard.awaiting_first_tick = True
+        
+        # Re-subscribe to the symbols carried by this connection in their own modes
+        if shard.symbols:
+            self._resubscribe(shard)
+    
+    @staticmethod
+    def _subscription_mode(symbol_info):
+        """Mode a subscription was made in; subscribe() uses quote mode and subscribe_index() LTP"""
+        return symbol_info.get('mode') or (1 if symbol_info.get('is_index') else 2)
+    
+    def _token_list_chunks(self, mode, exchange_tokens):
+        """
+        Split (exchange_type, token) pairs into AngelOne token_list requests of at most
+        subscribe_chunk_size tokens (depth mode is capped at DEPTH_SUBSCRIBE_LIMIT)
+        """
+        chunk_size = self.subscribe_chunk_size
+        if mode == MODE_DEPTH:
+            chunk_size = min(chunk_size, DEPTH_SUBSCRIBE_LIMIT)
             
-            # Create token_list structure for AngelOne API
-            token_list = [
+        pairs = sorted(exchange_tokens, key=lambda pair: pair[0])
+        for start in range(0, len(pairs), chunk_size):
+            grouped = {}
+            for exchange_type, token in pairs[start:start + chunk_size]:
+                grouped.setdefault(exchange_type, []).append(token)
+            yield [
                 {
                     "exchangeType": int(exchange_type),
                     "tokens": tokens
                 }
-                for exchange_type, tokens in exchange_tokens.items()
+                for exchange_type, tokens in grouped.items()
             ]
-            
-            # Subscribe to all tokens
-            if token_list:
-                correlation_id = "reconnect_" + str(int(time.time()))
+    
+    def _resubscribe(self, shard):
+        """Resubscribe a connection's symbols grouped by mode and exchange, sending the chunks back to back"""
+        started = time.monotonic()
+        
+        # Group tokens by stored mode
+        mode_tokens = {}
+        with self.data_lock:
+            for symbol in shard.symbols:
+                symbol_info = self.subscribed_symbols.get(symbol)
+                if not symbol_info:
+                    continue
+                mode_tokens.setdefault(self._subscription_mode(symbol_info), []).append(
+                    (int(symbol_info['exchange_type']), symbol_info['token'])
+                )
+        
+        # Pipeline every request without waiting for responses; errors only cost their own chunk
+        requests = 0
+        tokens_sent = 0
+        failed = 0
+        for mode in sorted(mode_tokens):
+            for token_list in self._token_list_chunks(mode, mode_tokens[mode]):
+                count = sum(len(entry["tokens"]) for entry in token_list)
+                correlation_id = f"reconnect_{shard.index}_{requests}_{int(time.time())}"
+                requests += 1
                 try:
-                    self.ws.subscribe(correlation_id, 1, token_list)  # Mode 1 = OHLC quotes
-                    logger.log_websocket_event("RESUBSCRIBE", f"Resubscribed to {sum(len(tokens) for _, tokens in exchange_tokens.items())} tokens")
+                    shard.ws.subscribe(correlation_id, mode, token_list)
+                    tokens_sent += count
                 except Exception as e:
-                    logger.log_websocket_event("RESUBSCRIBE_ERROR", f"Error resubscribing to tokens: {str(e)}", level="error")
+                    failed += count
+                    self.error_count += 1
+                    logger.log_websocket_event("RESUBSCRIBE_ERROR", f"Error resubscribing {count} tokens in mode {mode} on connection {shard.index}: {str(e)}", level="error")
+        
+        shard.last_resubscribe_seconds = time.monotonic() - started
+        logger.log_websocket_event(
+            "RESUBSCRIBE",
+            f"Resubscribed to {tokens_sent} tokens in {requests} requests on connection {shard.index} "
+            f"({shard.last_resubscribe_seconds * 1000:.1f} ms, {failed} failed)"
+        )
     
-    def _on_data(self, wsapp, message):
-        """Called when a message is received from WebSocket"""
+    def _on_data(self, wsapp, message, shard=None):
+        """Called when a message is received from a pooled WebSocket connection"""
+        shard = shard or self._primary_shard()
+        
         # Update last data time
-        self.last_data_time = datetime.now()
+        receive_ns = time.time_ns()
+        shard.last_data_ns = self.last_data_ns = receive_ns
+        
+        # Measure how long the connection took to deliver data again
+        if shard.awaiting_first_tick and isinstance(message, bytes):
+            self._record_first_tick(shard)
         
         # Check for pong response to heartbeat
         if message == "pong":
-            logger.log_websocket_event("HEARTBEAT", "Received pong response")
+            logger.log_websocket_event("HEARTBEAT", f"Received pong response on connection {shard.index}")
             return
         
         # Handle binary data
         if isinstance(message, bytes):
-            # Put the binary update in the queue for processing
-            self.update_queue.put(message)
+            # Record the raw frame before anything can drop or conflate it
+            journal = self.journal
+            if journal is not None:
+                journal.record(message, receive_ns)
+            
+            # Put the binary update in this connection's queue for processing
+            shard.update_queue.put(message, receive_ns)
         else:
             # Handle JSON response (error messages, etc.)
             try:
@@ -269,49 +771,127 @@ class AngelOneWebSocketManager:
                     json_message = json.loads(message)
                     
                 if "errorCode" in json_message:
-                    logger.log_websocket_event("ERROR", f"Received error: {json_message}", level="error")
+                    logger.log_websocket_event("ERROR", f"Received error on connection {shard.index}: {json_message}", level="error")
                     
-                self.update_queue.put(json_message)
+                shard.update_queue.put(json_message, receive_ns)
             except Exception as e:
                 logger.log_websocket_event("DATA_ERROR", f"Unrecognized message format: {message if isinstance(message, str) else str(message)[:100]}", level="error")
     
-    def _process_update_queue(self):
-        """Process WebSocket updates from the queue"""
-        logger.log_websocket_event("PROCESS", "Tick processor thread started")
+    def _record_first_tick(self, shard):
+        """Record open-to-first-tick and disconnect-to-first-tick times of a connection"""
+        now = time.monotonic()
+        shard.awaiting_first_tick = False
+        if shard.opened_at is not None:
+            shard.open_to_first_tick_seconds = now - shard.opened_at
+        if shard.disconnected_at is not None:
+            shard.last_recovery_seconds = now - shard.disconnected_at
+            shard.disconnected_at = None
+            logger.log_websocket_event("RECOVERED", f"Connection {shard.index} receiving data {shard.last_recovery_seconds * 1000:.1f} ms after disconnect")
+    
+    def _process_update_queue(self, shard=None):
+        """Process one connection's WebSocket updates from its queue in batches"""
+        shard = shard or self._primary_shard()
+        update_queue = shard.update_queue
+        logger.log_websocket_event("PROCESS", f"Tick processor thread started for connection {shard.index} (batch size {self.process_batch_size})")
         
-        while self.continue_iteration:
+        window_start = time.monotonic()
+        window_count = 0
+        
+        while self.continue_iteration and shard.active:
             try:
-                # Block until an item is available
-                message = self.update_queue.get(timeout=1)
-                
-                # Process message based on type
-                if isinstance(message, bytes):
-                    # Process binary data
-                    tick_data = self._process_binary_tick(message)
-                    if tick_data:
-                        # Only process if we successfully parsed the binary data
-                        self._handle_parsed_tick(tick_data)
-                elif isinstance(message, dict):
-                    # Process JSON data
-                    self._process_tick(message)
-                elif isinstance(message, list):
-                    # Process list of ticks
-                    for tick in message:
-                        self._process_tick(tick)
-                
-                # Mark task as done
-                self.update_queue.task_done()
-                
+                # Block only while the queue is empty, then take whatever is queued up to the batch size
+                stamped = update_queue.get_batch_stamped(self.process_batch_size, timeout=1)
             except queue.Empty:
-                # No items in queue, just continue
+                shard.drain_rate = 0.0
+                window_start = time.monotonic()
+                window_count = 0
                 continue
+            
+            batch = [message for message, _ in stamped]
+            try:
+                self._process_batch(batch, [receive_ns for _, receive_ns in stamped], shard.latency)
             except Exception as e:
                 self.error_count += 1
-                logger.log_websocket_event("PROCESS_ERROR", f"Error processing tick: {str(e)}", level="error")
+                logger.log_websocket_event("PROCESS_ERROR", f"Error processing tick batch: {str(e)}", level="error")
                 logger.log_websocket_event("PROCESS_ERROR", traceback.format_exc(), level="error")
-                
-            # Brief sleep to prevent high CPU usage
-            time.sleep(0.001)
+            
+            # Measure the drain rate over windows of about one second
+            shard.processed_count += len(batch)
+            shard.last_batch_size = len(batch)
+            window_count += len(batch)
+            elapsed = time.monotonic() - window_start
+            if elapsed >= 1.0:
+                shard.drain_rate = window_count / elapsed
+                window_start = time.monotonic()
+                window_count = 0
+    
+    def _process_batch(self, batch, receive_times=None, latency=None):
+        """
+        Decode a batch of queued messages and apply them with a single buffer update
+        Binary frames are decoded together, one NumPy pass per frame mode.
+        With receive_times (epoch ns per message) and a LatencyRecorder, per-stage latencies are recorded.
+        """
+        dequeue_ns = time.time_ns()
+        frames = []
+        frame_receive_times = []
+        
+        for i, message in enumerate(batch):
+            # Process message based on type
+            if isinstance(message, bytes):
+                frames.append(message)
+                if receive_times:
+                    frame_receive_times.append(receive_times[i])
+            elif isinstance(message, dict):
+                # Process JSON data
+                self._process_tick(message)
+            elif isinstance(message, list):
+                # Process list of ticks
+                for tick in message:
+                    self._process_tick(tick)
+        
+        ticks, symbols, frames, index = self._decode_frames(frames)
+        decode_ns = time.time_ns()
+        if symbols:
+            self._handle_parsed_ticks(ticks, symbols, frames)
+        
+        if latency is not None and receive_times:
+            parsed_receive_times = np.asarray(frame_receive_times, dtype=np.int64)[index] if frame_receive_times else None
+            self._record_latency(latency, receive_times, ticks, parsed_receive_times, dequeue_ns, decode_ns, time.time_ns())
+    
+    def _decode_frames(self, frames):
+        """
+        Decode binary frames in one batch, keeping only ticks of registered symbols
+        Returns (ticks, symbols, frames, index): a TICK_DTYPE array with the symbol and raw
+        frame of each tick, and the position in `frames` each tick came from.
+        """
+        ticks, index = decode_frames(frames, return_index=True)
+        if len(index) < len(frames):
+            self.error_count += len(frames) - len(index)
+            logger.log_websocket_event("BINARY_ERROR", f"Dropped {len(frames) - len(index)} undecodable binary frames", level="error")
+        if not len(ticks):
+            return ticks, [], [], index
+        
+        # Find which symbol each tick belongs to
+        token_symbol_map = self.token_symbol_map
+        symbols = [token_symbol_map.get(key) for key in zip(ticks['exchange_type'].tolist(), ticks['token'].tolist())]
+        if None in symbols:
+            known = np.array([symbol is not None for symbol in symbols])
+            logger.log_websocket_event("BINARY_WARNING", f"Received {len(symbols) - int(known.sum())} ticks for unknown symbols", level="debug")
+            ticks, index = ticks[known], index[known]
+            symbols = [symbol for symbol in symbols if symbol is not None]
+        return ticks, symbols, [frames[i] for i in index.tolist()], index
+    
+    def _record_latency(self, latency, receive_times, ticks, parsed_receive_times, dequeue_ns, decode_ns, dispatch_ns):
+        """Add one processed batch to a shard's latency histograms"""
+        latency[RECEIVE_TO_DEQUEUE].record_many([dequeue_ns - receive_ns for receive_ns in receive_times])
+        latency[DEQUEUE_TO_DECODE].record(decode_ns - dequeue_ns, len(receive_times))
+        latency[RECEIVE_TO_DISPATCH].record_many([dispatch_ns - receive_ns for receive_ns in receive_times])
+        if len(ticks) and parsed_receive_times is not None:
+            latency[DECODE_TO_DISPATCH].record(dispatch_ns - decode_ns, len(ticks))
+            # Exchange timestamps are epoch milliseconds, frames without one are skipped
+            exchange_ms = ticks['exchange_timestamp']
+            stamped = exchange_ms > 0
+            latency[EXCHANGE_TO_RECEIVE].record_many(parsed_receive_times[stamped] - exchange_ms[stamped] * 1_000_000)
     
     def _process_tick(self, tick):
         """Process a single tick update"""
@@ -325,11 +905,7 @@ class AngelOneWebSocketManager:
                 return
             
             # Find which symbol this belongs to
-            symbol = None
-            for sym, info in self.symbol_token_map.items():
-                if info['token'] == token and str(info['exchange_type']) == exchange_type:
-                    symbol = sym
-                    break
+            symbol = self.token_symbol_map.get(self._token_key(exchange_type, token))
             
             if not symbol:
                 logger.log_websocket_event("TICK_WARNING", f"Received tick for unknown symbol: exchange={exchange_type}, token={token}", level="debug")
@@ -339,9 +915,14 @@ class AngelOneWebSocketManager:
                 logger.log_websocket_event("TICK_WARNING", f"Received tick for unsubscribed symbol: {symbol}", level="debug")
                 return
             
-            with self.data_lock:
-                # Format the data
-                timestamp = datetime.fromtimestamp(int(tick.get('ft', time.time())))
+            subscription = self.subscribed_symbols.get(symbol)
+            if subscription is None:
+                return
+            
+            with subscription['lock']:
+                # Feed time is in epoch seconds, kept as epoch ns like binary ticks
+                feed_time = tick.get('ft')
+                timestamp = int(feed_time) * 1_000_000_000 if feed_time else time.time_ns()
                 
                 # Check for required tick fields
                 if 'o' not in tick or 'h' not in tick or 'l' not in tick or 'c' not in tick:
@@ -357,231 +938,210 @@ class AngelOneWebSocketManager:
                     'volume': int(tick.get('v', 0))
                 }
                 
-                # Add to data buffer (limiting size)
-                self.subscribed_symbols[symbol]['data'].append(formatted_tick)
-                if len(self.subscribed_symbols[symbol]['data']) > self.data_buffer_max_size:
-                    self.subscribed_symbols[symbol]['data'] = self.subscribed_symbols[symbol]['data'][-self.data_buffer_max_size:]
-                
-                # Notify callbacks
-                for callback in self.subscribed_symbols[symbol]['callbacks']:
-                    try:
-                        callback(formatted_tick, symbol)
-                    except Exception as callback_err:
-                        logger.log_websocket_event("CALLBACK_ERROR", f"Callback error for {symbol}: {str(callback_err)}", level="error")
-                
-        except Exception as e:
-            self.error_count += 1
-            logger.log_websocket_event("TICK_PROCESS_ERROR", f"Error processing tick data: {str(e)}", level="error")
-            logger.log_websocket_event("TICK_PROCESS_ERROR", traceback.format_exc(), level="error")
-    
-    def _process_binary_tick(self, binary_data):
-        """Process binary data according to the Angel One specification"""
-        try:
-            # Check if we have enough data for at least the LTP mode
-            if len(binary_data) < 51:
-                logger.log_websocket_event("BINARY_ERROR", f"Binary data too short: {len(binary_data)} bytes", level="error")
-                return None
-                
-            # Parse common fields (first part of message)
-            mode = binary_data[0]  # Subscription mode
-            exchange_type = binary_data[1]  # Exchange type
+                # Add to the fixed-size data buffer
+                self._append_tick(subscription, formatted_tick)
+                callbacks = tuple(subscription['callbacks'])
             
-            # Extract token (null-terminated string)
-            token_end = 2
-            while token_end < 27 and binary_data[token_end] != 0:
-                token_end += 1
-            token = binary_data[2:token_end].decode('utf-8')
+            row = self.quote_table.rows.get(symbol)
+            if row is not None:
+                self.quote_table.update(row, formatted_tick['close'], formatted_tick['volume'], timestamp, time.time_ns())
             
-            # Find which symbol this belongs to
-            symbol = None
-            for sym, info in self.symbol_token_map.items():
-                if info['token'] == token and str(info['exchange_type']) == str(exchange_type):
-                    symbol = sym
-                    break
-            
-            if not symbol:
-                logger.log_websocket_event("BINARY_WARNING", f"Received tick for unknown symbol: exchange={exchange_type}, token={token}", level="debug")
-                return None
+            tick_bus = self.tick_bus
+            if tick_bus is not None:
+                tick_bus.publish_ticks([(
+                    symbol, timestamp, formatted_tick['open'], formatted_tick['high'], formatted_tick['low'],
+                    formatted_tick['close'], formatted_tick['volume'], np.nan, np.nan
+                )])
             
-            # Process based on mode
-            result = {
-                'symbol': symbol,
-                'exchange_type': exchange_type,
-                'token': token,
-                'mode': mode,
-                'timestamp': datetime.now()  # Default timestamp until we extract from binary
-            }
-            
-            # Extract fields based on mode
-            if mode == 1:  # LTP mode
-                if len(binary_data) >= 46:
-                    # Parse LTP mode fields (Section-1)
-                    result['last_price'] = int.from_bytes(binary_data[43:51], byteorder='little') / 100
-                    
-                    # Update timestamp if available (from exchange)
-                    timestamp_bytes = binary_data[27:35]
-                    if any(timestamp_bytes):  # Check if timestamp is not all zeros
-                        try:
-                            timestamp_int = int.from_bytes(timestamp_bytes, byteorder='little')
-                            result['timestamp'] = datetime.fromtimestamp(timestamp_int)
-                        except Exception as e:
-                            logger.log_websocket_event("TIMESTAMP_ERROR", f"Error parsing timestamp: {str(e)}", level="debug")
-                    
-                    return result
-                    
-            elif mode == 2:  # Quote mode (Section-1 + Section-2)
-                if len(binary_data) >= 187:
-                    # Parse quote mode fields
-                    result['last_price'] = int.from_bytes(binary_data[43:51], byteorder='little') / 100
-                    result['last_traded_quantity'] = int.from_bytes(binary_data[51:59], byteorder='little')
-                    result['average_traded_price'] = int.from_bytes(binary_data[59:67], byteorder='little') / 100
-                    result['volume_traded'] = int.from_bytes(binary_data[67:75], byteorder='little')
-                    result['total_buy_quantity'] = int.from_bytes(binary_data[75:83], byteorder='little')
-                    result['total_sell_quantity'] = int.from_bytes(binary_data[83:91], byteorder='little')
-                    result['open_price'] = int.from_bytes(binary_data[91:99], byteorder='little') / 100
-                    result['high_price'] = int.from_bytes(binary_data[99:107], byteorder='little') / 100
-                    result['low_price'] = int.from_bytes(binary_data[107:115], byteorder='little') / 100
-                    result['close_price'] = int.from_bytes(binary_data[115:123], byteorder='little') / 100
-                    result['yearly_high'] = int.from_bytes(binary_data[123:131], byteorder='little') / 100
-                    result['yearly_low'] = int.from_bytes(binary_data[131:139], byteorder='little') / 100
-                    
-                    # Parse best 5 bid/ask
-                    # Bids
-                    result['best_bid_price'] = int.from_bytes(binary_data[139:147], byteorder='little') / 100
-                    result['best_bid_quantity'] = int.from_bytes(binary_data[147:155], byteorder='little')
-                    # More fields can be parsed for full bid-ask ladder
-                    
-                    # Update timestamp
-                    timestamp_bytes = binary_data[27:35]
-                    if any(timestamp_bytes):
-                        try:
-                            timestamp_int = int.from_bytes(timestamp_bytes, byteorder='little')
-                            result['timestamp'] = datetime.fromtimestamp(timestamp_int)
-                        except Exception as e:
-                            logger.log_websocket_event("TIMESTAMP_ERROR", f"Error parsing timestamp: {str(e)}", level="debug")
-                    
-                    return result
-                    
-            elif mode == 3:  # Snap quote mode (Section-1 + Section-2 + parts of Section-3)
-                # Similar parsing for snap quote mode
-                # Includes more fields from Section 3 like circuit limits, etc.
-                if len(binary_data) >= 243:
-                    # Parse basic fields first (similar to mode 2)
-                    result['last_price'] = int.from_bytes(binary_data[43:51], byteorder='little') / 100
-                    result['last_traded_quantity'] = int.from_bytes(binary_data[51:59], byteorder='little')
-                    result['average_traded_price'] = int.from_bytes(binary_data[59:67], byteorder='little') / 100
-                    result['volume_traded'] = int.from_bytes(binary_data[67:75], byteorder='little')
-                    result['total_buy_quantity'] = int.from_bytes(binary_data[75:83], byteorder='little')
-                    result['total_sell_quantity'] = int.from_bytes(binary_data[83:91], byteorder='little')
-                    result['open_price'] = int.from_bytes(binary_data[91:99], byteorder='little') / 100
-                    result['high_price'] = int.from_bytes(binary_data[99:107], byteorder='little') / 100
-                    result['low_price'] = int.from_bytes(binary_data[107:115], byteorder='little') / 100
-                    result['close_price'] = int.from_bytes(binary_data[115:123], byteorder='little') / 100
-                    
-                    # Additional snap quote fields from Section 3
-                    result['upper_circuit'] = int.from_bytes(binary_data[187:195], byteorder='little') / 100
-                    result['lower_circuit'] = int.from_bytes(binary_data[195:203], byteorder='little') / 100
-                    
-                    # Update timestamp
-                    timestamp_bytes = binary_data[27:35]
-                    if any(timestamp_bytes):
-                        try:
-                            timestamp_int = int.from_bytes(timestamp_bytes, byteorder='little')
-                            result['timestamp'] = datetime.fromtimestamp(timestamp_int)
-                        except Exception as e:
-                            logger.log_websocket_event("TIMESTAMP_ERROR", f"Error parsing timestamp: {str(e)}", level="debug")
-                    
-                    return result
-                    
-            elif mode == 4:  # Full quote with depth (full data)
-                # Parse full quote with market depth
-                # This includes all sections from the binary specification
-                # Fields would be similar to mode 3 but with full market depth data
-                logger.log_websocket_event("BINARY_INFO", f"Full quote mode received for {symbol}", level="debug")
-                # Full implementation would be too long for this example but follows same pattern
-                return None
+            if symbol in self.bar_builder.symbol_series:
+                closed = self.bar_builder.on_tick(symbol, timestamp, formatted_tick['close'], formatted_tick['volume'])
+                if closed:
+                    self._emit_bars(closed)
             
-            logger.log_websocket_event("BINARY_WARNING", f"Unsupported mode {mode} for {symbol}", level="warning")
-            return None
+            # Notify callbacks outside the lock, the dispatcher only queues them
+            if callbacks:
+                self.callback_dispatcher.dispatch([(callbacks, formatted_tick, symbol)])
                 
         except Exception as e:
             self.error_count += 1
-            logger.log_websocket_event("BINARY_PROCESS_ERROR", f"Error processing binary data: {str(e)}", level="error")
-            logger.log_websocket_event("BINARY_PROCESS_ERROR", traceback.format_exc(), level="error")
-            return None
+            logger.log_websocket_event("TICK_PROCESS_ERROR", f"Error processing tick data: {str(e)}", level="error")
+            logger.log_websocket_event("TICK_PROCESS_ERROR", traceback.format_exc(), level="error")
     
-    def _handle_parsed_tick(self, tick_data):
-        """Handle a parsed tick from binary data"""
+    def _handle_parsed_ticks(self, ticks, symbols, frames):
+        """
+        Handle a batch of decoded binary ticks
+        
+        ticks is a TICK_DTYPE array with the symbol and raw frame of each tick alongside.
+        The OHLCV values of the whole batch are computed column-wise first, then each
+        tick only takes its own symbol's lock, so buffering never waits for readers of
+        other symbols. Subscriptions are looked up without data_lock: a symbol
+        unsubscribed mid-batch at worst gets one more tick in its discarded buffer.
+        """
+        deliveries = []
+        subscribed_symbols = self.subscribed_symbols
+        quote_rows = self.quote_table.rows
+        quotes = []  # (row, tick position) for the quote table
+        books = []  # (row, bid, ask) from depth frames
+        tick_bus = self.tick_bus
+        published = [] if tick_bus is not None else None  # Rows in TICK_FIELDS order for the tick bus
+        bar_series = self.bar_builder.symbol_series
+        bar_ticks = []  # (symbol, timestamp, price, cumulative volume) of symbols with bars
         try:
-            symbol = tick_data.get('symbol')
+            # Exchange timestamps are epoch milliseconds, ticks carry epoch ns; fall back to receive time
+            exchange_ns = ticks['exchange_timestamp'] * 1_000_000
+            timestamps = np.where(exchange_ns > 0, exchange_ns, time.time_ns())
             
-            if not symbol or symbol not in self.subscribed_symbols:
-                logger.log_websocket_event("TICK_WARNING", f"Received parsed tick for unsubscribed symbol: {symbol}", level="debug")
-                return
+            # LTP frames only carry the last price, it stands in for every OHLC field
+            modes = ticks['mode']
+            last_prices = ticks['last_price']
+            ltp = modes == MODE_LTP
+            opens = np.where(ltp, last_prices, ticks['open_price'])
+            highs = np.where(ltp, last_prices, ticks['high_price'])
+            lows = np.where(ltp, last_prices, ticks['low_price'])
+            volumes = np.where(ltp, 0, ticks['volume_traded'])
+            bids = ticks['best_bid_price']
+            asks = ticks['best_ask_price']
             
-            with self.data_lock:
-                # Format for our standard tick format
-                timestamp = tick_data.get('timestamp', datetime.now())
+            columns = zip(symbols, modes.tolist(), timestamps.tolist(), opens.tolist(), highs.tolist(), lows.tolist(),
+                          last_prices.tolist(), volumes.tolist(), bids.tolist(), asks.tolist())
+            for i, (symbol, mode, timestamp, open_price, high, low, close, volume, bid, ask) in enumerate(columns):
+                subscription = subscribed_symbols.get(symbol)
                 
-                # Convert binary mode data to our standard format
-                mode = tick_data.get('mode')
-                formatted_tick = {
-                    'timestamp': timestamp
-                }
+                if subscription is None:
+                    logger.log_websocket_event("TICK_WARNING", f"Received parsed tick for unsubscribed symbol: {symbol}", level="debug")
+                    continue
                 
-                # Fill in the OHLCV data based on mode
-                if mode == 1:  # LTP mode
-                    # In LTP mode, we only have the last price, so use it for all OHLC fields
-                    ltp = tick_data.get('last_price', 0)
-                    formatted_tick.update({
-                        'open': ltp,
-                        'high': ltp,
-                        'low': ltp,
-                        'close': ltp,
-                        'volume': 0  # No volume info in LTP mode
-                    })
-                elif mode in (2, 3, 4):  # Quote modes with more data
-                    # For these modes we have full OHLCV data
-                    formatted_tick.update({
-                        'open': tick_data.get('open_price', 0),
-                        'high': tick_data.get('high_price', 0),
-                        'low': tick_data.get('low_price', 0),
-                        'close': tick_data.get('last_price', 0),
-                        'volume': tick_data.get('volume_traded', 0)
-                    })
+                row = quote_rows.get(symbol)
+                with subscription['lock']:
+                    if mode in DEPTH_LEVELS_BY_MODE:
+                        book = self._update_depth(subscription, mode, frames[i])
+                    if mode == MODE_DEPTH:
+                        # Depth frames carry no trade data, only the book is updated
+                        if row is not None:
+                            books.append((row, book[0, 0, 0], book[1, 0, 0]))
+                        continue
+                    
+                    # Add to the fixed-size data buffer
+                    subscription['data'].append(timestamp, open_price, high, low, close, volume, bid, ask)
                 
-                # Add to data buffer (limiting size)
-                self.subscribed_symbols[symbol]['data'].append(formatted_tick)
-                if len(self.subscribed_symbols[symbol]['data']) > self.data_buffer_max_size:
-                    self.subscribed_symbols[symbol]['data'] = self.subscribed_symbols[symbol]['data'][-self.data_buffer_max_size:]
+                if published is not None:
+                    published.append((symbol, timestamp, open_price, high, low, close, volume, bid, ask))
                 
-                # Notify callbacks
-                for callback in self.subscribed_symbols[symbol]['callbacks']:
-                    try:
-                        callback(formatted_tick, symbol)
-                    except Exception as callback_err:
-                        logger.log_websocket_event("CALLBACK_ERROR", f"Callback error for {symbol}: {str(callback_err)}", level="error")
+                if symbol in bar_series:
+                    bar_ticks.append((symbol, timestamp, close, volume))
+                
+                if row is not None:
+                    quotes.append((row, i))
+                
+                # Collect callbacks to notify once the batch is buffered
+                callbacks = subscription['callbacks']
+                if callbacks:
+                    formatted_tick = {
+                        'timestamp': timestamp,
+                        'open': open_price,
+                        'high': high,
+                        'low': low,
+                        'close': close,
+                        'volume': volume
+                    }
+                    deliveries.append((tuple(callbacks), formatted_tick, symbol))
+            
+            # Apply the batch to the quote table with one vectorized write per column
+            update_ns = time.time_ns()
+            if quotes:
+                rows, positions = zip(*quotes)
+                positions = np.asarray(positions, dtype=np.intp)
+                self.quote_table.update_many(rows, last_prices[positions], bids[positions], asks[positions],
+                                             ticks['volume_traded'][positions], exchange_ns[positions], update_ns)
+            if books:
+                rows, bids, asks = zip(*books)
+                self.quote_table.update_book(rows, bids, asks, update_ns)
+            
+            # Share the batch with other processes in one ring write
+            if published:
+                tick_bus.publish_ticks(published)
+            
+            # Advance the bars in tick order, completed bars go to their callbacks with the ticks
+            closed = []
+            for symbol, timestamp, price, volume in bar_ticks:
+                closed.extend(self.bar_builder.on_tick(symbol, timestamp, price, volume))
+            if closed:
+                self._emit_bars(closed)
+            
+            # The dispatcher only queues ticks, callbacks run on its worker threads
+            if deliveries:
+                self.callback_dispatcher.dispatch(deliveries)
         
         except Exception as e:
             self.error_count += 1
             logger.log_websocket_event("PARSED_TICK_ERROR", f"Error handling parsed tick: {str(e)}", level="error")
             logger.log_websocket_event("PARSED_TICK_ERROR", traceback.format_exc(), level="error")
     
-    def _on_error(self, wsapp, error):
+    def _update_depth(self, subscription, mode, frame):
+        """Decode a frame's market depth into the symbol's fixed-shape book (caller holds the symbol's lock)"""
+        book = subscription.get('depth')
+        levels = DEPTH_LEVELS_BY_MODE[mode]
+        if book is None or book.shape[1] < levels:
+            book = subscription['depth'] = new_depth_book(levels)
+        decode_depth(frame, book)
+        return book
+    
+    def _new_tick_buffer(self, mode=None):
+        """Create the per-symbol tick buffer; bid/ask columns are kept for snap quote and depth modes"""
+        return TickRingBuffer(self.data_buffer_max_size, with_quotes=mode in (3, 4))
+    
+    def _append_tick(self, subscription, formatted_tick, bid=np.nan, ask=np.nan):
+        """Append a formatted tick to a symbol's ring buffer (caller holds the symbol's lock)"""
+        subscription['data'].append(
+            formatted_tick['timestamp'],
+            formatted_tick['open'],
+            formatted_tick['high'],
+            formatted_tick['low'],
+            formatted_tick['close'],
+            formatted_tick['volume'],
+            bid,
+            ask
+        )
+    
+    def _on_error(self, wsapp, error, shard=None):
         """Called when WebSocket error occurs"""
+        shard = shard or self._primary_shard()
         self.error_count += 1
         self.last_error = str(error)
-        logger.log_websocket_event("ERROR", f"WebSocket error: {str(error)}", level="error")
+        logger.log_websocket_event("ERROR", f"WebSocket error on connection {shard.index}: {str(error)}", level="error")
     
-    def _on_close(self, wsapp, close_status_code=None, close_msg=None):
-        """Called when WebSocket connection closes"""
-        logger.log_websocket_event("CLOSE", f"WebSocket connection closed: {close_msg} (Code: {close_status_code})")
-        self.connected = False
+    def _on_close(self, wsapp, close_status_code=None, close_msg=None, shard=None):
+        """Called when a pooled WebSocket connection closes"""
+        shard = shard or self._primary_shard()
+        logger.log_websocket_event("CLOSE", f"WebSocket connection {shard.index} closed: {close_msg} (Code: {close_status_code})")
+        shard.connected = False
+        if shard.disconnected_at is None:
+            shard.disconnected_at = time.monotonic()
         
         # Try to reconnect
-        if self.reconnect_attempts < self.max_reconnect_attempts:
-            logger.log_websocket_event("CLOSE", f"Attempting to reconnect (Attempt {self.reconnect_attempts + 1}/{self.max_reconnect_attempts})")
-            self.reconnect()
+        if shard.reconnect_attempts < self.max_reconnect_attempts:
+            logger.log_websocket_event("CLOSE", f"Attempting to reconnect connection {shard.index} (Attempt {shard.reconnect_attempts + 1}/{self.max_reconnect_attempts})")
+            self.reconnect(shard)
+    
+    @staticmethod
+    def _token_key(exchange_type, token):
+        """Normalize an exchange type and token to the reverse index key used by the tick path"""
+        return int(exchange_type), str(token).encode('utf-8')
+    
+    def _unindex_symbol(self, symbol):
+        """Remove a symbol's entry from the reverse token index"""
+        info = self.symbol_token_map.get(symbol)
+        if info:
+            key = self._token_key(info['exchange_type'], info['token'])
+            if self.token_symbol_map.get(key) == symbol:
+                del self.token_symbol_map[key]
+    
+    def unregister_symbol(self, symbol):
+        """Remove a symbol's token mapping"""
+        self._unindex_symbol(symbol)
+        self.symbol_token_map.pop(symbol, None)
+        self.quote_table.remove(symbol)
+        logger.log_websocket_event("UNREGISTER", f"Removed symbol mapping: {symbol}")
     
     def register_symbol(self, symbol, exchange_type, token):
         """Register a symbol's token mapping"""
@@ -591,10 +1151,21 @@ class AngelOneWebSocketManager:
                 logger.log_websocket_event("REGISTER_ERROR", "Invalid symbol registration parameters", level="error")
                 return False
                 
+            # Drop the reverse entry of a previous mapping for this symbol
+            previous = self.symbol_token_map.get(symbol)
+            self._unindex_symbol(symbol)
+            
             self.symbol_token_map[symbol] = {
                 'exchange_type': exchange_type,
                 'token': token
             }
+            key = self._token_key(exchange_type, token)
+            self.token_symbol_map[key] = symbol
+            
+            # A new token starts from an empty quote row
+            if previous and self._token_key(previous['exchange_type'], previous['token']) != key:
+                self.quote_table.remove(symbol)
+            self.quote_table.add(symbol)
             logger.log_websocket_event("REGISTER", f"Registered symbol mapping: {symbol} -> {exchange_type}:{token}")
             return True
         except Exception as e:
@@ -603,7 +1174,12 @@ class AngelOneWebSocketManager:
             return False
     
     def subscribe(self, symbol, callback=None):
-        """Subscribe to market data for a symbol"""
+        """
+        Subscribe to market data for a symbol
+        
+        Callbacks receive (tick, symbol) where tick['timestamp'] is int epoch nanoseconds;
+        use ns_to_datetime() from app.helpers.tick_buffer when a datetime is needed.
+        """
         try:
             if not self.connected:
                 logger.log_websocket_event("SUBSCRIBE_ERROR", f"Cannot subscribe to {symbol}: WebSocket not connected", level="warning")
@@ -624,12 +1200,21 @@ class AngelOneWebSocketManager:
                     logger.log_websocket_event("SUBSCRIBE", f"Added callback for already subscribed symbol: {symbol}")
                     return True
                     
+                # Pick the connection that will carry this token
+                shard = self._assign_shard(symbol)
+                if shard is None:
+                    self.last_error = "All WebSocket connections are at their token limit"
+                    logger.log_websocket_event("SUBSCRIBE_ERROR", f"Cannot subscribe to {symbol}: all connections are at their token limit", level="error")
+                    return False
+                    
                 # Create new subscription
                 self.subscribed_symbols[symbol] = {
                     'exchange_type': exchange_type,
                     'token': token,
+                    'mode': 2,
                     'callbacks': [callback] if callback else [],
-                    'data': []
+                    'data': self._new_tick_buffer(2),
+                    'lock': threading.Lock()  # Serializes writes to 'data' and 'depth'; tick snapshots are read without it
                 }
                 
             # Subscribe to the token - format specifically for Angel One API
@@ -645,8 +1230,8 @@ class AngelOneWebSocketManager:
             
             try:
                 # Mode 2 for Quote mode (includes OHLC data)
-                self.ws.subscribe(correlation_id, 2, token_list)  
-                logger.log_websocket_event("SUBSCRIBE", f"Subscribed to symbol: {symbol} ({exchange_type}:{token}) in mode 2")
+                shard.ws.subscribe(correlation_id, 2, token_list)  
+                logger.log_websocket_event("SUBSCRIBE", f"Subscribed to symbol: {symbol} ({exchange_type}:{token}) in mode 2 on connection {shard.index}")
                 return True
             except Exception as e:
                 self.last_error = str(e)
@@ -655,6 +1240,7 @@ class AngelOneWebSocketManager:
                 with self.data_lock:
                     if symbol in self.subscribed_symbols:
                         del self.subscribed_symbols[symbol]
+                    self._release_shard(symbol)
                 return False
         except Exception as e:
             self.last_error = str(e)
@@ -678,9 +1264,12 @@ class AngelOneWebSocketManager:
                 logger.log_websocket_event("SUBSCRIBE_INDEX_ERROR", f"Cannot subscribe to index {symbol}: WebSocket not connected", level="warning")
                 return False
             
-            # Register the symbol first if not done already
-            if symbol not in self.symbol_token_map:
+            # Register the symbol first if not done already (or if its token changed)
+            registered_by_index = False
+            current = self.symbol_token_map.get(symbol)
+            if not current or self._token_key(current['exchange_type'], current['token']) != self._token_key(exchange_type, token):
                 self.register_symbol(symbol, exchange_type, token)
+                registered_by_index = True
             
             # Set up the index-specific subscription format
             token_list = [
@@ -692,12 +1281,21 @@ class AngelOneWebSocketManager:
             
             # Create subscription entry with buffer
             with self.data_lock:
+                shard = self._assign_shard(symbol)
+                if shard is None:
+                    self.last_error = "All WebSocket connections are at their token limit"
+                    logger.log_websocket_event("SUBSCRIBE_INDEX_ERROR", f"Cannot subscribe to index {symbol}: all connections are at their token limit", level="error")
+                    return False
+                    
                 self.subscribed_symbols[symbol] = {
                     'exchange_type': exchange_type,
                     'token': token,
                     'callbacks': [callback] if callback else [],
-                    'data': [],
-                    'is_index': True  # Flag to mark this as an index
+                    'mode': 1,
+                    'data': self._new_tick_buffer(1),
+                    'lock': threading.Lock(),
+                    'is_index': True,  # Flag to mark this as an index
+                    'registered_by_index': registered_by_index
                 }
             
             # Create correlation ID
@@ -705,8 +1303,8 @@ class AngelOneWebSocketManager:
             
             try:
                 # Use mode 1 (LTP) for indices since that's usually what's needed 
-                self.ws.subscribe(correlation_id, 1, token_list)
-                logger.log_websocket_event("SUBSCRIBE_INDEX", f"Subscribed to index: {symbol} ({exchange_type}:{token}) in mode 1")
+                shard.ws.subscribe(correlation_id, 1, token_list)
+                logger.log_websocket_event("SUBSCRIBE_INDEX", f"Subscribed to index: {symbol} ({exchange_type}:{token}) in mode 1 on connection {shard.index}")
                 return True
             except Exception as e:
                 self.last_error = str(e)
@@ -715,6 +1313,7 @@ class AngelOneWebSocketManager:
                 with self.data_lock:
                     if symbol in self.subscribed_symbols:
                         del self.subscribed_symbols[symbol]
+                    self._release_shard(symbol)
                 return False
         except Exception as e:
             self.last_error = str(e)
@@ -750,10 +1349,20 @@ class AngelOneWebSocketManager:
                 return False
                 
             with self.data_lock:
+                # Pick the connection that will carry this token
+                shard = self._assign_shard(symbol)
+                if shard is None:
+                    self.last_error = "All WebSocket connections are at their token limit"
+                    logger.log_websocket_event("SUBSCRIBE_MODE_ERROR", f"Cannot subscribe to {symbol}: all connections are at their token limit", level="error")
+                    return False
+                    
                 # Create or update subscription
                 if symbol in self.subscribed_symbols:
                     # Already subscribed, update mode and add callback if needed
                     self.subscribed_symbols[symbol]['mode'] = mode
+                    if mode in (3, 4):
+                        with self.subscribed_symbols[symbol]['lock']:
+                            self.subscribed_symbols[symbol]['data'].enable_quotes()
                     if callback and callback not in self.subscribed_symbols[symbol]['callbacks']:
                         self.subscribed_symbols[symbol]['callbacks'].append(callback)
                 else:
@@ -763,7 +1372,8 @@ class AngelOneWebSocketManager:
                         'token': token,
                         'mode': mode,
                         'callbacks': [callback] if callback else [],
-                        'data': []
+                        'data': self._new_tick_buffer(mode),
+                        'lock': threading.Lock()
                     }
                     
             # Subscribe to the token with the specified mode
@@ -778,8 +1388,8 @@ class AngelOneWebSocketManager:
             correlation_id = f"subscribe_{symbol}_mode{mode}_{int(time.time())}"
             
             try:
-                self.ws.subscribe(correlation_id, mode, token_list)  
-                logger.log_websocket_event("SUBSCRIBE_MODE", f"Subscribed to symbol: {symbol} ({exchange_type}:{token}) in mode {mode}")
+                shard.ws.subscribe(correlation_id, mode, token_list)  
+                logger.log_websocket_event("SUBSCRIBE_MODE", f"Subscribed to symbol: {symbol} ({exchange_type}:{token}) in mode {mode} on connection {shard.index}")
                 return True
             except Exception as e:
                 self.last_error = str(e)
@@ -815,79 +1425,79 @@ class AngelOneWebSocketManager:
                 logger.log_websocket_event("BATCH_SUBSCRIBE_ERROR", f"Invalid mode {mode}. Use 1, 2, 3, or 4.", level="error")
                 return {symbol: False for symbol in symbols}
             
-            # Group tokens by exchange for efficient subscription
-            exchange_tokens = {}
-            valid_symbols = []
+            # Place symbols on connections and group their tokens by exchange for efficient subscription
+            shard_tokens = {}  # shard index -> [(exchange_type, token)]
+            shard_symbols = {}  # shard index -> [symbols]
+            new_symbols = []
             
-            for symbol in symbols:
-                if symbol not in self.symbol_token_map:
-                    logger.log_websocket_event("BATCH_SUBSCRIBE_ERROR", f"Symbol {symbol} not registered. Call register_symbol() first.", level="warning")
-                    continue
+            with self.data_lock:
+                for symbol in symbols:
+                    if symbol not in self.symbol_token_map:
+                        logger.log_websocket_event("BATCH_SUBSCRIBE_ERROR", f"Symbol {symbol} not registered. Call register_symbol() first.", level="warning")
+                        continue
+                        
+                    shard = self._assign_shard(symbol)
+                    if shard is None:
+                        logger.log_websocket_event("BATCH_SUBSCRIBE_ERROR", f"Cannot subscribe to {symbol}: all connections are at their token limit", level="warning")
+                        continue
+                        
+                    exchange_type = self.symbol_token_map[symbol]['exchange_type']
+                    token = self.symbol_token_map[symbol]['token']
                     
-                exchange_type = self.symbol_token_map[symbol]['exchange_type']
-                token = self.symbol_token_map[symbol]['token']
-                
-                if exchange_type not in exchange_tokens:
-                    exchange_tokens[exchange_type] = []
+                    shard_tokens.setdefault(shard.index, []).append((int(exchange_type), token))
+                    shard_symbols.setdefault(shard.index, []).append(symbol)
                     
-                exchange_tokens[exchange_type].append(token)
-                valid_symbols.append(symbol)
-            
-            # Create subscriptions in our tracking dictionary
-            with self.data_lock:
-                for symbol in valid_symbols:
+                    # Create subscriptions in our tracking dictionary
                     if symbol in self.subscribed_symbols:
-                        # Already subscribed, just add callback
+                        # Already subscribed, switch mode and add callback
+                        self.subscribed_symbols[symbol]['mode'] = mode
+                        if mode in (3, 4):
+                            with self.subscribed_symbols[symbol]['lock']:
+                                self.subscribed_symbols[symbol]['data'].enable_quotes()
                         if callback and callback not in self.subscribed_symbols[symbol]['callbacks']:
                             self.subscribed_symbols[symbol]['callbacks'].append(callback)
                     else:
                         # Create new subscription
                         self.subscribed_symbols[symbol] = {
-                            'exchange_type': self.symbol_token_map[symbol]['exchange_type'],
-                            'token': self.symbol_token_map[symbol]['token'],
+                            'exchange_type': exchange_type,
+                            'token': token,
                             'mode': mode,
                             'callbacks': [callback] if callback else [],
-                            'data': []
+                            'data': self._new_tick_buffer(mode),
+                            'lock': threading.Lock()
                         }
+                        new_symbols.append(symbol)
             
-            # Create subscription request for Angel One API
-            token_list = [
-                {
-                    "exchangeType": int(exchange_type),
-                    "tokens": tokens
-                }
-                for exchange_type, tokens in exchange_tokens.items()
-            ]
-            
-            if not token_list:
+            if not shard_tokens:
                 logger.log_websocket_event("BATCH_SUBSCRIBE_ERROR", "No valid symbols to subscribe", level="warning")
                 return {symbol: False for symbol in symbols}
             
-            # Create a correlation ID for this batch
-            correlation_id = f"batch_subscribe_{int(time.time())}"
-            
-            try:
-                self.ws.subscribe(correlation_id, mode, token_list)
-                logger.log_websocket_event("BATCH_SUBSCRIBE", f"Subscribed to {len(valid_symbols)} symbols in mode {mode}")
+            # Send each connection's tokens in requests within the per-request token limit
+            subscribed = set()
+            for index, exchange_tokens in shard_tokens.items():
+                shard = self.shards[index]
                 
-                # Create result dictionary
-                result = {}
-                for symbol in symbols:
-                    result[symbol] = symbol in valid_symbols
+                try:
+                    for chunk, token_list in enumerate(self._token_list_chunks(mode, exchange_tokens)):
+                        # Create a correlation ID for this request
+                        correlation_id = f"batch_subscribe_{index}_{chunk}_{int(time.time())}"
+                        shard.ws.subscribe(correlation_id, mode, token_list)
+                    subscribed.update(shard_symbols[index])
+                    logger.log_websocket_event("BATCH_SUBSCRIBE", f"Subscribed to {len(shard_symbols[index])} symbols in mode {mode} on connection {index}")
+                except Exception as e:
+                    self.last_error = str(e)
+                    self.error_count += 1
+                    logger.log_websocket_event("BATCH_SUBSCRIBE_ERROR", f"Error in batch subscribe on connection {index}: {str(e)}", level="error")
                     
-                return result
-            except Exception as e:
-                self.last_error = str(e)
-                self.error_count += 1
-                logger.log_websocket_event("BATCH_SUBSCRIBE_ERROR", f"Error in batch subscribe: {str(e)}", level="error")
-                
-                # Clean up any added subscriptions on failure
-                with self.data_lock:
-                    for symbol in valid_symbols:
-                        if symbol in self.subscribed_symbols and symbol not in list(self.subscribed_symbols.keys()):
-                            del self.subscribed_symbols[symbol]
-                            
-                return {symbol: False for symbol in symbols}
+                    # Clean up subscriptions this call added on failure
+                    with self.data_lock:
+                        for symbol in shard_symbols[index]:
+                            if symbol in new_symbols:
+                                self.subscribed_symbols.pop(symbol, None)
+                                self._release_shard(symbol)
+            
+            # Create result dictionary
+            return {symbol: symbol in subscribed for symbol in symbols}
         except Exception as e:
             self.last_error = str(e)
             self.error_count += 1
@@ -906,6 +1516,7 @@ class AngelOneWebSocketManager:
                 if callback and callback in self.subscribed_symbols[symbol]['callbacks']:
                     self.subscribed_symbols[symbol]['callbacks'].remove(callback)
                     logger.log_websocket_event("UNSUBSCRIBE", f"Removed callback for symbol: {symbol}")
+                    self._discard_unused_callbacks([callback])
                     
                     # If callbacks still exist, don't unsubscribe from the feed
                     if self.subscribed_symbols[symbol]['callbacks']:
@@ -914,9 +1525,11 @@ class AngelOneWebSocketManager:
                 # Either no callback specified or no callbacks left, unsubscribe completely
                 exchange_type = self.subscribed_symbols[symbol]['exchange_type']
                 token = self.subscribed_symbols[symbol]['token']
+                registered_by_index = self.subscribed_symbols[symbol].get('registered_by_index', False)
                 
-            # Only unsubscribe from WebSocket if we're connected
-            if self.connected:
+            # Only unsubscribe from WebSocket if the symbol's connection is up
+            shard = self.symbol_shards.get(symbol)
+            if shard is not None and shard.connected:
                 # Format for Angel One API unsubscribe
                 token_list = [
                     {
@@ -927,8 +1540,8 @@ class AngelOneWebSocketManager:
                 
                 correlation_id = f"unsubscribe_{symbol}_{int(time.time())}"
                 try:
-                    self.ws.unsubscribe(correlation_id, token_list)  # Updated to match API specs
-                    logger.log_websocket_event("UNSUBSCRIBE", f"Unsubscribed from symbol: {symbol} ({exchange_type}:{token})")
+                    shard.ws.unsubscribe(correlation_id, token_list)  # Updated to match API specs
+                    logger.log_websocket_event("UNSUBSCRIBE", f"Unsubscribed from symbol: {symbol} ({exchange_type}:{token}) on connection {shard.index}")
                 except Exception as e:
                     self.last_error = str(e)
                     self.error_count += 1
@@ -937,7 +1550,13 @@ class AngelOneWebSocketManager:
             # Remove from our tracking regardless of WebSocket unsubscribe success
             with self.data_lock:
                 if symbol in self.subscribed_symbols:
-                    del self.subscribed_symbols[symbol]
+                    callbacks = self.subscribed_symbols.pop(symbol)['callbacks']
+                    self._discard_unused_callbacks(callbacks)
+                self._release_shard(symbol)
+            
+            # Indices registered implicitly by subscribe_index() are unregistered with them
+            if registered_by_index:
+                self.unregister_symbol(symbol)
                     
             return True
         except Exception as e:
@@ -947,49 +1566,168 @@ class AngelOneWebSocketManager:
             logger.log_websocket_event("UNSUBSCRIBE_ERROR", traceback.format_exc(), level="error")
             return False
     
+    def _discard_unused_callbacks(self, callbacks):
+        """Drop dispatcher queues of callbacks no subscription uses any more (caller holds data_lock)"""
+        for callback in callbacks:
+            if not any(callback in info['callbacks'] for info in self.subscribed_symbols.values()):
+                self.callback_dispatcher.remove(callback)
+    
+    def set_callback_policy(self, callback, policy='all', max_queue=None):
+        """
+        Choose how ticks are queued for a subscriber callback
+        
+        Args:
+            callback (callable): Callback passed to subscribe()
+            policy (str): 'all' delivers every tick in order, 'latest' only the newest pending tick per symbol
+            max_queue (int): Pending ticks kept for this callback before the oldest are dropped
+        """
+        try:
+            self.callback_dispatcher.set_policy(callback, policy, max_queue)
+            logger.log_websocket_event("CALLBACK_POLICY", f"Callback policy for {getattr(callback, '__qualname__', callback)} set to {policy}")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.log_websocket_event("CALLBACK_POLICY_ERROR", f"Error setting callback policy: {str(e)}", level="error")
+            return False
+    
+    def _copy_ticks(self, symbol, limit):
+        subscription = self.subscribed_symbols.get(symbol)
+        if subscription is None:
+            return None
+        # Lock-free: the buffer's sequence number detects overlapping writes
+        return subscription['data'].snapshot(limit)
+    
+    def get_data_snapshot(self, symbol, limit=100):
+        """
+        Copy the last `limit` buffered ticks of a symbol as column arrays, or None if not subscribed
+        
+        Reads never wait on the tick processors. They do queue on snapshot_readers,
+        which only readers take: under the GIL every concurrent reader takes CPU
+        from the tick processors, so reads run one at a time.
+        """
+        with self.snapshot_readers:
+            return self._copy_ticks(symbol, limit)
+    
     def get_data_as_dataframe(self, symbol, limit=100):
         """Get buffered data as pandas DataFrame"""
         try:
-            with self.data_lock:
-                if symbol in self.subscribed_symbols and self.subscribed_symbols[symbol]['data']:
-                    # Get last 'limit' data points
-                    data_points = self.subscribed_symbols[symbol]['data'][-limit:]
-                    df = pd.DataFrame(data_points)
-                    if not df.empty:
-                        df.set_index('timestamp', inplace=True)
-                    return df
-            return pd.DataFrame()
+            # Building the DataFrame is most of a read, so it stays behind snapshot_readers too
+            with self.snapshot_readers:
+                columns = self._copy_ticks(symbol, limit)
+                if columns is None:
+                    return pd.DataFrame()
+                return TickRingBuffer.columns_to_dataframe(columns)
         except Exception as e:
             self.last_error = str(e)
             logger.log_websocket_event("DATA_ERROR", f"Error getting dataframe for {symbol}: {str(e)}", level="error")
             return pd.DataFrame()
     
+    def get_market_depth(self, symbol, copy=False):
+        """
+        Get the market depth book of a symbol subscribed in snap quote (3) or depth (4) mode
+        
+        Returns a (2, levels, 3) float array indexed as book[side, level] = (price, quantity, orders),
+        side 0 = bid and 1 = ask, or None if no depth has been received yet.
+        Without copy the live book is returned as a read-only view that the tick processor
+        keeps updating in place.
+        """
+        subscription = self.subscribed_symbols.get(symbol)
+        if subscription is None:
+            return None
+        with subscription['lock']:
+            book = subscription.get('depth')
+            if book is None:
+                return None
+            if copy:
+                return book.copy()
+            view = book.view()
+            view.flags.writeable = False
+            return view
+    
+    def get_quote(self, symbol):
+        """
+        Get the latest quote of a registered symbol in O(1)
+        
+        Returns a dict with last_price, bid, ask, volume, exchange_ns, update_ns and ticks,
+        or None for an unregistered symbol. Prices are NaN until the first tick; bid and
+        ask are only filled for snap quote (3) and depth (4) subscriptions.
+        """
+        return self.quote_table.get(symbol)
+    
+    def get_quote_snapshot(self):
+        """Get the latest quote of every registered symbol as a DataFrame indexed by symbol, in one copy"""
+        try:
+            return self.quote_table.to_dataframe()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.log_websocket_event("DATA_ERROR", f"Error getting quote snapshot: {str(e)}", level="error")
+            return pd.DataFrame()
+    
     def is_symbol_subscribed(self, symbol):
         """Check if a symbol is currently subscribed"""
         return symbol in self.subscribed_symbols
     
+    def get_subscriptions(self):
+        """Summary of every subscription: symbol, exchange type, token, mode, buffered ticks and callbacks"""
+        with self.data_lock:
+            return [{
+                'symbol': symbol,
+                'exchange_type': info['exchange_type'],
+                'token': info['token'],
+                'mode': info.get('mode', 2),
+                'data_points': len(info['data']),
+                'callbacks': len(info['callbacks'])
+            } for symbol, info in self.subscribed_symbols.items()]
+    
+    def reset_latency_stats(self):
+        """Start the per-stage latency histograms afresh"""
+        for shard in self.shards:
+            shard.latency.reset()
+    
     def get_connection_status(self):
-        """Get detailed connection status"""
+        """Get detailed connection status, aggregated over the connection pool"""
+        shards = [shard.get_status() for shard in self.shards]
         return {
             'connected': self.connected,
             'reconnect_attempts': self.reconnect_attempts,
             'last_error': self.last_error,
             'error_count': self.error_count,
             'last_data_time': self.last_data_time,
-            'subscribed_symbols_count': len(self.subscribed_symbols)
+            'subscribed_symbols_count': len(self.subscribed_symbols),
+            'connections': len(shards),
+            'connected_connections': sum(1 for shard in shards if shard['connected']),
+            'reconnect_to_first_tick_ms': max((shard['last_recovery_ms'] for shard in shards if shard['last_recovery_ms'] is not None), default=None),
+            'max_tokens_per_connection': self.max_tokens_per_connection,
+            'queue_size': sum(shard['queue_size'] for shard in shards),
+            'queue_max_size': self.queue_max_size,
+            'queue_policy': self.queue_policy,
+            'queue_conflated': sum(shard['queue']['conflated'] for shard in shards),
+            'queue_dropped': sum(shard['queue']['dropped'] for shard in shards),
+            'queue_blocked': sum(shard['queue']['blocked'] for shard in shards),
+            'process_batch_size': self.process_batch_size,
+            'last_batch_size': max((shard['last_batch_size'] for shard in shards), default=0),
+            'drain_rate': round(sum(shard['drain_rate'] for shard in shards), 1),
+            'processed_count': sum(shard['processed_count'] for shard in shards),
+            'shards': shards,
+            'latency': LatencyRecorder.merged(shard.latency for shard in self.shards).get_stats(),
+            'callbacks': self.callback_dispatcher.get_stats(),
+            'journal': self.journal.get_stats() if self.journal is not None else None,
+            'tick_bus': self.tick_bus.get_stats() if self.tick_bus is not None else None,
+            'bars': self.bar_builder.get_stats(),
+            'bar_archive': self.bar_archive.get_stats() if self.bar_archive is not None else None
         }
     
     def close_connection(self):
-        """Close WebSocket connection"""
+        """Close all pooled WebSocket connections"""
         try:
             # Stop health check thread
             self.health_check_running = False
             
-            # Close WebSocket connection
-            if self.ws and self.connected:
-                self.ws.close_connection()
-                self.connected = False
-                logger.log_websocket_event("CLOSE", "WebSocket connection closed")
+            # Close WebSocket connections
+            closed = [shard.index for shard in self.shards if shard.close()]
+            self.connection_lock.release()
+            if closed:
+                logger.log_websocket_event("CLOSE", f"WebSocket connection(s) {closed} closed")
                 return True
             return False
         except Exception as e:
@@ -1000,17 +1738,26 @@ class AngelOneWebSocketManager:
 # Singleton instance
 websocket_manager = AngelOneWebSocketManager()
 
-def initialize_angelone_websocket(user):
+def initialize_angelone_websocket(user, manager=None):
     """
     Initialize the AngelOne WebSocket connection with user credentials
     
     Args:
         user: User model instance with AngelOne credentials
+        manager: Manager to connect, the shared websocket_manager by default
         
     Returns:
         dict: Status information about the connection
     """
     try:
+        # With the daemon running the feed, a connection here would be a second one
+        if use_market_data_daemon():
+            logger.log_websocket_event("INIT_ERROR", "WebSocket is owned by the market data daemon", level="error")
+            return {
+                "success": False,
+                "message": "The market data daemon owns the WebSocket; initialize it through the daemon."
+            }
+
         if not user.angelone_api_key or not user.angelone_client_code or not user.angelone_jwt_token or not user.angelone_feed_token:
             logger.log_websocket_event("INIT_ERROR", "Missing AngelOne credentials", level="error")
             return {
@@ -1018,8 +1765,7 @@ def initialize_angelone_websocket(user):
                 "message": "Missing AngelOne credentials. Please update your settings."
             }
             
-        # Get the singleton instance
-        ws_manager = websocket_manager
+        ws_manager = manager or websocket_manager
         
         # Configure with user credentials
         config_success = ws_manager.configure(
@@ -10,6 +10,7 @@ class StrategyInstance(db.Model):
     symbol = db.Column(db.String(20), nullable=False)
     exchange = db.Column(db.String(10), nullable=False)
     timeframe = db.Column(db.String(10), nullable=False)
+    intrabar_interval = db.Column(db.Integer, nullable=True)  # Seconds between runs on the forming bar, None for completed bars only
     
     # Custom parameters (stored as JSON)
     parameters = db.Column(db.JSON, nullable=False, default={})
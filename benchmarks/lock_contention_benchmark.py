@@ -0,0 +1,121 @@
+"""
+Contention benchmark: tick writes against concurrent snapshot readers
+
+One thread feeds quote frames for a universe of symbols through the manager's
+batch processor while reader threads keep pulling DataFrames of random symbols.
+The run is repeated three ways. Readers copy under one lock shared by every
+subscription, which is how the manager once behaved. Or they copy under per-symbol
+locks. Or they use the manager's current read path: lock-free copies checked
+against the buffers' sequence numbers, with reads gated by snapshot_readers, which
+the writer never takes. For each reader count it reports writer ticks/s and reader
+snapshots/s.
+
+Run from the project root:
+    python -m benchmarks.lock_contention_benchmark [symbols] [seconds] [limit]
+"""
+import random
+import sys
+import threading
+import time
+
+from app.helpers.tick_decoder import encode_frame, MODE_QUOTE
+from app.helpers.tick_buffer import TickRingBuffer
+from app.helpers.tick_replay import TickReplay
+from app.helpers.websocket_helper import websocket_manager
+
+READER_COUNTS = (0, 1, 4, 16)
+BATCH_SIZE = 500
+
+
+def make_batches(tokens, batches=20):
+    """Pre-encoded frame batches cycling over every token"""
+    frames = []
+    for step in range(batches * BATCH_SIZE // len(tokens) + 1):
+        for token in tokens:
+            price = 100.0 + step * 0.05
+            frames.append(encode_frame({
+                'mode': MODE_QUOTE, 'exchange_type': 1, 'token': token,
+                'exchange_timestamp': int(time.time() * 1000), 'last_price': price,
+                'open_price': price, 'high_price': price, 'low_price': price,
+                'close_price': price, 'volume_traded': step
+            }))
+    return [frames[i:i + BATCH_SIZE] for i in range(0, batches * BATCH_SIZE, BATCH_SIZE)]
+
+
+def measure(manager, symbols, batches, readers, seconds, limit):
+    stop = threading.Event()
+    written = [0]
+    reads = [0] * readers
+
+    def write():
+        while not stop.is_set():
+            for batch in batches:
+                manager._process_batch(batch)
+                written[0] += len(batch)
+                if stop.is_set():
+                    break
+
+    def read(slot):
+        rng = random.Random(slot)
+        while not stop.is_set():
+            manager.get_data_as_dataframe(rng.choice(symbols), limit)
+            reads[slot] += 1
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return written[0] / seconds, sum(reads) / seconds
+
+
+def run(symbols=200, seconds=2, limit=500):
+    tokens = [str(20000 + i) for i in range(symbols)]
+    names = [f'SYM{i}' for i in range(symbols)]
+    manager = websocket_manager
+
+    TickReplay(iter(())).attach(manager)
+    for name, token in zip(names, tokens):
+        manager.register_symbol(name, 1, token)
+    if not manager.connect():
+        print(f"connect failed: {manager.last_error}")
+        return
+    manager.batch_subscribe(names, mode=MODE_QUOTE)
+    per_symbol_locks = {name: manager.subscribed_symbols[name]['lock'] for name in names}
+    shared_lock = threading.Lock()
+    gated_read = manager.get_data_as_dataframe
+
+    def locked_read(symbol, limit=100):
+        subscription = manager.subscribed_symbols[symbol]
+        with subscription['lock']:
+            columns = subscription['data'].snapshot(limit)
+        return TickRingBuffer.columns_to_dataframe(columns)
+
+    batches = make_batches(tokens)
+    # Fill every buffer so readers copy `limit` rows from the start
+    for _ in range(limit * symbols // (len(batches) * BATCH_SIZE) + 1):
+        for batch in batches:
+            manager._process_batch(batch)
+
+    print(f"{symbols} symbols, snapshots of {limit} ticks, {seconds}s per run")
+    print(f"{'readers':<10}{'locking':<12}{'writer ticks/s':>16}{'reader calls/s':>16}")
+    for readers in READER_COUNTS:
+        for label, locks, read in (('shared', None, locked_read),
+                                    ('per-symbol', per_symbol_locks, locked_read),
+                                    ('seqlock', per_symbol_locks, gated_read)):
+            for name in names:
+                manager.subscribed_symbols[name]['lock'] = shared_lock if locks is None else locks[name]
+            manager.get_data_as_dataframe = read
+            writes, reads = measure(manager, names, batches, readers, seconds, limit)
+            print(f"{readers:<10}{label:<12}{writes:>16.0f}{reads:>16.0f}")
+    manager.get_data_as_dataframe = gated_read
+
+    for name in names:
+        manager.unsubscribe(name)
+    manager.close_connection()
+
+
+if __name__ == '__main__':
+    run(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,59 @@
+"""
+Load test: offline replay through AngelOneWebSocketManager
+
+Streams synthetic quote frames for a universe of tokens through the replay
+transport, at increasing multiples of real time and then at maximum speed.
+For each run it reports the sustained send and processing rates and the
+first point where the pipeline fell behind (backlog, conflation or drops).
+
+Run from the project root:
+    python -m benchmarks.replay_benchmark [tokens] [ticks_per_token] [connections]
+"""
+import sys
+import time
+
+from app.helpers.tick_replay import TickReplay, synthetic_source
+from app.helpers.websocket_helper import websocket_manager
+
+SPEEDS = (10, 100, 1000, None)
+INTERVAL_NS = 1_000_000_000  # One tick per token per second of market time
+
+
+def run(tokens=500, ticks_per_token=20, connections=1):
+    token_list = [str(10000 + i) for i in range(tokens)]
+    manager = websocket_manager
+    manager.configure_pool(max_connections=connections, max_tokens_per_connection=max(1, -(-tokens // connections)))
+
+    print(f"{tokens} tokens x {ticks_per_token} ticks on {connections} connection(s)")
+    print(f"{'speed':<8}{'sent/s':>12}{'processed/s':>14}{'max queue':>12}{'conflated':>12}{'dropped':>10}{'behind at':>12}")
+
+    for speed in SPEEDS:
+        replay = TickReplay(
+            synthetic_source(token_list, ticks_per_token, INTERVAL_NS),
+            speed=speed,
+            sample_interval=0.25
+        ).attach(manager)
+
+        for i, token in enumerate(token_list):
+            manager.register_symbol(f'SYM{i}', 1, token)
+        if not manager.connect():
+            print(f"connect failed: {manager.last_error}")
+            return
+        manager.batch_subscribe([f'SYM{i}' for i in range(tokens)], mode=2)
+
+        report = replay.run(manager)
+        behind = report['fell_behind']
+        behind_at = f"{behind['elapsed']:.2f}s" if behind else '-'
+        print(f"{'max' if speed is None else f'{speed}x':<8}{report['send_rate']:>12.0f}"
+              f"{report['processed_rate'] or 0:>14.0f}{report['max_queue_size']:>12}"
+              f"{report['conflated'] or 0:>12}{report['dropped'] or 0:>10}"
+              f"{behind_at:>12}")
+
+        for i in range(tokens):
+            manager.unsubscribe(f'SYM{i}')
+        manager.close_connection()
+        time.sleep(0.2)
+
+
+if __name__ == '__main__':
+    run(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark: OHLCV resampling
+
+Compares the pandas path formerly used by resample_to_timeframe
+(df.resample().agg().dropna()) with the NumPy bucket + reduceat resampler
+(resample_ohlcv) on one-second bars over whole NSE sessions, and checks
+that both produce the same bars.
+
+Run from the project root:
+    python -m benchmarks.resample_benchmark [sessions]
+"""
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from app.helpers.timeframe import resample_ohlcv
+
+REPEAT = 5
+TIMEFRAMES = (('1m', '1min', None), ('5m', '5min', None), ('15m', '15min', None), ('60m', '60min', '15min'), ('D', '1D', None))
+
+
+def make_session_data(sessions, seed=11):
+    """One-second OHLCV rows from 09:15 to 15:30 on consecutive days"""
+    days = pd.date_range('2024-01-01 09:15', periods=sessions, freq='1D')
+    index = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(day, day + pd.Timedelta(hours=6, minutes=15), freq='1s', inclusive='left').to_numpy()
+        for day in days
+    ]), name='timestamp')
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(len(index)).cumsum() * 0.05
+    return pd.DataFrame({
+        'open': close,
+        'high': close + rng.random(len(index)) * 0.1,
+        'low': close - rng.random(len(index)) * 0.1,
+        'close': close,
+        'volume': rng.integers(1, 500, len(index))
+    }, index=index)
+
+
+def pandas_resample(df, freq, offset):
+    return df.resample(freq, offset=offset).agg({
+        'open': 'first',
+        'high': 'max',
+        'low': 'min',
+        'close': 'last',
+        'volume': 'sum'
+    }).dropna()
+
+
+def run(sessions=5):
+    df = make_session_data(sessions)
+    print(f"{len(df)} rows over {sessions} session(s)")
+    print(f"{'timeframe':<12}{'bars':>8}{'pandas ms':>12}{'numpy ms':>12}{'speedup':>10}")
+
+    for timeframe, freq, offset in TIMEFRAMES:
+        expected = pandas_resample(df, freq, offset)
+        result = resample_ohlcv(df, timeframe, 'NSE')
+        if not (result.index.equals(expected.index) and np.allclose(result.to_numpy(dtype=float), expected.to_numpy(dtype=float))):
+            print(f"{timeframe:<12}results differ")
+            continue
+
+        legacy = min(timeit.repeat(lambda: pandas_resample(df, freq, offset), number=1, repeat=REPEAT))
+        numpy_path = min(timeit.repeat(lambda: resample_ohlcv(df, timeframe, 'NSE'), number=1, repeat=REPEAT))
+        print(f"{timeframe:<12}{len(result):>8}{legacy * 1e3:>12.2f}{numpy_path * 1e3:>12.2f}{legacy / numpy_path:>9.1f}x")
+
+
+if __name__ == '__main__':
+    run(*(int(arg) for arg in sys.argv[1:2]))
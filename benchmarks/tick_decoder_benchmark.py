@@ -0,0 +1,107 @@
+"""
+Micro-benchmark: binary tick frame decoding
+
+Compares the original int.from_bytes slice decoder from
+AngelOneWebSocketManager._process_binary_tick with the precompiled
+struct decoder (decode_frame) and the NumPy batch decoder (decode_frames),
+and times in-place market depth decoding (decode_depth).
+
+Run from the project root:
+    python -m benchmarks.tick_decoder_benchmark
+"""
+import random
+import timeit
+
+from app.helpers.tick_decoder import (
+    decode_frame, decode_frames, decode_depth, encode_frame, new_depth_book,
+    MODE_LTP, MODE_QUOTE, MODE_SNAP_QUOTE, MODE_DEPTH, DEPTH_LEVELS_BY_MODE
+)
+
+FRAME_COUNT = 10000
+REPEAT = 5
+
+
+def legacy_decode(binary_data):
+    """Field extraction as done by the original _process_binary_tick (symbol lookup excluded)"""
+    mode = binary_data[0]
+    exchange_type = binary_data[1]
+    token_end = 2
+    while token_end < 27 and binary_data[token_end] != 0:
+        token_end += 1
+    token = binary_data[2:token_end].decode('utf-8')
+    result = {'exchange_type': exchange_type, 'token': token, 'mode': mode}
+    result['last_price'] = int.from_bytes(binary_data[43:51], byteorder='little') / 100
+    timestamp_bytes = binary_data[27:35]
+    if any(timestamp_bytes):
+        result['timestamp'] = int.from_bytes(timestamp_bytes, byteorder='little')
+    if mode in (2, 3):
+        result['last_traded_quantity'] = int.from_bytes(binary_data[51:59], byteorder='little')
+        result['average_traded_price'] = int.from_bytes(binary_data[59:67], byteorder='little') / 100
+        result['volume_traded'] = int.from_bytes(binary_data[67:75], byteorder='little')
+        result['total_buy_quantity'] = int.from_bytes(binary_data[75:83], byteorder='little')
+        result['total_sell_quantity'] = int.from_bytes(binary_data[83:91], byteorder='little')
+        result['open_price'] = int.from_bytes(binary_data[91:99], byteorder='little') / 100
+        result['high_price'] = int.from_bytes(binary_data[99:107], byteorder='little') / 100
+        result['low_price'] = int.from_bytes(binary_data[107:115], byteorder='little') / 100
+        result['close_price'] = int.from_bytes(binary_data[115:123], byteorder='little') / 100
+    if mode == 3:
+        result['yearly_high'] = int.from_bytes(binary_data[123:131], byteorder='little') / 100
+        result['yearly_low'] = int.from_bytes(binary_data[131:139], byteorder='little') / 100
+        result['best_bid_price'] = int.from_bytes(binary_data[139:147], byteorder='little') / 100
+        result['best_bid_quantity'] = int.from_bytes(binary_data[147:155], byteorder='little')
+        result['upper_circuit'] = int.from_bytes(binary_data[187:195], byteorder='little') / 100
+        result['lower_circuit'] = int.from_bytes(binary_data[195:203], byteorder='little') / 100
+    return result
+
+
+def make_frames(mode, count=FRAME_COUNT, seed=7):
+    """Build synthetic frames for one subscription mode"""
+    rng = random.Random(seed)
+    frames = []
+    for i in range(count):
+        price = round(rng.uniform(100, 50000), 2)
+        frames.append(encode_frame({
+            'mode': mode,
+            'exchange_type': 2,
+            'token': str(40000 + rng.randrange(500)),
+            'sequence_number': i,
+            'exchange_timestamp': 1700000000000 + i,
+            'last_price': price,
+            'last_traded_quantity': rng.randrange(1, 1000),
+            'average_traded_price': price,
+            'volume_traded': i * 25,
+            'open_price': price,
+            'high_price': price,
+            'low_price': price,
+            'close_price': price,
+            'bids': [(price - level * 0.05, 100 + level, 1 + level) for level in range(20)],
+            'asks': [(price + level * 0.05, 200 + level, 1 + level) for level in range(20)]
+        }))
+    return frames
+
+
+def run():
+    print(f"{'mode':<12}{'legacy us/frame':>18}{'struct us/frame':>18}{'batch us/frame':>18}{'speedup':>10}")
+    for mode, name in ((MODE_LTP, 'LTP'), (MODE_QUOTE, 'QUOTE'), (MODE_SNAP_QUOTE, 'SNAP_QUOTE')):
+        frames = make_frames(mode)
+
+        legacy = min(timeit.repeat(lambda: [legacy_decode(f) for f in frames], number=1, repeat=REPEAT))
+        single = min(timeit.repeat(lambda: [decode_frame(f) for f in frames], number=1, repeat=REPEAT))
+        batch = min(timeit.repeat(lambda: decode_frames(frames), number=1, repeat=REPEAT))
+
+        per_frame = lambda seconds: seconds / len(frames) * 1e6
+        print(f"{name:<12}{per_frame(legacy):>18.3f}{per_frame(single):>18.3f}{per_frame(batch):>18.3f}"
+              f"{legacy / batch:>9.1f}x")
+
+
+    print()
+    print(f"{'depth mode':<12}{'us/frame':>18}")
+    for mode, name in ((MODE_SNAP_QUOTE, 'SNAP_QUOTE'), (MODE_DEPTH, 'DEPTH')):
+        frames = make_frames(mode)
+        book = new_depth_book(DEPTH_LEVELS_BY_MODE[mode])
+        seconds = min(timeit.repeat(lambda: [decode_depth(f, book) for f in frames], number=1, repeat=REPEAT))
+        print(f"{name:<12}{seconds / len(frames) * 1e6:>18.3f}")
+
+
+if __name__ == '__main__':
+    run()
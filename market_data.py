@@ -0,0 +1,30 @@
+"""
+Market data daemon
+
+Owns the AngelOne WebSocket connection and the strategy runners in a process of its
+own. Start it next to the web app, which then delegates to it:
+
+    python market_data.py
+    MARKET_DATA_DAEMON=1 python app.py
+"""
+import argparse
+import sys
+from app import create_app
+from app.helpers.market_data_client import DEFAULT_SOCKET_PATH, DEFAULT_LOCK_PATH
+from app.helpers.market_data_daemon import MarketDataDaemon
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="AlgoTrade market data daemon")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help="Unix socket the web app connects to")
+    parser.add_argument('--lock', default=DEFAULT_LOCK_PATH, help="Lock file allowing one daemon per host")
+    parser.add_argument('--no-tick-bus', action='store_true', help="Do not publish ticks to shared memory")
+    args = parser.parse_args()
+
+    # This process runs the feed, so the background tasks start here
+    app = create_app(market_data_daemon=False)
+    daemon = MarketDataDaemon(app, socket_path=args.socket, lock_path=args.lock)
+    try:
+        daemon.serve_forever(tick_bus=not args.no_tick_bus)
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,252 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+from app.helpers import async_websocket_helper
+from app.helpers.tick_decoder import encode_frame, frame_key
+
+
+class StreamStandInServer:
+    """
+    Local stand-in for the AngelOne smart-stream server
+
+    Runs its own event loop thread and speaks the same protocol as the broker: the
+    credential headers on the upgrade request, JSON subscribe (action 1) and
+    unsubscribe (action 0) requests, and a text "pong" for every "ping". publish()
+    sends a binary frame to the connections that subscribed its token, and
+    drop_connections() cuts every connection without a close handshake.
+    """
+
+    def __init__(self, host='127.0.0.1'):
+        self.host = host
+        self.port = None
+        self.loop = None
+        self.thread = None
+        self.server = None
+        self.connections = []  # (websocket, set of (exchange_type, token bytes))
+        self.requests = []  # Every JSON request received, in order
+        self.headers = []  # Upgrade request headers of every connection
+        self.pings = 0
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/smart-stream"
+
+    def start(self):
+        ready = threading.Event()
+        self.loop = asyncio.new_event_loop()
+
+        async def listen():
+            return await serve(self._handle, self.host, 0)
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.server = self.loop.run_until_complete(listen())
+            self.port = self.server.sockets[0].getsockname()[1]
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name="StreamStandInServer", daemon=True)
+        self.thread.start()
+        ready.wait(5)
+        return self
+
+    def stop(self):
+        self._call(self._shutdown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.loop.close()
+
+    async def _shutdown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def _call(self, coroutine, timeout=5):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    async def _handle(self, websocket):
+        tokens = set()
+        connection = (websocket, tokens)
+        self.headers.append(websocket.request.headers)
+        self.connections.append(connection)
+        try:
+            async for message in websocket:
+                if message == "ping":
+                    self.pings += 1
+                    await websocket.send("pong")
+                    continue
+                request = json.loads(message)
+                self.requests.append(request)
+                for entry in request.get('params', {}).get('tokenList', []):
+                    for token in entry['tokens']:
+                        key = (int(entry['exchangeType']), str(token).encode('utf-8'))
+                        if request.get('action') == 1:
+                            tokens.add(key)
+                        else:
+                            tokens.discard(key)
+        except ConnectionClosed:
+            pass
+        finally:
+            if connection in self.connections:
+                self.connections.remove(connection)
+
+    def subscribed_tokens(self):
+        """(exchange_type, token bytes) keys subscribed on each open connection"""
+        return [set(tokens) for _, tokens in self.connections]
+
+    def publish(self, frames):
+        """Send binary frames to the connections subscribed to their tokens; returns frames delivered"""
+        return self._call(self._publish(list(frames)))
+
+    async def _publish(self, frames):
+        delivered = 0
+        for frame in frames:
+            key = frame_key(frame)
+            for websocket, tokens in list(self.connections):
+                if key in tokens:
+                    await websocket.send(frame)
+                    delivered += 1
+        return delivered
+
+    def drop_connections(self):
+        """Abort every connection as if the network dropped"""
+        return self._call(self._drop())
+
+    async def _drop(self):
+        dropped = len(self.connections)
+        for websocket, _ in list(self.connections):
+            websocket.transport.abort()
+        self.connections = []
+        return dropped
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def server():
+    server = StreamStandInServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def manager(monkeypatch, server):
+    monkeypatch.setattr(async_websocket_helper.AsyncAngelOneWebSocketManager, '_instance', None)
+    manager = async_websocket_helper.AsyncAngelOneWebSocketManager()
+    manager.configure('jwt', 'key', 'client', 'feed')
+    manager.configure_stream(server.url)
+    manager.configure_pool(max_connections=2, max_tokens_per_connection=2)
+    manager.reconnect_delay = 0.01
+    for i in range(4):
+        manager.register_symbol(f'SYM{i}', 1, str(3000 + i))
+    yield manager
+    manager.shutdown()
+
+
+def quote(token, price):
+    return encode_frame({'mode': 2, 'exchange_type': 1, 'token': token, 'exchange_timestamp': 1700000000000,
+                         'last_price': price, 'close_price': price, 'volume_traded': 1})
+
+
+def test_ticks_flow_from_the_stand_in_server(manager, server):
+    manager.health_check_interval = 0.05
+    received = []
+    assert manager.connect()
+    assert len(server.connections) == 2 and server.headers[0]['x-feed-token'] == 'feed'
+
+    assert manager.subscribe('SYM0', lambda tick, symbol: received.append(symbol))
+    result = manager.batch_subscribe(['SYM1', 'SYM2', 'SYM3'], mode=3)
+    assert all(result.values())
+    assert wait_for(lambda: sum(len(tokens) for tokens in server.subscribed_tokens()) == 4)
+
+    assert server.publish([quote(str(3000 + i), 100.0 + i) for i in range(4)]) == 4
+    assert wait_for(lambda: manager.get_connection_status()['processed_count'] == 4)
+    assert list(manager.get_data_as_dataframe('SYM2')['close']) == [102.0]
+    assert manager.get_quote('SYM3')['last_price'] == 103.0
+    assert wait_for(lambda: received == ['SYM0'])
+
+    # Heartbeats run on the loop timer and are answered by the server
+    assert wait_for(lambda: server.pings >= 2)
+
+    assert manager.unsubscribe('SYM0')
+    assert wait_for(lambda: server.requests[-1]['action'] == 0)
+    assert server.requests[-1]['params']['mode'] == 2
+
+
+def test_dropped_connections_resubscribe_and_shutdown_stops_the_loop(manager, server):
+    assert manager.connect()
+    manager.batch_subscribe(['SYM0', 'SYM1'], mode=1)
+    manager.batch_subscribe(['SYM2', 'SYM3'], mode=3)
+    assert wait_for(lambda: sum(len(tokens) for tokens in server.subscribed_tokens()) == 4)
+
+    assert server.drop_connections() == 2
+    assert wait_for(lambda: manager.connected and len(server.connections) == 2
+                    and sum(len(tokens) for tokens in server.subscribed_tokens()) == 4)
+    modes = {token: request['params']['mode'] for request in server.requests[-4:]
+             for entry in request['params']['tokenList'] for token in entry['tokens']}
+    assert modes == {'3000': 1, '3001': 1, '3002': 3, '3003': 3}
+
+    server.publish([quote('3001', 55.0)])
+    assert wait_for(lambda: len(manager.get_data_as_dataframe('SYM1')) == 1)
+    assert manager.get_connection_status()['reconnect_to_first_tick_ms'] is not None
+
+    loop_thread = manager.loop_thread
+    assert manager.shutdown()
+    assert not loop_thread.is_alive() and not manager.connected
+    assert wait_for(lambda: not server.connections)
+
+
+def test_oversized_messages_drop_the_connection(manager, server):
+    assert manager.connect()
+    manager.subscribe_mode('SYM0', 2)
+    assert wait_for(lambda: any(server.subscribed_tokens()))
+    opened = len(server.headers)
+
+    # The client refuses the message and reconnects instead of buffering it
+    server.publish([quote('3000', 1.0) + bytes(async_websocket_helper.MAX_MESSAGE_BYTES)])
+    assert wait_for(lambda: len(server.headers) > opened and manager.connected)
+    assert manager.get_connection_status()['processed_count'] == 0
+
+
+def test_batches_and_bar_closing_run_off_the_loop(manager, server, monkeypatch):
+    process_batch = manager._process_batch
+    processing = threading.Event()
+
+    def slow_batch(*args):
+        processing.set()
+        time.sleep(0.3)
+        process_batch(*args)
+
+    monkeypatch.setattr(manager, '_process_batch', slow_batch)
+    assert manager.connect()
+    manager.subscribe_mode('SYM0', 2)
+    manager.subscribe_bars('SYM0', '1m')
+    assert wait_for(lambda: any(server.subscribed_tokens()))
+
+    # While a batch is processed the loop still answers at once
+    server.publish([quote('3000', 10.0)])
+    assert processing.wait(5)
+    started = time.perf_counter()
+    manager._run(asyncio.sleep(0), 1)
+    assert time.perf_counter() - started < 0.2
+    assert wait_for(lambda: manager.get_connection_status()['processed_count'] == 1)
+
+    # Bars are closed by a loop task, not a thread, and shutdown() stops it with the executor
+    assert wait_for(lambda: manager.bar_timer_task is not None)
+    assert not any(thread.name == 'BarTimer' for thread in threading.enumerate())
+    task = manager.bar_timer_task
+    assert manager.shutdown() and task.done() and manager.bar_timer_task is None
+    assert not any(thread.name.startswith('AsyncTickBatch') for thread in threading.enumerate())
+    manager.unsubscribe_bars('SYM0')
@@ -0,0 +1,103 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.helpers.bar_archive import BarArchive
+from app.helpers.bar_builder import BAR_DTYPE, bars_to_dataframe, dataframe_to_bars
+
+SECOND = 1_000_000_000
+MINUTE = 60 * SECOND
+BASE = 1700000040 * SECOND
+
+
+def make_bars(starts, close=100.0):
+    bars = np.zeros(len(starts), dtype=BAR_DTYPE)
+    bars['start'] = starts
+    bars['open'] = bars['high'] = bars['low'] = close
+    bars['close'] = close + np.arange(len(starts))
+    bars['volume'] = 10
+    return bars
+
+
+def test_archive_appends_merges_and_persists(tmp_path):
+    archive = BarArchive(str(tmp_path), grow_bars=4)
+    assert len(archive.read('SYM', 'NSE', '1m')) == 0 and archive.synced_until('SYM', 'NSE', '1m') == 0
+
+    # Live bars only extend the synced range once a download has covered the time before them
+    archive.write('SYM', 'NSE', 60, make_bars([BASE + 5 * MINUTE, BASE + 6 * MINUTE]), contiguous=True)
+    assert archive.synced_until('SYM', 'NSE', '1m') == 0
+
+    # A downloaded gap is merged in by start time, growing the file past its first chunk
+    downloaded = make_bars([BASE + i * MINUTE for i in range(6)], close=50.0)
+    archive.write('SYM', 'NSE', '1m', downloaded, synced_until_ns=BASE + 7 * MINUTE)
+    stored = archive.read('SYM', 'NSE', '1min')
+    assert list(stored['start']) == [BASE + i * MINUTE for i in range(7)]
+    assert stored['close'][5] == 55.0 and stored['close'][6] == 101.0
+    archive.write('SYM', 'NSE', '1m', make_bars([BASE + 7 * MINUTE]), contiguous=True)
+    assert archive.synced_until('SYM', 'NSE', '1m') == BASE + 8 * MINUTE
+    assert archive.get_stats()['merges'] == 1
+    archive.close()
+
+    # Another process reopening the archive sees the same bars
+    reopened = BarArchive(str(tmp_path))
+    assert list(reopened.read('SYM', 'NSE', '1m', start_ns=BASE + 6 * MINUTE)['start']) == [BASE + 6 * MINUTE, BASE + 7 * MINUTE]
+    assert list(reopened.read('SYM', 'NSE', '1m', limit=1)['start']) == [BASE + 7 * MINUTE]
+    assert len(reopened.read('SYM', 'MCX', '1m')) == 0 and len(reopened.read('SYM', 'NSE', '5m')) == 0
+    assert reopened.synced_until('SYM', 'NSE', '1m') == BASE + 8 * MINUTE
+    reopened.close()
+
+    with pytest.raises(ValueError):
+        BarArchive(str(tmp_path)).path('SYM', 'NSE', 'weekly')
+
+
+def test_dataframes_round_trip_through_bars():
+    bars = make_bars([BASE + i * MINUTE for i in range(3)])
+    df = bars_to_dataframe(bars)
+    assert dataframe_to_bars(df).tolist() == bars.tolist()
+
+    # Downloaded candles carry a timezone and no tick counts
+    aware = df.drop(columns='ticks')
+    aware.index = pd.DatetimeIndex(bars['start'].astype('datetime64[ns]')).tz_localize('UTC').tz_convert('Asia/Kolkata')
+    assert dataframe_to_bars(aware).tolist() == bars.tolist()
+
+
+def test_warm_up_downloads_only_the_missing_tail(monkeypatch, tmp_path):
+    pytest.importorskip('openalgo')
+    from app.helpers import strategy_helper
+
+    clock = [BASE + 3 * MINUTE + 30 * SECOND]
+    downloads = []
+
+    def get_historical_data(user, symbol, exchange, timeframe, start_date, end_date):
+        # The broker returns every candle from the start minute on, the newest still forming
+        first = int(datetime.strptime(start_date, "%Y-%m-%d %H:%M").timestamp()) * SECOND
+        downloads.append(first)
+        starts = range(max(first, BASE), clock[0], MINUTE)
+        return bars_to_dataframe(make_bars(list(starts))).drop(columns='ticks')
+
+    archive = BarArchive(str(tmp_path))
+    monkeypatch.setattr(strategy_helper, 'bar_archive', archive)
+    monkeypatch.setattr(strategy_helper, 'get_historical_data', get_historical_data)
+    monkeypatch.setattr(strategy_helper, 'time', SimpleNamespace(time_ns=lambda: clock[0]))
+    monkeypatch.setattr(strategy_helper, 'last_session_time', lambda exchange=None: datetime.fromtimestamp(clock[0] / SECOND))
+
+    # An empty archive downloads everything; the forming candle is left out and not counted as synced
+    df = strategy_helper.warm_up_bars(None, 'SYM', 'NSE', '1m')
+    assert len(downloads) == 1
+    assert list(dataframe_to_bars(df)['start']) == [BASE, BASE + MINUTE, BASE + 2 * MINUTE]
+    assert archive.synced_until('SYM', 'NSE', '1m') == BASE + 3 * MINUTE
+
+    # In sync: no bar can have completed since, so nothing is downloaded
+    assert len(strategy_helper.warm_up_bars(None, 'SYM', 'NSE', '1m')) == 3
+    assert len(downloads) == 1
+
+    # Two minutes later only the tail from the forming candle on is downloaded
+    clock[0] += 2 * MINUTE
+    df = strategy_helper.warm_up_bars(None, 'SYM', 'NSE', '1m', limit=4)
+    assert downloads[1] == BASE + 3 * MINUTE
+    assert list(dataframe_to_bars(df)['start']) == [BASE + i * MINUTE for i in range(1, 5)]
+    assert archive.synced_until('SYM', 'NSE', '1m') == BASE + 5 * MINUTE
+    archive.close()
@@ -0,0 +1,152 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.helpers import websocket_helper
+from app.helpers.bar_archive import BarArchive
+from app.helpers.bar_builder import BAR_DTYPE, BarBuilder, BarSeries, append_bars, bars_to_dataframe
+from app.helpers.tick_decoder import encode_frame
+from app.helpers.tick_replay import TickReplay
+
+SECOND = 1_000_000_000
+MINUTE = 60 * SECOND
+BASE = 1700000040 * SECOND  # A whole UTC minute
+
+
+def test_bars_from_cumulative_volume():
+    builder = BarBuilder(capacity=3, offset_ns=0)
+    series = builder.track('SYM', 60)
+
+    # The first tick only establishes the cumulative volume
+    assert builder.on_tick('SYM', BASE + 1 * SECOND, 100.0, 5000) == []
+    builder.on_tick('SYM', BASE + 20 * SECOND, 102.0, 5030)
+    builder.on_tick('SYM', BASE + 40 * SECOND, 99.0, 5100)
+    closed = builder.on_tick('SYM', BASE + MINUTE + 5 * SECOND, 101.0, 5110)
+    assert [bar for _, bar in closed] == [{'start': BASE, 'open': 100.0, 'high': 102.0, 'low': 99.0, 'close': 99.0,
+                                           'volume': 100, 'ticks': 3, 'timeframe': 60}]
+
+    # A late tick from the completed minute only adds volume; a drop in cumulative volume is a new session
+    builder.on_tick('SYM', BASE + 59 * SECOND, 50.0, 5115)
+    builder.on_tick('SYM', BASE + MINUTE + 30 * SECOND, 103.0, 40)
+    forming = builder.get_forming_bar('SYM', 60)
+    assert (forming['low'], forming['close'], forming['volume'], forming['ticks']) == (101.0, 103.0, 55, 2)
+    assert series.late_ticks == 1
+
+    # Quiet intervals produce no bars; the timer completes the last one
+    assert builder.close_due(BASE + 2 * MINUTE - 1) == []
+    assert [bar['start'] for _, bar in builder.close_due(BASE + 2 * MINUTE)] == [BASE + MINUTE]
+    builder.on_tick('SYM', BASE + 5 * MINUTE, 104.0, 60)
+    df = builder.get_bars('SYM', 60, include_forming=True)
+    assert list(df['close']) == [99.0, 103.0, 104.0] and list(df['volume']) == [100, 55, 20]
+    assert list(builder.get_bars('SYM', 60, limit=1)['close']) == [103.0]
+
+
+def test_bar_ring_keeps_the_newest_bars():
+    series = BarSeries('SYM', 1, capacity=4, offset_ns=0)
+    for i in range(10):
+        series.update(BASE + i * SECOND, float(i), 1)
+    bars = series.get_bars(include_forming=True)
+    assert list(bars['close']) == [5.0, 6.0, 7.0, 8.0, 9.0]
+    assert list(series.get_bars(limit=2, include_forming=True)['close']) == [8.0, 9.0]
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_instance', None)
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_health_check', lambda self: None)
+    manager = websocket_helper.AngelOneWebSocketManager()
+    TickReplay(iter(())).attach(manager)
+    manager.register_symbol('SYM0', 1, '2885')
+    assert manager.connect() and manager.subscribe('SYM0')
+    yield manager
+    manager.unsubscribe_bars('SYM0')
+    manager.close_connection()
+
+
+def test_manager_emits_completed_bars(manager, tmp_path):
+    received = []
+    archive = BarArchive(str(tmp_path))
+    manager.enable_bar_archive(archive)
+    manager.bar_close_delay = 1e9  # Keep the timer from completing these old bars
+    assert manager.subscribe_bars('SYM0', 60, lambda bar, symbol: received.append((symbol, bar)))
+    manager.bar_builder.get_series('SYM0', 60).offset_ns = 0
+
+    # A download left the archive in sync up to the minute the feed starts in
+    downloaded = np.array([(BASE - MINUTE, 9.0, 9.0, 9.0, 9.0, 40, 0)], dtype=BAR_DTYPE)
+    archive.write('SYM0', None, '1m', downloaded, synced_until_ns=BASE)
+
+    manager._process_batch([
+        encode_frame({'mode': 2, 'exchange_type': 1, 'token': '2885', 'exchange_timestamp': (BASE + seconds * SECOND) // 1_000_000,
+                      'last_price': price, 'volume_traded': volume})
+        for seconds, price, volume in ((1, 10.0, 100), (30, 11.0, 150), (61, 12.0, 175), (125, 13.0, 185))
+    ])
+
+    deadline = time.time() + 5
+    while time.time() < deadline and len(received) < 2:
+        time.sleep(0.01)
+    assert received[0] == ('SYM0', {'start': BASE, 'open': 10.0, 'high': 11.0, 'low': 10.0, 'close': 11.0,
+                                    'volume': 50, 'ticks': 2, 'timeframe': 60})
+    assert list(manager.get_bars('SYM0', 60, include_forming=True)['close']) == [11.0, 12.0, 13.0]
+    assert manager.get_connection_status()['bars']['closed_bars'] == 2
+
+    # The first bar began with the first tick seen, so it is neither archived nor counted as synced
+    assert manager.bar_builder.get_series('SYM0', 60).partial_start == BASE
+    assert archive.read('SYM0', None, '1m').tolist() == [(BASE - MINUTE, 9.0, 9.0, 9.0, 9.0, 40, 0),
+                                                         (BASE + MINUTE, 12.0, 12.0, 12.0, 12.0, 25, 1)]
+    assert archive.synced_until('SYM0', None, '1m') == BASE
+    archive.close()
+
+
+def test_cascade_rolls_up_the_one_minute_bars():
+    builder = BarBuilder(offset_ns=0)
+    day = 1699920000 * SECOND  # A UTC midnight
+    start = 1699999800 * SECOND  # Starts a 5-minute bucket
+    tracked = builder.track_cascade('SYM', timeframes=(300, 86400))
+    assert sorted(tracked) == [60, 300, 86400] and builder.get_stats()['rolled_up'] == 2
+
+    builder.on_tick('SYM', start, 100.0, 1000)
+    for minute, price in enumerate((101.0, 98.0, 104.0, 102.0, 103.0)):
+        builder.on_tick('SYM', start + minute * MINUTE + 30 * SECOND, price, 1010 + 10 * minute)
+
+    # The first tick of the next 5-minute bucket completes the 5-minute bar, not the daily one
+    closed = builder.on_tick('SYM', start + 5 * MINUTE + 1 * SECOND, 105.0, 1060)
+    assert [(series.timeframe, bar['start']) for series, bar in closed] == [(60, start + 4 * MINUTE), (300, start)]
+    assert closed[1][1] == {'start': start, 'open': 100.0, 'high': 104.0, 'low': 98.0, 'close': 103.0,
+                            'volume': 50, 'ticks': 6, 'timeframe': 300}
+
+    # Forming bars above one minute include the base series' partial minute
+    forming = builder.get_forming_bar('SYM', 300)
+    assert (forming['start'], forming['open'], forming['close'], forming['volume']) == (start + 5 * MINUTE, 105.0, 105.0, 10)
+    daily = builder.get_forming_bar('SYM', 86400)
+    assert (daily['start'], daily['high'], daily['close'], daily['volume'], daily['ticks']) == (day, 105.0, 105.0, 60, 7)
+
+    # Completed bars are computed once and shared read-only by every reader
+    first, second = builder.get_bars('SYM', 300), builder.get_bars('SYM', 300)
+    assert list(first['close']) == [103.0]
+    assert tracked[300].get_completed() is tracked[300].get_completed()
+    with pytest.raises(ValueError):
+        first.iloc[0, 0] = 0.0
+    assert second['open'].iloc[0] == 100.0
+
+    # Dropping the base keeps it alive for the roll-ups, dropping the symbol removes everything
+    builder.untrack('SYM', 60)
+    assert builder.get_series('SYM', 60) is tracked[60] and builder.is_tracked('SYM')
+    builder.untrack('SYM')
+    assert builder.get_stats()['series'] == 0 and not builder.is_tracked('SYM')
+
+
+def test_append_bars_keeps_a_bounded_window():
+    bars = np.zeros(6, dtype=BAR_DTYPE)
+    bars['start'] = BASE + np.arange(6) * MINUTE
+    bars['close'] = np.arange(6)
+    df = bars_to_dataframe(bars)
+
+    window = append_bars(pd.DataFrame(), df.iloc[:4], 3)
+    assert list(window['close']) == [1.0, 2.0, 3.0]
+
+    # Bars already held are skipped, new ones push the oldest out
+    window = append_bars(window, df.iloc[2:], 3)
+    assert list(window['close']) == [3.0, 4.0, 5.0]
+    assert append_bars(window, df.iloc[-2:], 3) is window
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from app.helpers.bar_trigger import BarTrigger, WAKE_BAR, WAKE_CLOCK, WAKE_INTRABAR, WAKE_STOPPED
+
+SECOND = 1_000_000_000
+
+
+def test_bar_close_wakes_the_runner_at_once():
+    trigger = BarTrigger('1m', clock_delay=0.0)
+    trigger.offset_ns = 0
+
+    # Bars end on the minute, and with no event the runner still wakes once the minute is over
+    assert trigger.next_close_ns(1700000040 * SECOND + 1) == 1700000100 * SECOND
+    assert trigger.wait(now_ns=1700000100 * SECOND - 1000) == WAKE_CLOCK
+
+    # A completed bar wakes a waiting runner, and one completed mid-run is not lost
+    bar = {'start': time.time_ns() - 60 * SECOND, 'close': 101.0}
+    threading.Timer(0.05, trigger.on_bar, (bar, 'SBIN')).start()
+    started = time.perf_counter()
+    assert trigger.wait() == WAKE_BAR
+    assert time.perf_counter() - started < 1.0
+    trigger.on_bar(bar, 'SBIN')
+    assert trigger.wait() == WAKE_BAR and trigger.last_bar is bar
+
+    stats = trigger.get_stats()
+    assert stats['bar_wakes'] == 2 and stats['clock_wakes'] == 1 and stats['last_latency_ms'] >= 0
+
+
+class LateBarEvent(threading.Event):
+    """A bar completes just after the wait timed out, before wait() returns"""
+
+    def wait(self, timeout=None):
+        woken = super().wait(timeout)
+        self.set()
+        return woken
+
+
+def test_bar_after_a_timeout_is_not_lost():
+    trigger = BarTrigger('1m', clock_delay=0.0)
+    trigger.offset_ns = 0
+    trigger.event = LateBarEvent()
+    assert trigger.wait(now_ns=1700000100 * SECOND - 1000) == WAKE_CLOCK
+
+    # The next wait returns for that bar straight away instead of a bar later
+    started = time.perf_counter()
+    assert trigger.wait() == WAKE_BAR
+    assert time.perf_counter() - started < 1.0
+
+
+def test_intrabar_cadence_and_stop():
+    trigger = BarTrigger('D', intrabar_interval=0.05)
+    assert trigger.wait() == WAKE_INTRABAR and trigger.intrabar_wakes == 1
+
+    # Stopping wakes the runner straight away, and it stays stopped
+    threading.Timer(0.05, trigger.stop).start()
+    started = time.perf_counter()
+    trigger.intrabar_interval = None
+    assert trigger.wait() == WAKE_STOPPED and trigger.is_stopped()
+    assert time.perf_counter() - started < 1.0
+    trigger.pause(30)
+    assert time.perf_counter() - started < 1.0
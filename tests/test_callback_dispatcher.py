@@ -0,0 +1,72 @@
+import threading
+import time
+
+from app.helpers.callback_dispatcher import CallbackDispatcher, POLICY_LATEST
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_slow_callback_does_not_block_dispatch_or_other_subscribers():
+    dispatcher = CallbackDispatcher(workers=2)
+    release = threading.Event()
+    fast_ticks = []
+
+    def slow(tick, symbol):
+        release.wait(5)
+
+    def fast(tick, symbol):
+        fast_ticks.append((symbol, tick['close']))
+
+    start = time.perf_counter()
+    for i in range(100):
+        dispatcher.dispatch([((slow, fast), {'close': float(i)}, 'SBIN')])
+    elapsed = time.perf_counter() - start
+
+    # Dispatch only queues, so it never waits on the blocked callback
+    assert elapsed < 0.5
+    assert wait_for(lambda: len(fast_ticks) == 100)
+    assert [close for _, close in fast_ticks] == [float(i) for i in range(100)]
+
+    release.set()
+    assert wait_for(lambda: dispatcher.subscriber(slow).delivered == 100)
+    dispatcher.stop()
+
+
+def test_bounded_queue_drops_oldest_and_latest_policy_conflates():
+    dispatcher = CallbackDispatcher(workers=1, max_queue=10)
+    release = threading.Event()
+    received = []
+
+    def blocked(tick, symbol):
+        release.wait(5)
+        received.append((symbol, tick['close']))
+
+    def latest(tick, symbol):
+        release.wait(5)
+
+    dispatcher.set_policy(latest, POLICY_LATEST)
+
+    # The first tick occupies the worker, the rest pile up behind it
+    dispatcher.dispatch([((blocked,), {'close': 0.0}, 'SBIN')])
+    assert wait_for(lambda: len(dispatcher.subscriber(blocked)) == 0)
+    for i in range(1, 26):
+        dispatcher.dispatch([((blocked, latest), {'close': float(i)}, 'SBIN' if i % 2 else 'INFY')])
+
+    stats = dispatcher.subscriber(blocked).get_stats()
+    assert stats['pending'] == 10 and stats['dropped'] == 15
+    latest_stats = dispatcher.subscriber(latest).get_stats()
+    assert latest_stats['pending'] <= 2 and latest_stats['conflated'] >= 23
+
+    release.set()
+    assert wait_for(lambda: len(received) == 11)
+    # Only the newest ten survived the overflow, still in order
+    assert [close for _, close in received[1:]] == [float(i) for i in range(16, 26)]
+    assert dispatcher.get_stats()['dropped'] == 15
+    dispatcher.stop()
@@ -0,0 +1,38 @@
+import pytest
+
+from app.helpers.code_cache import CodeCache
+
+SOURCE = "total = sum(range(10))\nif total > 40:\n    long_entry()\n"
+
+
+def run(code):
+    signals = []
+    exec(code, {}, {'long_entry': lambda: signals.append('long_entry')})
+    return signals
+
+
+def test_compiles_each_source_once(tmp_path):
+    cache = CodeCache(capacity=2, directory=str(tmp_path))
+    code, info = cache.get(SOURCE)
+    assert info['source'] == 'compiled' and info['compile_ms'] >= 0 and run(code) == ['long_entry']
+
+    again, info = cache.get(SOURCE)
+    assert again is code and info['source'] == 'memory' and info['saved_ms'] == cache.get_stats()['compile_ms']
+
+    # A restarted process loads the bytecode from disk instead of compiling
+    restarted = CodeCache(directory=str(tmp_path))
+    loaded, info = restarted.get(SOURCE)
+    assert info['source'] == 'disk' and run(loaded) == ['long_entry']
+    assert restarted.get_stats()['misses'] == 0 and restarted.get_stats()['disk_hits'] == 1
+
+    # Least recently used sources are evicted, edited code is dropped from both tiers
+    cache.get("a = 1")
+    cache.get(SOURCE)
+    cache.get("b = 2")
+    assert cache.get_stats()['evictions'] == 1 and cache.get("a = 1")[1]['source'] == 'disk'
+    cache.invalidate(SOURCE)
+    assert cache.get(SOURCE)[1]['source'] == 'compiled'
+
+    with pytest.raises(SyntaxError):
+        cache.get("def broken(:")
+    assert cache.get_stats()['entries'] == 2
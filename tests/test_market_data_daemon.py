@@ -0,0 +1,139 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from app.helpers import websocket_helper
+from app.helpers.market_data_client import MarketDataClient, MarketDataError
+from app.helpers.market_data_daemon import MarketDataDaemon, HostLock
+from app.helpers.websocket_helper import initialize_angelone_websocket
+from app.helpers.tick_decoder import encode_frame
+from app.helpers.tick_replay import TickReplay
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_instance', None)
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_health_check', lambda self: None)
+    manager = websocket_helper.AngelOneWebSocketManager()
+    TickReplay(iter(())).attach(manager)
+    yield manager
+    manager.close_connection()
+
+
+@pytest.fixture
+def daemon(manager, tmp_path):
+    daemon = MarketDataDaemon(manager=manager, socket_path=str(tmp_path / 'md.sock'),
+                              lock_path=str(tmp_path / 'md.lock')).start(tick_bus=False)
+    yield daemon
+    daemon.stop()
+
+
+def test_client_drives_the_daemon_manager(daemon, manager):
+    client = MarketDataClient(daemon.socket_path)
+    assert client.available() and not client.connected
+    assert client.connect() and client.connected
+
+    assert client.register_symbol('SYM0', 1, '2885')
+    assert client.register_symbol('', 1, '2885') is False
+    assert client.subscribe_mode('SYM0', 2) and client.is_symbol_subscribed('SYM0')
+    assert client.get_subscriptions()[0]['symbol'] == 'SYM0'
+
+    frame = encode_frame({'mode': 2, 'exchange_type': 1, 'token': '2885', 'exchange_timestamp': 1700000000123,
+                          'last_price': 10.5, 'volume_traded': 7})
+    manager._process_batch([frame])
+
+    # Ticks come back as the same DataFrame the in-process manager builds
+    df = client.get_data_as_dataframe('SYM0')
+    assert df.equals(manager.get_data_as_dataframe('SYM0'))
+    assert client.get_quote('SYM0')['last_price'] == 10.5
+    assert client.get_bars('SYM0', 300).empty
+    manager.subscribe_bars('SYM0')
+    manager._process_batch([frame])
+    assert client.get_bars('SYM0', 300, include_forming=True).equals(manager.get_bars('SYM0', 300, include_forming=True))
+    manager.unsubscribe_bars('SYM0')
+    status = client.get_connection_status()
+    assert status['connected'] and status['daemon']['pid'] == os.getpid()
+
+    # Errors raised in the daemon come back to the caller
+    with pytest.raises(MarketDataError):
+        client.call('no_such_method')
+    assert client.unsubscribe('SYM0') and not client.is_symbol_subscribed('SYM0')
+    client.close()
+
+
+def test_client_reads_ticks_and_bars_from_the_tick_bus(daemon, manager):
+    bus_name = f'algotrade_test_{os.getpid()}_{time.time_ns()}'
+    manager.enable_tick_bus(bus_name, capacity=64)
+    client = MarketDataClient(daemon.socket_path, tick_bus_name=bus_name)
+    methods = []
+    call = client.call
+    client.call = lambda method, **params: methods.append(method) or call(method, **params)
+    try:
+        client.connect()
+        client.register_symbol('SYM0', 1, '2885')
+        client.subscribe_mode('SYM0', 2)
+        manager.subscribe_bars('SYM0', 60)
+        manager._process_batch([
+            encode_frame({'mode': 2, 'exchange_type': 1, 'token': '2885', 'exchange_timestamp': 1700000000000 + minute * 60000,
+                          'last_price': 10.0 + minute, 'volume_traded': 7 * minute})
+            for minute in range(4)
+        ])
+        methods.clear()
+
+        # Whatever the bus carried is read from shared memory, not over the socket
+        snapshot = client.get_data_snapshot('SYM0', 4)
+        expected = manager.get_data_snapshot('SYM0', 4)
+        assert all((snapshot[name] == expected[name]).all() for name in expected)
+        assert client.get_bars('SYM0', '1m', limit=3).equals(manager.get_bars('SYM0', 60, limit=3))
+        assert methods == []
+
+        # More than the bus carried, or the forming bar, still comes from the daemon
+        assert client.get_data_as_dataframe('SYM0', 10).equals(manager.get_data_as_dataframe('SYM0', 10))
+        assert client.get_bars('SYM0', 60, limit=4).equals(manager.get_bars('SYM0', 60, limit=4))
+        assert client.get_bars('SYM0', 60, limit=1, include_forming=True).equals(
+            manager.get_bars('SYM0', 60, limit=1, include_forming=True))
+        assert methods == ['data', 'bars', 'bars']
+    finally:
+        client.close()
+        manager.unsubscribe_bars('SYM0')
+        manager.disable_tick_bus()
+
+
+def test_web_process_leaves_the_connection_to_the_daemon(daemon, manager):
+    client = MarketDataClient(daemon.socket_path)
+    assert client.continue_iteration
+    client.continue_iteration = False
+    assert manager.continue_iteration is False and client.continue_iteration is False
+    client.continue_iteration = True
+
+    user = SimpleNamespace(username='admin', angelone_api_key='key', angelone_client_code='C1',
+                           angelone_jwt_token='jwt', angelone_feed_token='feed', angelone_ws_configured=False,
+                           angelone_ws_enabled=False)
+    web = Flask(__name__)
+    web.config['MARKET_DATA_DAEMON'] = True
+    with web.app_context():
+        result = initialize_angelone_websocket(user, manager)
+    assert not result['success'] and not manager.connected
+
+    # The daemon process itself still connects
+    result = initialize_angelone_websocket(user, manager)
+    assert result['success'] and client.connected
+    client.close()
+
+
+def test_one_daemon_per_host(daemon, manager, tmp_path):
+    second = MarketDataDaemon(manager=manager, socket_path=str(tmp_path / 'other.sock'), lock_path=daemon.host_lock.path)
+    with pytest.raises(RuntimeError):
+        second.start(tick_bus=False)
+    assert HostLock(daemon.host_lock.path).owner() == os.getpid()
+
+    # Once the daemon is gone a client reports it as unavailable instead of raising
+    daemon.stop()
+    client = MarketDataClient(daemon.socket_path)
+    assert not client.available()
+    assert client.get_connection_status()['connected'] is False
+    assert second.start(tick_bus=False) is second
+    second.stop()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from app.helpers import websocket_helper
+from app.helpers.quote_table import QuoteTable
+from app.helpers.tick_decoder import encode_frame
+from app.helpers.tick_replay import TickReplay
+
+
+def test_rows_are_reused_and_survive_growth():
+    table = QuoteTable(capacity=2)
+    rows = [table.add(f'S{i}') for i in range(3)]
+    assert rows == [0, 1, 2] and table.capacity == 4
+    assert table.add('S1') == 1
+
+    table.update_many([0, 2, 0], [10.0, 30.0, 11.0], [np.nan] * 3, [np.nan] * 3, [1, 3, 2], [0] * 3, 123)
+    assert table.get('S0')['last_price'] == 11.0 and table.get('S0')['ticks'] == 2
+    assert np.isnan(table.get('S1')['last_price'])
+
+    assert table.remove('S1') and table.add('S3') == 1
+    symbols, quotes = table.snapshot()
+    assert symbols == ['S0', 'S3', 'S2']
+    assert list(quotes['last_price'][[0, 2]]) == [11.0, 30.0] and np.isnan(quotes['last_price'][1])
+    assert table.get('S1') is None
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_instance', None)
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_health_check', lambda self: None)
+    manager = websocket_helper.AngelOneWebSocketManager()
+    TickReplay(iter(())).attach(manager)
+    yield manager
+    manager.close_connection()
+    manager.continue_iteration = False
+
+
+def test_tick_processor_fills_the_quote_table(manager):
+    manager.register_symbol('A', 1, '100')
+    manager.register_symbol('B', 1, '200')
+    manager.register_symbol('IDLE', 1, '300')
+    assert manager.connect()
+    manager.batch_subscribe(['A'], mode=2)
+    manager.batch_subscribe(['B'], mode=3)
+
+    manager._process_batch([
+        encode_frame({'mode': 2, 'exchange_type': 1, 'token': '100', 'exchange_timestamp': 1700000000000,
+                      'last_price': 10.5, 'volume_traded': 7}),
+        encode_frame({'mode': 3, 'exchange_type': 1, 'token': '200', 'last_price': 20.0,
+                      'bids': [(19.95, 10, 1)], 'asks': [(20.05, 5, 1)]})
+    ])
+
+    quote = manager.get_quote('A')
+    assert quote['last_price'] == 10.5 and quote['volume'] == 7 and quote['ticks'] == 1
+    assert quote['exchange_ns'] == 1700000000000 * 1_000_000
+
+    snapshot = manager.get_quote_snapshot()
+    assert list(snapshot.index) == ['A', 'B', 'IDLE']
+    assert snapshot.loc['B', 'bid'] == 19.95 and snapshot.loc['B', 'ask'] == 20.05
+    assert np.isnan(snapshot.loc['IDLE', 'last_price'])
+
+    # Re-registering with a different token starts from an empty row
+    manager.register_symbol('A', 1, '101')
+    assert np.isnan(manager.get_quote('A')['last_price'])
+    manager.unregister_symbol('IDLE')
+    assert manager.get_quote('IDLE') is None
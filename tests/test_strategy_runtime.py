@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+
+from app.helpers.code_cache import code_cache
+from app.helpers.strategy_runtime import StrategyRuntime
+
+ON_BAR = """
+# param:
+threshold = 100
+calls = 0
+print("loaded")
+
+def on_bar(bars):
+    global calls
+    calls += 1
+    state['last_close'] = bars['close'].iloc[-1]
+    if bars['close'].iloc[-1] > threshold:
+        long_entry()
+"""
+
+RUN_STRATEGY = """
+def run_strategy(df):
+    for close in df['close']:
+        if close > 100:
+            long_entry()
+
+if historical_data is not None:
+    run_strategy(historical_data)
+"""
+
+
+@pytest.fixture(autouse=True)
+def cache_directory(tmp_path, monkeypatch):
+    # Keep the shared cache's compiled code out of the working tree
+    monkeypatch.setattr(code_cache, 'directory', str(tmp_path))
+
+
+def bars(closes):
+    return pd.DataFrame({'close': closes}, index=pd.date_range('2024-01-02 09:15', periods=len(closes), freq='1min'))
+
+
+def test_module_code_runs_once_and_state_persists():
+    runtime = StrategyRuntime(ON_BAR, params={'threshold': 101})
+    assert runtime.load() and runtime.entry_point == 'on_bar'
+
+    assert runtime.run(bars([100.0]))['signals'] == []
+    result = runtime.run(bars([100.0, 102.0]))
+    assert result['success'] and result['signals'] == [('long_entry', 1)]
+    # Each call returns only the signals it added
+    assert runtime.run(bars([100.0, 102.0, 103.0]))['signals'] == [('long_entry', 2)]
+    assert runtime.signals == [('long_entry', 1), ('long_entry', 2)]
+
+    # The module body ran once, the params replaced its defaults and state carried across calls
+    assert runtime.namespace['calls'] == 3 and runtime.namespace['state']['last_close'] == 103.0
+    assert runtime.get_stats()['runs'] == 3
+
+    error = runtime.run(pd.DataFrame())
+    assert not error['success'] and 'close' in error['error']
+
+
+def test_run_strategy_recomputes_signals_each_call():
+    runtime = StrategyRuntime(RUN_STRATEGY)
+    assert runtime.load() and runtime.entry_point == 'run_strategy'
+    assert runtime.run(bars([101.0, 99.0]))['signals'] == [('long_entry', 1)]
+    assert runtime.run(bars([101.0, 99.0, 102.0]))['signals'] == [('long_entry', 2)]
+    assert runtime.run(bars([101.0, 99.0, 102.0, 99.0]))['signals'] == []
+
+    # Scripts that need data at module level are left to run in full per call
+    legacy = StrategyRuntime("close = historical_data['close'].iloc[-1]")
+    assert not legacy.load() and legacy.entry_point is None and legacy.load_error
+
+
+def test_intrabar_runs_do_not_touch_on_bar():
+    runtime = StrategyRuntime(ON_BAR + """
+def on_intrabar(bars):
+    state['forming_close'] = bars['close'].iloc[-1]
+""")
+    assert runtime.load() and runtime.intrabar_entry_point == 'on_intrabar'
+
+    assert runtime.run(bars([100.0, 150.0]), intrabar=True)['success']
+    assert runtime.namespace['calls'] == 0 and runtime.namespace['state'] == {'forming_close': 150.0}
+
+    # At close on_bar sees the bar once
+    assert runtime.run(bars([100.0, 150.0]))['signals'] == [('long_entry', 1)]
+    assert runtime.namespace['calls'] == 1
+
+    plain = StrategyRuntime(ON_BAR)
+    assert plain.load() and plain.intrabar_entry_point is None
+    with pytest.raises(ValueError):
+        plain.run(bars([100.0]), intrabar=True)
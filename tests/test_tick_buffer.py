@@ -0,0 +1,74 @@
+import threading
+import numpy as np
+import pandas as pd
+from app.helpers.tick_buffer import TickRingBuffer
+
+
+def fill(buffer, count, start=0):
+    for i in range(start, start + count):
+        buffer.append(i * 1_000_000_000, i, i + 1, i - 1, i + 0.5, i * 10)
+
+
+def test_append_until_wrap_keeps_latest_in_order():
+    buffer = TickRingBuffer(capacity=5)
+    fill(buffer, 13)
+
+    assert len(buffer) == 5
+    view = buffer.view()
+    assert list(view['open']) == [8, 9, 10, 11, 12]
+    assert list(buffer.view(limit=2)['volume']) == [110, 120]
+    assert buffer.last()['close'] == 12.5
+
+
+def test_views_are_contiguous_and_read_only():
+    buffer = TickRingBuffer(capacity=4)
+    fill(buffer, 6)
+
+    view = buffer.view()
+    assert all(column.flags['C_CONTIGUOUS'] for column in view.values())
+    assert not view['close'].flags.writeable
+    # A view shares memory with the buffer, no copy is made
+    assert np.shares_memory(view['close'], buffer.close)
+
+
+def test_to_dataframe_has_datetime_index_and_optional_quotes():
+    buffer = TickRingBuffer(capacity=3, with_quotes=True)
+    assert buffer.to_dataframe().empty
+
+    buffer.append(0, 1.0, 2.0, 0.5, 1.5, 100, bid=1.4, ask=1.6)
+    df = buffer.to_dataframe()
+
+    assert isinstance(df.index, pd.DatetimeIndex)
+    assert df.index.name == 'timestamp'
+    assert list(df.columns) == ['open', 'high', 'low', 'close', 'volume', 'bid', 'ask']
+    assert df['ask'].iloc[0] == 1.6
+
+
+def test_memory_is_fixed():
+    buffer = TickRingBuffer(capacity=100)
+    before = buffer.nbytes
+    fill(buffer, 1000)
+    assert buffer.nbytes == before
+
+
+def test_snapshot_never_sees_a_torn_write():
+    buffer = TickRingBuffer(capacity=64)
+    stop = threading.Event()
+
+    def write():
+        i = 0
+        while not stop.is_set():
+            i += 1
+            buffer.append(i, i, i, i, i, i)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(2000):
+            columns = buffer.snapshot(32)
+            # Every row was written whole and rows stay consecutive
+            assert all((columns[name] == columns['timestamp']).all() for name in ('open', 'close', 'volume'))
+            assert (np.diff(columns['timestamp']) == 1).all()
+    finally:
+        stop.set()
+        writer.join()
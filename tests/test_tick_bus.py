@@ -0,0 +1,101 @@
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from app.helpers import websocket_helper
+from app.helpers.tick_bus import TickBusPublisher, TickBusReader, records_to_dataframe, KIND_BAR
+from app.helpers.tick_decoder import encode_frame
+from app.helpers.tick_replay import TickReplay
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def bus_name():
+    return f'algotrade_test_{os.getpid()}_{time.time_ns()}'
+
+
+def ticks(start, count):
+    return [(f'SYM{i % 3}', 1700000000000000000 + i, 100.0 + i, 100.0 + i, 100.0 + i, 100.0 + i, i, np.nan, np.nan)
+            for i in range(start, start + count)]
+
+
+def test_reader_follows_the_ring_and_counts_overwritten_records(bus_name):
+    publisher = TickBusPublisher(bus_name, capacity=8)
+    try:
+        reader = TickBusReader(bus_name)
+        publisher.publish_ticks(ticks(0, 5))
+        batch = reader.poll()
+        assert list(batch['sequence']) == [1, 2, 3, 4, 5]
+        assert list(batch['close']) == [100.0, 101.0, 102.0, 103.0, 104.0]
+
+        # Wrap the ring twice before polling again, only the newest capacity records survive
+        publisher.publish_ticks(ticks(5, 14))
+        assert reader.lag == 14
+        batch = reader.poll(max_records=3)
+        assert list(batch['sequence']) == [12, 13, 14] and reader.lost == 6
+        assert list(reader.poll()['sequence']) == list(range(15, 20))
+
+        publisher.publish_bars([('SYM1', 1700000040000000000, 1.0, 3.0, 0.5, 2.0, 40, 7)], 60)
+        df = records_to_dataframe(reader.poll())
+        assert list(df['symbol']) == ['SYM1'] and df['kind'].iloc[0] == KIND_BAR and df['timeframe'].iloc[0] == 60
+        assert df['ticks'].iloc[0] == 7 and np.isnan(df['bid'].iloc[0])
+
+        reader.close()
+    finally:
+        publisher.close()
+
+
+def run_in_another_process(code):
+    return subprocess.run([sys.executable, '-c', code], cwd=REPO, capture_output=True, text=True, timeout=60)
+
+
+def test_other_processes_read_the_bus_and_cannot_publish_to_it(bus_name):
+    publisher = TickBusPublisher(bus_name, capacity=16)
+    try:
+        publisher.publish_ticks(ticks(0, 4))
+        result = run_in_another_process(
+            "from app.helpers.tick_bus import TickBusReader\n"
+            f"with TickBusReader({bus_name!r}, from_start=True) as reader:\n"
+            "    batch = reader.poll()\n"
+            "    print(batch['close'].tolist(), batch['symbol'].tolist())\n"
+        )
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split("\n")[-2] == "[100.0, 101.0, 102.0, 103.0] [b'SYM0', b'SYM1', b'SYM2', b'SYM0']"
+
+        # One publisher per host: a second process is refused while this one is alive
+        result = run_in_another_process(f"from app.helpers.tick_bus import TickBusPublisher\nTickBusPublisher({bus_name!r})")
+        assert result.returncode != 0 and 'already published' in result.stderr
+
+        # The reader exiting must not have removed the block
+        with TickBusReader(bus_name, from_start=True) as reader:
+            assert len(reader.poll()) == 4
+    finally:
+        publisher.close()
+
+
+def test_manager_publishes_decoded_ticks(monkeypatch, bus_name):
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_instance', None)
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_health_check', lambda self: None)
+    manager = websocket_helper.AngelOneWebSocketManager()
+    TickReplay(iter(())).attach(manager)
+    manager.register_symbol('SYM0', 1, '2885')
+    assert manager.connect() and manager.subscribe('SYM0')
+    assert manager.enable_tick_bus(bus_name, capacity=32)
+    try:
+        reader = TickBusReader(bus_name)
+        frame = encode_frame({'mode': 2, 'exchange_type': 1, 'token': '2885', 'exchange_timestamp': 1700000000123,
+                              'last_price': 10.5, 'volume_traded': 7})
+        manager._process_batch([frame])
+        batch = reader.poll()
+        assert list(batch['close']) == [10.5] and list(batch['timestamp']) == [1700000000123 * 1_000_000]
+        assert manager.get_connection_status()['tick_bus']['published'] == 1
+        reader.close()
+    finally:
+        manager.disable_tick_bus()
+        manager.close_connection()
+    assert manager.tick_bus is None
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from app.helpers.tick_decoder import (
+    decode_frame, decode_frames, decode_depth, encode_frame, frame_key, new_depth_book,
+    BID, ASK, DEPTH_PRICE, DEPTH_QUANTITY, DEPTH_ORDERS,
+    MODE_LTP, MODE_QUOTE, MODE_SNAP_QUOTE, MODE_DEPTH,
+    LTP_FRAME_SIZE, QUOTE_FRAME_SIZE, SNAP_QUOTE_FRAME_SIZE
+)
+
+
+@pytest.fixture
+def quote_tick():
+    return {
+        'mode': MODE_QUOTE,
+        'exchange_type': 2,
+        'token': '43210',
+        'sequence_number': 17,
+        'exchange_timestamp': 1700000000123,
+        'last_price': 245.35,
+        'last_traded_quantity': 50,
+        'average_traded_price': 244.1,
+        'volume_traded': 125000,
+        'total_buy_quantity': 3000.0,
+        'total_sell_quantity': 4500.0,
+        'open_price': 240.0,
+        'high_price': 250.5,
+        'low_price': 238.25,
+        'close_price': 239.9
+    }
+
+
+def test_frame_sizes_match_spec():
+    assert LTP_FRAME_SIZE == 51
+    assert QUOTE_FRAME_SIZE == 123
+    assert SNAP_QUOTE_FRAME_SIZE == 379
+
+
+def test_quote_round_trip(quote_tick):
+    frame = encode_frame(quote_tick)
+    assert len(frame) == QUOTE_FRAME_SIZE
+    assert decode_frame(frame) == quote_tick
+    assert frame_key(frame) == (2, b'43210')
+
+
+def test_snap_quote_best_bid(quote_tick):
+    tick = dict(quote_tick, mode=MODE_SNAP_QUOTE, best_bid_price=245.3, best_bid_quantity=75,
+                upper_circuit=270.0, lower_circuit=220.0)
+    decoded = decode_frame(encode_frame(tick))
+    assert decoded['best_bid_price'] == 245.3
+    assert decoded['best_bid_quantity'] == 75
+    assert decoded['upper_circuit'] == 270.0
+    assert decoded['lower_circuit'] == 220.0
+
+
+def test_short_and_unknown_frames_are_rejected(quote_tick):
+    frame = encode_frame(quote_tick)
+    assert decode_frame(frame[:60]) is None
+    assert decode_frame(b'\x09' + frame[1:]) is None
+    assert decode_frame(encode_frame({'mode': MODE_DEPTH, 'token': '1'}))['mode'] == MODE_DEPTH
+
+
+def test_batch_matches_single_frame_decoder(quote_tick):
+    frames = [
+        encode_frame(dict(quote_tick, sequence_number=i, last_price=100 + i, mode=mode))
+        for i, mode in enumerate([MODE_QUOTE, MODE_LTP, MODE_SNAP_QUOTE, MODE_QUOTE])
+    ]
+    frames.insert(2, b'\x02short')
+    ticks = decode_frames(frames)
+
+    assert len(ticks) == 4
+    assert list(ticks['sequence_number']) == [0, 1, 2, 3]
+    for row, frame in zip(ticks, [f for f in frames if len(f) > 10]):
+        single = decode_frame(frame)
+        assert row['token'].decode() == single['token']
+        assert row['last_price'] == single['last_price']
+        assert row['volume_traded'] == single.get('volume_traded', 0)
+
+
+def test_batch_carries_top_of_book_depth_headers_and_frame_positions(quote_tick):
+    snap = encode_frame(dict(quote_tick, mode=MODE_SNAP_QUOTE, bids=[(245.3, 10, 1)], asks=[(245.4, 20, 2)]))
+    depth = encode_frame({'mode': MODE_DEPTH, 'exchange_type': 2, 'token': '43210', 'exchange_timestamp': 1700000000456})
+    frames = [b'\x02short', encode_frame(quote_tick), snap, depth]
+
+    ticks, index = decode_frames(frames, return_index=True)
+    assert list(index) == [1, 2, 3]
+    assert list(ticks['mode']) == [MODE_QUOTE, MODE_SNAP_QUOTE, MODE_DEPTH]
+    single = decode_frame(snap)
+    assert (ticks[1]['best_bid_price'], ticks[1]['best_ask_price']) == (single['best_bid_price'], single['best_ask_price'])
+    assert ticks[1]['best_ask_quantity'] == 20 and np.isnan(ticks[0]['best_bid_price'])
+    assert ticks[2]['token'] == b'43210' and ticks[2]['exchange_timestamp'] == 1700000000456
+
+
+def test_snap_quote_depth_decodes_into_book(quote_tick):
+    bids = [(245.3 - i * 0.05, 10 + i, 1 + i) for i in range(5)]
+    asks = [(245.4 + i * 0.05, 20 + i, 2 + i) for i in range(5)]
+    frame = encode_frame(dict(quote_tick, mode=MODE_SNAP_QUOTE, bids=bids, asks=asks))
+
+    book = new_depth_book(5)
+    assert decode_depth(frame, book)
+    assert book[BID, 0, DEPTH_PRICE] == 245.3
+    assert book[ASK, 4, DEPTH_QUANTITY] == 24
+    assert book[BID, 2, DEPTH_ORDERS] == 3
+    assert decode_frame(frame)['best_ask_price'] == 245.4
+
+
+def test_depth_mode_fills_twenty_levels():
+    bids = [(100 - i, 5 * i, i) for i in range(20)]
+    asks = [(101 + i, 7 * i, i) for i in range(20)]
+    frame = encode_frame({'mode': MODE_DEPTH, 'exchange_type': 1, 'token': '99', 'bids': bids, 'asks': asks})
+
+    book = new_depth_book(20)
+    assert decode_depth(frame, book)
+    assert book[BID, 19, DEPTH_PRICE] == 81
+    assert book[ASK, 19, DEPTH_QUANTITY] == 133
+    assert not decode_depth(encode_frame(dict(mode=MODE_QUOTE, token='99')), book)
@@ -0,0 +1,69 @@
+from datetime import datetime
+
+from app.helpers.tick_decoder import encode_frame
+from app.helpers.tick_journal import TickJournal, TickJournalReader, list_journals
+
+SECOND = 1_000_000_000
+
+
+def frame(token, price):
+    return encode_frame({'mode': 1, 'exchange_type': 1, 'token': token, 'last_price': price})
+
+
+def test_journal_round_trip_and_seek(tmp_path):
+    journal = TickJournal(str(tmp_path), grow_bytes=4096, index_interval_ns=SECOND)
+    base = int(datetime(2024, 3, 4, 9, 15).timestamp()) * SECOND
+
+    # Ten ticks a second for a minute, enough to grow the file several times
+    frames = []
+    for i in range(600):
+        receive_ns = base + i * SECOND // 10
+        frames.append((receive_ns, frame(str(2885 + i % 3), 100 + i)))
+        journal.record(frames[-1][1], receive_ns)
+        if i % 97 == 0:
+            journal.flush()
+    journal.stop()
+
+    paths = list_journals(str(tmp_path))
+    assert [path.rsplit('/', 1)[1] for path in paths] == ['20240304.ticks']
+
+    with TickJournalReader(paths[0]) as reader:
+        records = [(receive_ns, bytes(data)) for receive_ns, data in reader]
+        assert records == frames
+        assert len(reader.index) == 60
+
+        # Seek lands on the first record at or after the requested time
+        window = [(receive_ns, bytes(data)) for receive_ns, data in reader.iter_records(base + 25 * SECOND + 1, base + 27 * SECOND)]
+        assert window == frames[251:270]
+        del records, window
+
+
+def test_journal_rolls_over_at_midnight_and_appends_on_reopen(tmp_path):
+    evening = int(datetime(2024, 3, 4, 23, 59, 59).timestamp()) * SECOND
+    journal = TickJournal(str(tmp_path), grow_bytes=4096)
+    journal.record(frame('2885', 1), evening)
+    journal.record(frame('2885', 2), evening + 2 * SECOND)
+    journal.stop()
+
+    # A restarted writer continues the existing day file
+    journal = TickJournal(str(tmp_path), grow_bytes=4096)
+    journal.record(frame('2885', 3), evening + 3 * SECOND)
+    journal.stop()
+
+    paths = list_journals(str(tmp_path))
+    assert [path.rsplit('/', 1)[1] for path in paths] == ['20240304.ticks', '20240305.ticks']
+    with TickJournalReader(paths[1]) as reader:
+        assert [bytes(data) for _, data in reader] == [frame('2885', 2), frame('2885', 3)]
+
+
+def test_frames_keep_their_receive_stamps_in_order(tmp_path):
+    base = int(datetime(2024, 3, 4, 9, 15).timestamp()) * SECOND
+    journal = TickJournal(str(tmp_path), grow_bytes=4096)
+
+    # Two connections stamp on receipt but can queue in the other order
+    journal.record(frame('2885', 2), base + 2)
+    journal.record(frame('3045', 1), base + 1)
+    journal.stop()
+
+    with TickJournalReader(list_journals(str(tmp_path))[0]) as reader:
+        assert [(receive_ns, bytes(data)) for receive_ns, data in reader] == [(base + 1, frame('3045', 1)), (base + 2, frame('2885', 2))]
@@ -0,0 +1,33 @@
+import numpy as np
+
+from app.helpers.tick_latency import LatencyHistogram, LatencyRecorder, bucket_index, bucket_indices, BUCKET_UPPER_NS
+
+
+def test_scalar_and_vector_bucketing_agree_and_bound_values():
+    values = np.r_[np.arange(0, 5000), np.random.default_rng(1).integers(1, 2 ** 62, 10000)]
+    indices = bucket_indices(values)
+    assert list(indices) == [bucket_index(value) for value in values]
+    assert (np.maximum(values, 1) <= BUCKET_UPPER_NS[indices]).all()
+
+
+def test_percentiles_within_bucket_resolution():
+    rng = np.random.default_rng(2)
+    samples = rng.lognormal(mean=11, sigma=1, size=20000).astype(np.int64)
+
+    vector = LatencyHistogram()
+    vector.record_many(samples)
+    scalar = LatencyHistogram()
+    for value in samples[:1000]:
+        scalar.record(value)
+    vector_head = LatencyHistogram()
+    vector_head.record_many(samples[:1000])
+    assert (scalar.counts == vector_head.counts).all()
+
+    for q in (50, 99):
+        exact = np.percentile(samples, q)
+        assert exact <= vector.percentile(q) <= exact * 1.2
+    assert vector.max_ns == samples.max()
+
+    merged = LatencyRecorder.merged([LatencyRecorder(), LatencyRecorder()])
+    merged['receive_to_dequeue'].merge(vector)
+    assert merged.get_stats()['receive_to_dequeue']['count'] == 20000
@@ -0,0 +1,65 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from app.helpers.tick_decoder import encode_frame
+from app.helpers.tick_queue import TickQueue
+
+
+def frame(token, price, mode=1):
+    return encode_frame({'mode': mode, 'exchange_type': 1, 'token': token, 'last_price': price})
+
+
+def test_conflate_keeps_newest_frame_per_token_in_first_arrival_order():
+    q = TickQueue(maxsize=100, policy='conflate')
+    for i in range(10):
+        q.put(frame('2885', 100 + i))
+        q.put(frame('1594', 200 + i))
+    q.put({'errorCode': 'E1'})
+
+    batch = q.get_batch(10)
+    assert len(batch) == 3
+    assert batch[0] == frame('2885', 109)
+    assert batch[1] == frame('1594', 209)
+    assert batch[2] == {'errorCode': 'E1'}
+    assert q.get_stats()['conflated'] == 18
+
+    # Same token in another mode is a separate key
+    q.put(frame('2885', 1, mode=1))
+    q.put(frame('2885', 2, mode=2))
+    assert q.qsize() == 2
+
+
+def test_drop_oldest_bounds_the_backlog():
+    q = TickQueue(maxsize=5, policy='drop_oldest')
+    for i in range(12):
+        q.put(frame('2885', i))
+
+    assert q.qsize() == 5
+    assert q.get_stats()['dropped'] == 7
+    assert q.get_batch(10) == [frame('2885', i) for i in range(7, 12)]
+    with pytest.raises(queue.Empty):
+        q.get_batch(10, timeout=0.01)
+
+
+def test_block_waits_for_the_consumer():
+    q = TickQueue(maxsize=2, policy='block')
+    q.put(b'a' * 51)
+    q.put(b'b' * 51)
+
+    done = threading.Event()
+
+    def producer():
+        q.put(b'c' * 51)
+        done.set()
+
+    threading.Thread(target=producer, daemon=True).start()
+    time.sleep(0.05)
+    assert not done.is_set()
+
+    assert q.get() == b'a' * 51
+    assert done.wait(1)
+    assert q.get_batch(10) == [b'b' * 51, b'c' * 51]
+    assert q.get_stats()['blocked'] == 1 and q.get_stats()['dropped'] == 0
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from app.helpers import websocket_helper
+from app.helpers.tick_replay import TickReplay, synthetic_source
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_instance', None)
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_health_check', lambda self: None)
+    manager = websocket_helper.AngelOneWebSocketManager()
+    yield manager
+    manager.close_connection()
+    manager.continue_iteration = False
+
+
+def connect_universe(manager, replay, tokens):
+    replay.attach(manager)
+    for token in tokens:
+        manager.register_symbol(f'T{token}', 1, token)
+    assert manager.connect()
+    result = manager.batch_subscribe([f'T{token}' for token in tokens], mode=2)
+    assert all(result.values())
+
+
+def test_max_speed_replay_reaches_every_buffer(manager):
+    tokens = [str(5000 + i) for i in range(20)]
+    manager.configure_pool(max_connections=2, max_tokens_per_connection=10)
+    manager.configure_queue(policy='block')
+    replay = TickReplay(synthetic_source(tokens + ['99999'], 50), speed=None)
+    connect_universe(manager, replay, tokens)
+
+    report = replay.run(manager, timeout=30)
+
+    assert report['finished']
+    assert report['frames_sent'] == 1000
+    assert report['frames_unrouted'] == 50
+    assert report['processed'] == 1000 and report['dropped'] == 0
+    for token in tokens:
+        assert len(manager.get_data_as_dataframe(f'T{token}', limit=100)) == 50
+
+
+def test_paced_replay_follows_receive_times(manager):
+    tokens = ['2885']
+    # Ten ticks 100 ms apart take about 0.9 s of market time, 0.18 s at 5x
+    replay = TickReplay(synthetic_source(tokens, 10, interval_ns=100_000_000), speed=5.0)
+    connect_universe(manager, replay, tokens)
+
+    started = time.perf_counter()
+    report = replay.run(manager, timeout=10)
+    assert time.perf_counter() - started >= 0.17
+    assert report['frames_sent'] == 10
+
+
+def test_replay_records_stage_latencies(manager):
+    tokens = [str(7000 + i) for i in range(5)]
+    manager.configure_queue(policy='block')
+    replay = TickReplay(synthetic_source(tokens, 40), speed=None)
+    connect_universe(manager, replay, tokens)
+    replay.run(manager, timeout=30)
+
+    latency = manager.get_connection_status()['latency']
+    assert latency['receive_to_dispatch']['count'] == 200
+    assert latency['exchange_to_receive']['count'] == 200
+    for stage in latency.values():
+        assert 0 <= stage['p50_us'] <= stage['p99_us'] <= stage['max_us']
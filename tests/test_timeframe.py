@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.helpers.bar_builder import BarSeries
+from app.helpers.timeframe import (
+    parse_timeframe, normalize_timeframe, historical_interval, session_offset_ns, resample_ohlcv
+)
+
+AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+
+
+def make_candles(start, end, freq):
+    index = pd.date_range(start, end, freq=freq, name='timestamp')
+    rng = np.random.default_rng(3)
+    close = 100 + rng.standard_normal(len(index)).cumsum()
+    return pd.DataFrame({'open': close - 0.5, 'high': close + 1, 'low': close - 1, 'close': close,
+                         'volume': rng.integers(1, 1000, len(index))}, index=index)
+
+
+def test_every_spelling_parses_to_the_same_timeframe():
+    for spellings, seconds, label in ((('1m', '1min', '1T', 'ONE_MINUTE', 60), 60, '1m'),
+                                      (('5m', '5min', '5 minutes', 300), 300, '5m'),
+                                      (('60m', '1h', '1hour', 'ONE_HOUR'), 3600, '60m'),
+                                      (('D', '1d', '1day', '1D', 86400), 86400, 'D')):
+        for spelling in spellings:
+            assert parse_timeframe(spelling) == seconds and normalize_timeframe(spelling) == label
+
+    for bad in ('', '0m', '5x', 'weekly', 0, 1.5, None):
+        with pytest.raises(ValueError):
+            parse_timeframe(bad)
+
+    # Timeframes AngelOne has no interval for are downloaded at the longest one dividing them
+    assert historical_interval('D') == ('ONE_DAY', 86400)
+    assert historical_interval('2h') == ('ONE_HOUR', 3600)
+    assert historical_interval('45m') == ('FIFTEEN_MINUTE', 900)
+
+
+def test_resampler_matches_pandas_anchored_at_session_open():
+    candles = make_candles('2024-01-02 09:15', '2024-01-04 15:29', '1min')
+    candles = candles[(candles.index.hour * 60 + candles.index.minute >= 555) & (candles.index.hour < 16)]
+
+    for timeframe, offset in (('5m', None), ('60m', '15min'), ('D', None)):
+        expected = candles.resample(timeframe.replace('m', 'min'), offset=offset).agg(AGG).dropna()
+        result = resample_ohlcv(candles, timeframe, 'NSE')
+        assert result.index.equals(expected.index)
+        assert np.allclose(result.to_numpy(dtype=float), expected.to_numpy(dtype=float))
+    assert str(resample_ohlcv(candles, '60m', 'NSE').index[0]) == '2024-01-02 09:15:00'
+    assert str(resample_ohlcv(candles, '60m', 'MCX').index[1]) == '2024-01-02 10:00:00'
+
+    # Timezone-aware candles are bucketed on their wall clock; missing prices and order do not matter
+    aware = candles.tz_localize('Asia/Kolkata')
+    assert resample_ohlcv(aware, '30m').index[0] == pd.Timestamp('2024-01-02 09:15', tz='Asia/Kolkata')
+    shuffled = candles.sample(frac=1, random_state=1)
+    shuffled.iloc[0, 0] = np.nan
+    dropped = candles.drop(shuffled.index[0])
+    assert resample_ohlcv(shuffled, '15m').equals(resample_ohlcv(dropped, '15m'))
+
+
+def test_live_bars_use_the_same_session_anchor():
+    series = BarSeries('SYM', 3600, offset_ns=session_offset_ns('60m', 'NSE'))
+    tick = int(datetime(2024, 1, 2, 10, 5).timestamp()) * 1_000_000_000
+    assert datetime.fromtimestamp(series.bucket_start(tick) / 1e9) == datetime(2024, 1, 2, 9, 15)
+    daily = BarSeries('SYM', 86400, offset_ns=session_offset_ns('D', 'NSE'))
+    assert datetime.fromtimestamp(daily.bucket_start(tick) / 1e9) == datetime(2024, 1, 2)
@@ -0,0 +1,173 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+from app.helpers import websocket_helper
+from app.helpers.host_lock import HostLock
+from app.helpers.tick_buffer import ns_to_datetime
+from app.helpers.tick_decoder import encode_frame
+
+
+class FakeSmartWebSocket:
+    """In-process stand-in for SmartWebSocketV2 that opens immediately and records requests"""
+    instances = []
+
+    def __init__(self, auth_token, api_key, client_code, feed_token):
+        self.subscriptions = []
+        self.unsubscriptions = []
+        FakeSmartWebSocket.instances.append(self)
+
+    def connect(self):
+        self.on_open(None)
+
+    def subscribe(self, correlation_id, mode, token_list):
+        self.subscriptions.append((mode, token_list))
+
+    def unsubscribe(self, correlation_id, token_list):
+        self.unsubscriptions.append(token_list)
+
+    def close_connection(self):
+        pass
+
+    def send(self, message):
+        pass
+
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    FakeSmartWebSocket.instances = []
+    monkeypatch.setattr(websocket_helper, 'SmartWebSocketV2', FakeSmartWebSocket)
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_instance', None)
+    monkeypatch.setattr(websocket_helper.AngelOneWebSocketManager, '_health_check', lambda self: None)
+
+    manager = websocket_helper.AngelOneWebSocketManager()
+    manager.connection_lock = HostLock(str(tmp_path / 'broker.lock'))
+    manager.configure('jwt', 'key', 'client', 'feed')
+    manager.configure_pool(max_connections=3, max_tokens_per_connection=2)
+    for i in range(7):
+        manager.register_symbol(f'SYM{i}', 1, str(1000 + i))
+    assert manager.connect()
+    yield manager
+    manager.continue_iteration = False
+
+
+def test_batch_subscribe_spreads_tokens_under_the_cap(manager):
+    symbols = [f'SYM{i}' for i in range(7)]
+    result = manager.batch_subscribe(symbols, mode=2)
+
+    # Three connections of two tokens each, the seventh symbol does not fit
+    assert sum(result.values()) == 6
+    assert [len(shard.symbols) for shard in manager.shards] == [2, 2, 2]
+    sent = sorted(token for ws in FakeSmartWebSocket.instances
+                  for _, token_list in ws.subscriptions for entry in token_list for token in entry['tokens'])
+    assert len(sent) == 6
+
+    status = manager.get_connection_status()
+    assert status['connections'] == 3 and status['connected_connections'] == 3
+
+    # Unsubscribing frees a slot on the owning connection
+    freed = next(symbol for symbol, ok in result.items() if ok)
+    owner = manager.symbol_shards[freed]
+    assert manager.unsubscribe(freed)
+    assert manager.subscribe('SYM6')
+    assert manager.symbol_shards['SYM6'] is owner
+
+
+def test_each_shard_decodes_its_own_queue(manager):
+    manager.batch_subscribe(['SYM0', 'SYM1', 'SYM2'], mode=1)
+
+    for symbol in ('SYM0', 'SYM1', 'SYM2'):
+        shard = manager.symbol_shards[symbol]
+        token = manager.symbol_token_map[symbol]['token']
+        frame = encode_frame({'mode': 1, 'exchange_type': 1, 'token': token, 'exchange_timestamp': 1700000000000, 'last_price': 101.5})
+        manager._on_data(None, frame, shard)
+
+    deadline = time.time() + 5
+    while time.time() < deadline and manager.get_connection_status()['processed_count'] < 3:
+        time.sleep(0.01)
+
+    for symbol in ('SYM0', 'SYM1', 'SYM2'):
+        df = manager.get_data_as_dataframe(symbol)
+        assert list(df['close']) == [101.5]
+    assert sum(1 for shard in manager.shards if shard.processed_count) >= 2
+
+
+def test_reconnect_resubscribes_in_stored_modes_and_chunks(manager):
+    manager.subscribe_chunk_size = 1
+    assert manager.subscribe('SYM0')
+    manager.batch_subscribe(['SYM1', 'SYM2', 'SYM3'], mode=3)
+    manager.subscribe_index('NIFTY', 1, '99926000')
+
+    shard = manager.symbol_shards['SYM1']
+    previous = shard.ws
+    manager._on_close(None, 1006, 'lost', shard)
+
+    # A new client was opened and got every token back in its own mode
+    assert shard.connected and shard.ws is not previous
+    requests = shard.ws.subscriptions
+    assert all(sum(len(entry['tokens']) for entry in token_list) == 1 for _, token_list in requests)
+    modes = {}
+    for mode, token_list in requests:
+        for entry in token_list:
+            for token in entry['tokens']:
+                modes[token] = mode
+    expected = {manager.symbol_token_map[symbol]['token']: manager.subscribed_symbols[symbol]['mode']
+                for symbol in shard.symbols}
+    assert modes == expected and len(requests) == len(expected) == 2
+
+    token = next(iter(expected))
+    manager._on_data(None, encode_frame({'mode': expected[token], 'exchange_type': 1, 'token': token, 'last_price': 1.0}), shard)
+    recovery = shard.get_status()['last_recovery_ms']
+    assert recovery is not None and recovery < 1000
+    assert manager.get_connection_status()['reconnect_to_first_tick_ms'] == recovery
+
+
+def test_one_broker_connection_per_host(manager):
+    # Another process holding the lock, e.g. the market data daemon, keeps this one from connecting
+    manager.close_connection()
+    other = HostLock(manager.connection_lock.path)
+    assert other.acquire()
+    try:
+        assert not manager.connect() and not manager.connected
+        assert str(os.getpid()) in manager.last_error
+    finally:
+        other.release()
+    assert manager.connect() and manager.connection_lock.fd is not None
+
+
+def test_symbol_lock_only_blocks_its_own_symbol(manager):
+    manager.batch_subscribe(['SYM0', 'SYM1'], mode=2)
+    frames = {symbol: encode_frame({'mode': 2, 'exchange_type': 1, 'token': manager.symbol_token_map[symbol]['token'],
+                                    'last_price': 50.0, 'close_price': 50.0})
+              for symbol in ('SYM0', 'SYM1')}
+
+    # A write holding SYM0's lock stops neither SYM1's writes nor any snapshot read
+    with manager.subscribed_symbols['SYM0']['lock']:
+        manager._process_batch([frames['SYM1']])
+        assert list(manager.get_data_as_dataframe('SYM1')['close']) == [50.0]
+        assert manager.get_data_as_dataframe('SYM0').empty
+
+    manager._process_batch([frames['SYM0']])
+    assert len(manager.get_data_as_dataframe('SYM0')) == 1
+    assert manager.subscribed_symbols['SYM0']['lock'] is not manager.subscribed_symbols['SYM1']['lock']
+
+
+def test_ticks_carry_epoch_nanoseconds_until_the_dataframe(manager):
+    received = []
+    assert manager.subscribe('SYM0', lambda tick, symbol: received.append(tick))
+    token = manager.symbol_token_map['SYM0']['token']
+    shard = manager.symbol_shards['SYM0']
+
+    manager._on_data(None, encode_frame({'mode': 2, 'exchange_type': 1, 'token': token,
+                                         'exchange_timestamp': 1700000000123, 'last_price': 10.0}), shard)
+    deadline = time.time() + 5
+    while time.time() < deadline and not received:
+        time.sleep(0.01)
+
+    assert received[0]['timestamp'] == 1700000000123 * 1_000_000
+    assert manager.subscribed_symbols['SYM0']['data'].last()['timestamp'] == 1700000000123 * 1_000_000
+    df = manager.get_data_as_dataframe('SYM0')
+    assert df.index[0].to_pydatetime() == ns_to_datetime(1700000000123 * 1_000_000)
+    assert isinstance(manager.get_connection_status()['last_data_time'], datetime)